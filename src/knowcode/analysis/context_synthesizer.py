@@ -7,6 +7,9 @@ from knowcode.storage.knowledge_store import KnowledgeStore
 from knowcode.data_models import Entity, EntityKind, TaskType
 from knowcode.utils.token_counter import TokenCounter
 
+# Entity kinds whose children are listed in a context bundle
+CONTAINER_KINDS = frozenset({EntityKind.CLASS, EntityKind.MODULE, EntityKind.DOCUMENT})
+
 
 @dataclass
 class ContextBundle:
@@ -139,6 +142,7 @@ class ContextSynthesizer:
                 current_tokens += t
 
         # Priority 2: Source Code (Huge consumer, often truncated)
+        code_included = False
         if entity.source_code:
             code_header = "## Source Code\n\n```python\n"
             code_footer = "\n```"
@@ -156,6 +160,7 @@ class ContextSynthesizer:
                 
                 sections.append(f"{code_header}{code_body}{code_footer}")
                 current_tokens += self.tokenizer.count_tokens(sections[-1])
+                code_included = True
             else:
                  # Skipped source code due to budget
                  # We consider this truncation/loss of info
@@ -185,7 +190,7 @@ class ContextSynthesizer:
         if callees:
              rel_sections.append((self._format_callees(callees), [c.id for c in callees]))
              
-        if entity.kind in {EntityKind.CLASS, EntityKind.MODULE, EntityKind.DOCUMENT}:
+        if entity.kind in CONTAINER_KINDS:
             children = self.store.get_children(entity_id)
             if children:
                 rel_sections.append((self._format_children(children), [c.id for c in children]))
@@ -204,7 +209,7 @@ class ContextSynthesizer:
         context_text = "\n\n---\n\n".join(sections)
         
         # Check if we skipped source code but had it
-        if entity.source_code and "## Source Code" not in context_text:
+        if entity.source_code and not code_included:
              is_truncated = True
 
         return ContextBundle(
@@ -262,8 +267,7 @@ class ContextSynthesizer:
         """Format children section."""
         lines = ["## Contains", ""]
         for child in children[:15]:  # Limit to 15
-            kind = child.kind.value
-            lines.append(f"- [{kind}] `{child.name}`")
+            lines.append(f"- [{child.kind.value}] `{child.name}`")
         if len(children) > 15:
             lines.append(f"- ... and {len(children) - 15} more")
         return "\n".join(lines)
@@ -378,7 +382,7 @@ class ContextSynthesizer:
         if callees:
             content_sections["callees"] = self._format_callees(callees)
             
-        if entity.kind in {EntityKind.CLASS, EntityKind.MODULE, EntityKind.DOCUMENT}:
+        if entity.kind in CONTAINER_KINDS:
             children = self.store.get_children(entity_id)
             if children:
                 content_sections["children"] = self._format_children(children)
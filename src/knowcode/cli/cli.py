@@ -1,6 +1,8 @@
 """CLI interface for KnowCode."""
 
+import asyncio
 import json
+import os
 import sys
 from pathlib import Path
 from typing import Any, Optional
@@ -43,7 +45,26 @@ def cli() -> None:
     type=click.Path(exists=True, dir_okay=False),
     help="Path to Cobertura XML coverage report.",
 )
-def analyze(directory: str, output: str, ignore: tuple[str, ...], temporal: bool, coverage: Optional[str]) -> None:
+@click.option(
+    "--lazy-source/--inline-source",
+    default=False,
+    help="Store source code by file location instead of inline (smaller store; needs the sources at query time).",
+)
+@click.option(
+    "--jobs", "-j",
+    type=click.IntRange(min=1),
+    default=None,
+    help="Processes used to parse files (default: one per CPU).",
+)
+def analyze(
+    directory: str,
+    output: str,
+    ignore: tuple[str, ...],
+    temporal: bool,
+    coverage: Optional[str],
+    lazy_source: bool,
+    jobs: Optional[int],
+) -> None:
     """Scan and analyze a codebase.
 
     DIRECTORY: Path to the codebase to analyze.
@@ -60,6 +81,8 @@ def analyze(directory: str, output: str, ignore: tuple[str, ...], temporal: bool
         ignore=list(ignore),
         temporal=temporal,
         coverage=coverage,
+        lazy_source=lazy_source,
+        parse_workers=jobs or os.cpu_count() or 1,
     )
 
     click.echo("\n✓ Analysis complete!")
@@ -91,7 +114,13 @@ def analyze(directory: str, output: str, ignore: tuple[str, ...], temporal: bool
     type=click.Path(exists=True, dir_okay=False),
     help="Path to configuration file (aimodels.yaml) for embedding models.",
 )
-def index(directory: str, output: str, config: Optional[str]) -> None:
+@click.option(
+    "--jobs", "-j",
+    type=click.IntRange(min=1),
+    default=None,
+    help="Processes used to parse files (default: one per CPU).",
+)
+def index(directory: str, output: str, config: Optional[str], jobs: Optional[int]) -> None:
     """Build semantic search index for a codebase.
 
     DIRECTORY: Path to the codebase to index.
@@ -99,16 +128,22 @@ def index(directory: str, output: str, config: Optional[str]) -> None:
     from knowcode.config import AppConfig
     from knowcode.llm.embedding import create_embedding_provider
     from knowcode.indexing.indexer import Indexer
+    from knowcode.indexing.parse_cache import PARSE_CACHE_FILENAME, ParseCache
 
     click.echo(f"Indexing: {directory}")
 
     try:
         app_config = AppConfig.load(config)
         provider = create_embedding_provider(app_config=app_config)
-        indexer = Indexer(provider)
+        parse_cache = ParseCache(Path(output) / PARSE_CACHE_FILENAME)
+        indexer = Indexer(
+            provider, parse_cache=parse_cache, parse_workers=jobs or os.cpu_count() or 1
+        )
+        indexer.load_embedding_cache(output)
 
         count = indexer.index_directory(directory)
         indexer.save(output)
+        parse_cache.close()
 
         click.echo(f"✓ Indexing complete! Created {count} chunks.")
         click.echo(f"  Saved to: {output}")
@@ -516,8 +551,17 @@ def ask(query_text: tuple[str], store: str, config: Optional[str]) -> None:
         agent = Agent(service, config=app_config)
         
         click.echo(f"🤔 Asking KnowCode: '{question}'...")
-        answer = agent.answer(question)
-        click.echo("\n" + answer)
+
+        async def stream_answer() -> None:
+            try:
+                click.echo()
+                async for piece in agent.answer_stream(question):
+                    click.echo(piece, nl=False)
+                click.echo()
+            finally:
+                await agent.aclose()
+
+        asyncio.run(stream_answer())
     except ValueError as e:
         click.echo(f"Error: {e}", err=True)
         sys.exit(1)
@@ -526,6 +570,75 @@ def ask(query_text: tuple[str], store: str, config: Optional[str]) -> None:
         sys.exit(1)
 
 
+@cli.command("ask-many")
+@click.argument("questions_file", type=click.File("r", encoding="utf-8"))
+@click.option(
+    "--store", "-s",
+    type=click.Path(exists=True),
+    default=".",
+    help="Path to knowledge store file or directory",
+)
+@click.option(
+    "--config", "-c",
+    type=click.Path(exists=True, dir_okay=False),
+    help="Path to configuration file for model priorities",
+)
+@click.option(
+    "--batch-api",
+    is_flag=True,
+    help="Submit to the OpenAI Batch API when the top model is an OpenAI one (cheaper, slower)",
+)
+@click.option(
+    "--batch-timeout",
+    type=click.FloatRange(min=0),
+    default=None,
+    help="Seconds to wait for a batch job before answering directly (default: 30 minutes)",
+)
+def ask_many(
+    questions_file: Any,
+    store: str,
+    config: Optional[str],
+    batch_api: bool,
+    batch_timeout: Optional[float],
+) -> None:
+    """Answer many questions about the codebase using AI.
+
+    QUESTIONS_FILE: File with one question per line ("-" for stdin).
+    """
+    from knowcode.config import AppConfig
+    from knowcode.llm.agent import Agent
+    from knowcode.llm.batch import BATCH_TIMEOUT_SECONDS, BatchProcessor
+
+    questions = [line.strip() for line in questions_file if line.strip()]
+    if not questions:
+        click.echo("No questions given.", err=True)
+        sys.exit(1)
+
+    try:
+        app_config = AppConfig.load(config)
+        service = KnowCodeService(store_path=store, app_config=app_config)
+        agent = Agent(service, config=app_config)
+        processor = BatchProcessor(
+            agent,
+            use_batch_api=batch_api,
+            batch_timeout=BATCH_TIMEOUT_SECONDS if batch_timeout is None else batch_timeout,
+        )
+
+        async def answer_all() -> list[str]:
+            try:
+                return await processor.answer_many(questions)
+            finally:
+                await agent.aclose()
+
+        answers = asyncio.run(answer_all())
+    except Exception as e:
+        click.echo(f"Error: {e}", err=True)
+        sys.exit(1)
+
+    for question, answer in zip(questions, answers):
+        click.echo(f"❓ {question}\n{answer}\n")
+
+
 @cli.command("mcp-server")
 @click.option(
     "--store", "-s",
@@ -25,6 +25,10 @@ class AppConfig:
     embedding_models: list[ModelConfig] = field(default_factory=list)
     reranking_models: list[ModelConfig] = field(default_factory=list)
     sufficiency_threshold: float = 0.8  # For local-first answering
+    response_cache_ttl: int = 3600  # Seconds; 0 disables the LLM response cache
+    semantic_cache_threshold: float = 0.92  # Cosine similarity for paraphrase hits
+    # Seconds before racing the next model; None = from observed latency, 0 = plain failover
+    hedge_delay: Optional[float] = None
 
     @classmethod
     def load(cls, config_path: Optional[str] = None) -> "AppConfig":
@@ -116,6 +120,9 @@ class AppConfig:
             # Load config section
             config_section = data.get("config", {})
             sufficiency_threshold = config_section.get("sufficiency_threshold", 0.8)
+            response_cache_ttl = config_section.get("response_cache_ttl", 3600)
+            semantic_cache_threshold = config_section.get("semantic_cache_threshold", 0.92)
+            hedge_delay = config_section.get("hedge_delay")
             
             if not models:
                 models = cls.default().models
@@ -125,6 +132,9 @@ class AppConfig:
                 embedding_models=embedding_models,
                 reranking_models=reranking_models,
                 sufficiency_threshold=sufficiency_threshold,
+                response_cache_ttl=response_cache_ttl,
+                semantic_cache_threshold=semantic_cache_threshold,
+                hedge_delay=hedge_delay,
             )
         except Exception as e:
             print(f"Warning: Failed to load config from {path}: {e}")
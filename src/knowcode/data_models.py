@@ -1,9 +1,14 @@
 """Data models for KnowCode entities and relationships."""
 
+import sys
 from dataclasses import dataclass, field
 from enum import Enum
 from typing import Optional
 
+# Graph and chunk records are created per entity/chunk, so drop the
+# per-instance __dict__ where the interpreter supports slotted dataclasses.
+_SLOTS = {"slots": True} if sys.version_info >= (3, 10) else {}
+
 
 class EntityKind(str, Enum):
     """Types of code entities tracked by the system.
@@ -59,7 +64,7 @@ class TaskType(str, Enum):
     LOCATE = "locate"      # "Where is X defined?", "Find usages of Y"
     GENERAL = "general"    # Default fallback for unclassified queries
 
-@dataclass
+@dataclass(**_SLOTS)
 class Location:
     """Source location of an entity."""
 
@@ -69,8 +74,18 @@ class Location:
     column_start: int = 0
     column_end: int = 0
 
+    def to_dict(self) -> dict[str, object]:
+        """Return the location as a plain dict (faster than dataclasses.asdict)."""
+        return {
+            "file_path": self.file_path,
+            "line_start": self.line_start,
+            "line_end": self.line_end,
+            "column_start": self.column_start,
+            "column_end": self.column_end,
+        }
+
 
-@dataclass
+@dataclass(**_SLOTS)
 class Entity:
     """A code entity (function, class, module, etc.)."""
 
@@ -97,7 +112,7 @@ class Entity:
         return self.id == other.id
 
 
-@dataclass
+@dataclass(**_SLOTS)
 class Relationship:
     """A relationship between two entities."""
 
@@ -119,7 +134,7 @@ class Relationship:
         )
 
 
-@dataclass
+@dataclass(**_SLOTS)
 class ParseResult:
     """Result from parsing a single file."""
 
@@ -129,7 +144,7 @@ class ParseResult:
     errors: list[str] = field(default_factory=list)
 
 
-@dataclass
+@dataclass(**_SLOTS)
 class ChunkingConfig:
     """Configuration for code chunking."""
 
@@ -139,7 +154,7 @@ class ChunkingConfig:
     include_docstrings: bool = True
 
 
-@dataclass
+@dataclass(**_SLOTS)
 class CodeChunk:
     """A chunk of code for indexing and retrieval."""
 
@@ -151,12 +166,14 @@ class CodeChunk:
     metadata: dict[str, str] = field(default_factory=dict)
 
 
-@dataclass
+@dataclass(**_SLOTS)
 class EmbeddingConfig:
     """Configuration for embedding generation."""
 
     provider: str = "voyageai"
     model_name: str = "voyage-code-3"
     dimension: int = 1024
+    # Texts per provider call. The indexer groups chunks of similar length
+    # into each batch; this does not change the vectors that are returned.
     batch_size: int = 100
     normalize: bool = True  # Normalize vectors for cosine similarity
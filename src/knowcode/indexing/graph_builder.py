@@ -1,23 +1,90 @@
 """Graph builder that orchestrates parsing and constructs the semantic graph."""
 
 from __future__ import annotations
+import sys
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
-from typing import Optional
+from typing import Iterator, Optional
 
-from knowcode.data_models import Entity, ParseResult, Relationship
+from knowcode.data_models import Entity, EntityKind, ParseResult, Relationship, RelationshipKind
 from knowcode.parsers import MarkdownParser, PythonParser, YamlParser
 from knowcode.parsers.javascript_parser import JavaScriptParser
 from knowcode.parsers.java_parser import JavaParser
+from knowcode.indexing.parse_cache import ParseCache, content_digest
 from knowcode.indexing.scanner import FileInfo, Scanner
 from knowcode.analysis.signals import CoverageProcessor
 from knowcode.analysis.temporal import TemporalAnalyzer
 
 
+# Metadata values up to this length (kinds, flags, levels) are interned;
+# longer ones, such as value previews, are mostly unique
+INTERNED_METADATA_VALUE_LEN = 32
+# Fewer files than this to parse are parsed in-process: starting worker
+# processes costs more than it saves
+PARALLEL_PARSE_MIN_FILES = 64
+# Files sent to a parser process per round trip
+PARALLEL_PARSE_CHUNKSIZE = 32
+
+
+def intern_metadata(metadata: dict[str, str]) -> dict[str, str]:
+    """Return metadata with its keys and short string values interned.
+
+    The same few keys and values repeat across thousands of entities and
+    relationships; interning stores each distinct string once.
+    """
+    if not metadata:
+        return metadata
+    return {
+        sys.intern(k): (
+            sys.intern(v) if isinstance(v, str) and len(v) <= INTERNED_METADATA_VALUE_LEN else v
+        )
+        for k, v in metadata.items()
+    }
+
+
+def _intern_entity(entity: Entity) -> None:
+    """Intern an entity's repeated strings so equal values share one object.
+
+    Entity ids, names and file paths reappear in relationships and in many
+    sibling entities; interning keeps a single copy of each.
+    """
+    entity.id = sys.intern(entity.id)
+    entity.name = sys.intern(entity.name)
+    entity.qualified_name = sys.intern(entity.qualified_name)
+    entity.location.file_path = sys.intern(entity.location.file_path)
+    entity.metadata = intern_metadata(entity.metadata)
+
+
+# Parsers of a worker process, created on its first file
+_worker_builder: Optional["GraphBuilder"] = None
+
+
+def _parse_in_worker(file_info: FileInfo) -> ParseResult:
+    """Parse one file in a worker process of GraphBuilder.build_from_files."""
+    global _worker_builder
+    if _worker_builder is None:
+        _worker_builder = GraphBuilder()
+    return _worker_builder._parse_source(file_info)
+
+
 class GraphBuilder:
     """Builds semantic graph from source files."""
 
-    def __init__(self) -> None:
-        """Initialize the graph builder with parsers."""
+    def __init__(
+        self,
+        parse_cache: Optional[ParseCache] = None,
+        parse_workers: int = 1,
+    ) -> None:
+        """Initialize the graph builder with parsers.
+
+        Args:
+            parse_cache: Persistent cache consulted before parsing a file;
+                unchanged files are then not parsed again across runs.
+            parse_workers: Processes used to parse files in parallel when
+                building from many files; 1 parses in this process.
+        """
+        self.parse_cache = parse_cache
+        self.parse_workers = parse_workers
         self.python_parser = PythonParser()
         self.markdown_parser = MarkdownParser()
         self.yaml_parser = YamlParser()
@@ -28,6 +95,20 @@ class GraphBuilder:
         self.relationships: list[Relationship] = []
         self.errors: list[str] = []
 
+        # Per-file parse results, kept so consumers such as the Indexer can
+        # chunk files without parsing them a second time.
+        self.parse_results: dict[str, ParseResult] = {}
+
+        # Name lookup indexes, maintained as entities are merged so that
+        # reference resolution does not rescan every entity per lookup.
+        self._by_name: dict[str, list[str]] = {}
+        self._by_qualname: dict[str, str] = {}
+        self._by_suffix: dict[str, list[str]] = {}
+        self._lowered_names: dict[str, tuple[str, str]] = {}
+        self._by_kind: dict[EntityKind, list[str]] = {}
+        self._index_stale = False
+        self._rel_kind_counts: dict[RelationshipKind, int] = {}
+
     def build_from_directory(
         self,
         root_dir: str | Path,
@@ -78,16 +159,81 @@ class GraphBuilder:
         Returns:
             Self for method chaining.
         """
-        for file_info in files:
-            parse_result = self._parse_file(file_info)
+        for file_info, parse_result in zip(files, self._parse_files(files)):
+            self.parse_results[str(file_info.path)] = parse_result
             self._merge_result(parse_result)
+        if self.parse_cache is not None:
+            self.parse_cache.commit()
 
         # Resolve references after all files are parsed
         self._resolve_references()
 
         return self
 
+    def _parse_files(self, files: list[FileInfo]) -> list[ParseResult]:
+        """Parse files in order, in worker processes if there are enough of them."""
+        if self.parse_workers <= 1 or len(files) < PARALLEL_PARSE_MIN_FILES:
+            return [self._parse_file(file_info) for file_info in files]
+
+        lookups = [self._cache_lookup(file_info) for file_info in files]
+        misses = [f for f, (cached, _) in zip(files, lookups) if cached is None]
+        if len(misses) < PARALLEL_PARSE_MIN_FILES:
+            return self._fill_misses(files, lookups, map(self._parse_source, misses))
+
+        with ProcessPoolExecutor(max_workers=self.parse_workers) as pool:
+            parsed = pool.map(_parse_in_worker, misses, chunksize=PARALLEL_PARSE_CHUNKSIZE)
+            return self._fill_misses(files, lookups, parsed)
+
+    def _fill_misses(
+        self,
+        files: list[FileInfo],
+        lookups: list[tuple[Optional[ParseResult], Optional[bytes]]],
+        parsed: Iterator[ParseResult],
+    ) -> list[ParseResult]:
+        """Combine cached results with fresh ones, caching the fresh ones."""
+        results = []
+        for file_info, (result, digest) in zip(files, lookups):
+            if result is None:
+                result = next(parsed)
+                self._cache_store(file_info, digest, result)
+            results.append(result)
+        return results
+
     def _parse_file(self, file_info: FileInfo) -> ParseResult:
+        """Parse a single file, reusing its cached result if unchanged."""
+        result, digest = self._cache_lookup(file_info)
+        if result is None:
+            result = self._parse_source(file_info)
+            self._cache_store(file_info, digest, result)
+        return result
+
+    def _cache_lookup(
+        self, file_info: FileInfo
+    ) -> tuple[Optional[ParseResult], Optional[bytes]]:
+        """Return a file's cached parse result, if any, and its content digest.
+
+        The digest is None when the file's result is not to be cached.
+        """
+        if self.parse_cache is None or file_info.extension not in Scanner.SUPPORTED_EXTENSIONS:
+            return None, None
+        try:
+            digest = content_digest(file_info.path.read_bytes())
+        except OSError:
+            # Let the parser report the read error
+            return None, None
+        return self.parse_cache.get(str(file_info.path), digest), digest
+
+    def _cache_store(
+        self, file_info: FileInfo, digest: Optional[bytes], result: ParseResult
+    ) -> None:
+        """Cache a freshly parsed result.
+
+        Called before merging: merging rewrites relationship targets in place.
+        """
+        if self.parse_cache is not None and digest is not None:
+            self.parse_cache.put(str(file_info.path), digest, result)
+
+    def _parse_source(self, file_info: FileInfo) -> ParseResult:
         """Parse a single file based on its extension."""
         if file_info.extension == ".py":
             return self.python_parser.parse_file(file_info.path)
@@ -110,9 +256,19 @@ class GraphBuilder:
     def _merge_result(self, result: ParseResult) -> None:
         """Merge parse result into the graph."""
         for entity in result.entities:
+            _intern_entity(entity)
+            if entity.id in self.entities:
+                # Replaced entity: its old index entries must be dropped
+                self._index_stale = True
             self.entities[entity.id] = entity
+            self._index_entity(entity)
 
         self.relationships.extend(result.relationships)
+        for rel in result.relationships:
+            rel.source_id = sys.intern(rel.source_id)
+            rel.target_id = sys.intern(rel.target_id)
+            rel.metadata = intern_metadata(rel.metadata)
+            self._rel_kind_counts[rel.kind] = self._rel_kind_counts.get(rel.kind, 0) + 1
         self.errors.extend(result.errors)
 
     def _resolve_references(self) -> None:
@@ -120,44 +276,67 @@ class GraphBuilder:
         
         Some parsers (like Tree-sitter) may produce relationships pointing to 
         'ref::SomeName' because they don't know the full qualified name at parse time.
-        This pass iterates through all relationships and attempts to link these 
-        placeholders to concrete Entity IDs in the graph.
+        This pass finds those placeholders and links them, in place, to
+        concrete Entity IDs in the graph.
         """
-        resolved_relationships: list[Relationship] = []
-
-        for rel in self.relationships:
-            # Check if target is a reference that needs resolution
-            if rel.target_id.startswith("ref::"):
-                ref_name = rel.target_id[5:]  # Remove "ref::" prefix
-                resolved_id = self._find_entity_by_name(ref_name)
-                if resolved_id:
-                    resolved_relationships.append(
-                        Relationship(
-                            source_id=rel.source_id,
-                            target_id=resolved_id,
-                            kind=rel.kind,
-                            metadata=rel.metadata,
-                        )
-                    )
-                else:
-                    # Keep as unresolved reference
-                    resolved_relationships.append(rel)
-            else:
-                resolved_relationships.append(rel)
-
-        self.relationships = resolved_relationships
+        unresolved = [r for r in self.relationships if r.target_id.startswith("ref::")]
+        if not unresolved:
+            return
+
+        self._ensure_name_index()
+        for rel in unresolved:
+            ref_name = rel.target_id[5:]  # Remove "ref::" prefix
+            resolved_id = self._find_entity_by_name(ref_name)
+            # Unresolved references keep their "ref::" placeholder
+            if resolved_id:
+                rel.target_id = resolved_id
+
+    def _index_entity(self, entity: Entity) -> None:
+        """Register an entity in the name and kind lookup indexes."""
+        self._by_name.setdefault(entity.name, []).append(entity.id)
+        self._by_qualname.setdefault(entity.qualified_name, entity.id)
+
+        # Every tail after a "." is a valid short reference, e.g.
+        # "pkg.Cls.method" can be referenced as "Cls.method" or "method".
+        parts = entity.qualified_name.split(".")
+        for i in range(1, len(parts)):
+            self._by_suffix.setdefault(".".join(parts[i:]), []).append(entity.id)
+
+        self._lowered_names[entity.id] = (
+            entity.name.lower(),
+            entity.qualified_name.lower(),
+        )
+        self._by_kind.setdefault(entity.kind, []).append(entity.id)
+
+    def _ensure_name_index(self) -> None:
+        """Rebuild the lookup indexes if entities were assigned or replaced directly."""
+        if not self._index_stale and self._lowered_names.keys() == self.entities.keys():
+            return
+
+        self._by_name = {}
+        self._by_qualname = {}
+        self._by_suffix = {}
+        self._lowered_names = {}
+        self._by_kind = {}
+        self._index_stale = False
+        for entity in self.entities.values():
+            self._index_entity(entity)
 
     def _find_entity_by_name(self, name: str) -> Optional[str]:
         """Find entity ID by name or qualified name."""
-        # Exact match on name or qualified_name
-        for entity_id, entity in self.entities.items():
-            if entity.name == name or entity.qualified_name == name:
-                return entity_id
+        # Exact match on qualified_name, then on short name
+        entity_id = self._by_qualname.get(name)
+        if entity_id is not None:
+            return entity_id
+
+        ids = self._by_name.get(name)
+        if ids:
+            return ids[0]
 
         # Try matching the last part of qualified names
-        for entity_id, entity in self.entities.items():
-            if entity.qualified_name.endswith(f".{name}"):
-                return entity_id
+        ids = self._by_suffix.get(name)
+        if ids:
+            return ids[0]
 
         return None
 
@@ -167,7 +346,12 @@ class GraphBuilder:
 
     def get_entities_by_kind(self, kind: str) -> list[Entity]:
         """Get all entities of a specific kind."""
-        return [e for e in self.entities.values() if e.kind.value == kind]
+        self._ensure_name_index()
+        try:
+            entity_kind = EntityKind(kind)
+        except ValueError:
+            return []
+        return [self.entities[eid] for eid in self._by_kind.get(entity_kind, [])]
 
     def get_outgoing_relationships(self, entity_id: str) -> list[Relationship]:
         """Get all relationships where entity is the source."""
@@ -179,24 +363,26 @@ class GraphBuilder:
 
     def search_entities(self, pattern: str) -> list[Entity]:
         """Search entities by name pattern (case-insensitive substring)."""
+        self._ensure_name_index()
         pattern_lower = pattern.lower()
+        lowered = self._lowered_names
         return [
-            e for e in self.entities.values()
-            if pattern_lower in e.name.lower()
-            or pattern_lower in e.qualified_name.lower()
+            e for eid, e in self.entities.items()
+            if pattern_lower in lowered[eid][0]
+            or pattern_lower in lowered[eid][1]
         ]
 
     def stats(self) -> dict[str, int]:
         """Return statistics about the graph."""
-        kind_counts: dict[str, int] = {}
-        for entity in self.entities.values():
-            kind = entity.kind.value
-            kind_counts[kind] = kind_counts.get(kind, 0) + 1
-
-        rel_counts: dict[str, int] = {}
-        for rel in self.relationships:
-            kind = rel.kind.value
-            rel_counts[kind] = rel_counts.get(kind, 0) + 1
+        self._ensure_name_index()
+        kind_counts = {k.value: len(ids) for k, ids in self._by_kind.items()}
+
+        # Relationships assigned directly bypass the counters; recount them.
+        if sum(self._rel_kind_counts.values()) != len(self.relationships):
+            self._rel_kind_counts = {}
+            for rel in self.relationships:
+                self._rel_kind_counts[rel.kind] = self._rel_kind_counts.get(rel.kind, 0) + 1
+        rel_counts = {k.value: n for k, n in self._rel_kind_counts.items()}
 
         return {
             "total_entities": len(self.entities),
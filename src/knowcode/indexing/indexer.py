@@ -2,19 +2,34 @@
 
 from __future__ import annotations
 
+import hashlib
 from pathlib import Path
-from typing import Optional, Any
+from typing import Any, Iterable, Optional
 
+import numpy as np
+
+from knowcode.data_models import CodeChunk
 from knowcode.storage.chunk_repository import InMemoryChunkRepository
 from knowcode.indexing.chunker import Chunker
 from knowcode.llm.embedding import EmbeddingProvider
 from knowcode.indexing.graph_builder import GraphBuilder
-from knowcode.indexing.scanner import Scanner
+from knowcode.indexing.parse_cache import ParseCache
+from knowcode.indexing.scanner import FileInfo
 from knowcode.storage.vector_store import VectorStore
 from knowcode.utils.logger import get_logger
+from knowcode.utils.serialization import iter_ndjson, read_json, write_ndjson
 
 logger = get_logger(__name__)
 
+EMBEDDING_CACHE_FILENAME = "embedding_cache.npz"
+CHUNKS_FILENAME = "chunks.ndjson"
+LEGACY_CHUNKS_FILENAME = "chunks.json"
+
+
+def _content_key(content: str) -> bytes:
+    """Return the embedding cache key for a chunk's content."""
+    return hashlib.blake2b(content.encode("utf-8"), digest_size=16).digest()
+
 
 class Indexer:
     """Orchestrates scan -> chunk -> embed -> index pipeline."""
@@ -24,6 +39,8 @@ class Indexer:
         embedding_provider: EmbeddingProvider,
         chunk_repo: Optional[InMemoryChunkRepository] = None,
         vector_store: Optional[VectorStore] = None,
+        parse_cache: Optional[ParseCache] = None,
+        parse_workers: int = 1,
     ) -> None:
         """Initialize an indexer with optional storage backends.
 
@@ -31,12 +48,20 @@ class Indexer:
             embedding_provider: Provider used to generate chunk embeddings.
             chunk_repo: Optional chunk repository (defaults to in-memory).
             vector_store: Optional vector store (defaults to FAISS-backed store).
+            parse_cache: Optional persistent cache of per-file parse results.
+            parse_workers: Processes used to parse files in index_directory().
         """
         self.embedding_provider = embedding_provider
         self.chunk_repo = chunk_repo or InMemoryChunkRepository()
         self.vector_store = vector_store or VectorStore(dimension=embedding_provider.config.dimension)
         self.chunker = Chunker()
+        self.parse_cache = parse_cache
+        self.parse_workers = parse_workers
         self.manifest: dict[str, Any] = {}
+        # content hash -> embedding, reused across runs to skip re-embedding
+        self._embed_cache: dict[bytes, np.ndarray] = {}
+        # Parsers for index_file(), created on first use and then reused
+        self._graph_builder: Optional[GraphBuilder] = None
 
     def index_directory(self, root_dir: str | Path) -> int:
         """Index all supported files under a directory.
@@ -49,39 +74,118 @@ class Indexer:
         """
         root_path = Path(root_dir)
         
-        # Use existing GraphBuilder to get semantic entities
-        builder = GraphBuilder()
+        # Use existing GraphBuilder to get semantic entities; its per-file
+        # parse results are reused for chunking so each file is parsed once.
+        builder = GraphBuilder(parse_cache=self.parse_cache, parse_workers=self.parse_workers)
         builder.build_from_directory(root_path)
-        
-        # Extract files from scanner
-        scanner = Scanner(root_path)
-        files = scanner.scan_all()
-        
-        total_chunks = 0
-        for file_info in files:
-            # Build ParseResult-like data or use parser directly
-            # For simplicity in this Task, we use the Chunker which can take a ParseResult or we can adapt it.
-            # I'll use the graph builder's internal logic or build the parse results first.
-            
-            # Re-parse file to get entities (ideally we reuse builder.entities but we need them per file)
-            # For now, let's assume we use the PythonParser etc via a helper
-            parse_result = builder._parse_file(file_info)
-            chunks = self.chunker.process_parse_result(parse_result)
-            
-            if not chunks:
+
+        all_chunks: list[CodeChunk] = []
+        for parse_result in builder.parse_results.values():
+            all_chunks.extend(self.chunker.process_parse_result(parse_result))
+
+        # Embed across file boundaries so each provider call carries a full batch
+        return self._embed_and_store(all_chunks)
+
+    def _embed_and_store(self, chunks: list[CodeChunk]) -> int:
+        """Embed chunks in provider-sized batches and add them to the indexes.
+
+        Chunks whose content is already in the embedding cache are not sent
+        to the provider, and duplicate contents are embedded once. The rest
+        are grouped by content length before batching so that each batch
+        holds similarly sized inputs (less padding for local models, tighter
+        token budgets for remote APIs). Batches are sent concurrently.
+
+        Args:
+            chunks: Chunks to embed; vectors are stored in the vector store.
+
+        Returns:
+            Number of chunks that received an embedding and were stored.
+        """
+        keys = [_content_key(c.content) for c in chunks]
+
+        # First chunk index for every content hash that still needs embedding
+        pending: dict[bytes, int] = {}
+        for i, key in enumerate(keys):
+            if key not in self._embed_cache and key not in pending:
+                pending[key] = i
+
+        batch_size = max(1, self.embedding_provider.config.batch_size)
+        order = sorted(pending.values(), key=lambda i: len(chunks[i].content))
+
+        if order:
+            embeddings = self.embedding_provider.embed_many(
+                [chunks[i].content for i in order], batch_size=batch_size
+            )
+            for i, emb in zip(order, embeddings):
+                self._embed_cache[keys[i]] = emb
+
+        stored: list[CodeChunk] = []
+        stored_embeddings: list[np.ndarray] = []
+        for chunk, key in zip(chunks, keys):
+            emb = self._embed_cache.get(key)
+            if emb is None:
                 continue
-                
-            # Process embeddings in batches
-            contents = [c.content for c in chunks]
-            embeddings = self.embedding_provider.embed(contents)
-            
-            for chunk, emb in zip(chunks, embeddings):
-                chunk.embedding = emb
-                self.chunk_repo.add(chunk)
-                self.vector_store.add(chunk.id, emb)
-                total_chunks += 1
-                
-        return total_chunks
+            stored.append(chunk)
+            stored_embeddings.append(emb)
+        if not stored:
+            return 0
+
+        # Vectors live in the vector store; the chunk repository keeps only text
+        self.chunk_repo.add_many(stored)
+        self.vector_store.add_many([c.id for c in stored], np.vstack(stored_embeddings))
+        return len(stored)
+
+    def _embedding_signature(self) -> str:
+        """Identify the embedding model that produced cached vectors."""
+        cfg = self.embedding_provider.config
+        return f"{cfg.provider}:{cfg.model_name}:{cfg.dimension}:{cfg.normalize}"
+
+    def save_embedding_cache(self, path: str | Path) -> None:
+        """Persist the content-hash embedding cache.
+
+        Args:
+            path: Index directory to write the cache file into.
+        """
+        # Only keep entries for chunks that are still indexed
+        live_keys = {_content_key(c.content) for c in self.chunk_repo._chunks.values()}
+        entries = [(k, v) for k, v in self._embed_cache.items() if k in live_keys]
+        if not entries:
+            return
+
+        keys = np.frombuffer(b"".join(k for k, _ in entries), dtype=np.uint8).reshape(-1, 16)
+        vectors = np.asarray([v for _, v in entries], dtype=np.float32)
+        np.savez(
+            Path(path) / EMBEDDING_CACHE_FILENAME,
+            keys=keys,
+            vectors=vectors,
+            signature=np.array(self._embedding_signature()),
+        )
+
+    def load_embedding_cache(self, path: str | Path) -> None:
+        """Load a previously saved embedding cache, if compatible.
+
+        Caches written for a different embedding model or configuration
+        are ignored.
+
+        Args:
+            path: Index directory containing the cache file.
+        """
+        cache_file = Path(path) / EMBEDDING_CACHE_FILENAME
+        if not cache_file.exists():
+            return
+
+        try:
+            with np.load(cache_file, allow_pickle=False) as data:
+                if str(data["signature"]) != self._embedding_signature():
+                    return
+                keys = data["keys"]
+                vectors = data["vectors"]
+        except (OSError, KeyError, ValueError) as e:
+            logger.warning(f"Ignoring unreadable embedding cache {cache_file}: {e}")
+            return
+
+        for key, vec in zip(keys, vectors):
+            self._embed_cache[key.tobytes()] = vec
 
     def save(self, path: str | Path) -> None:
         """Persist vector index and chunk metadata to disk.
@@ -95,10 +199,10 @@ class Indexer:
         # Save vector store
         self.vector_store.save(path / "vectors")
         
-        # Save chunk metadata (BM25 tokens and content)
-        import json
-        metadata = {
-            "chunks": [
+        # Stream chunk metadata (BM25 tokens and content), one chunk per line
+        write_ndjson(
+            path / CHUNKS_FILENAME,
+            (
                 {
                     "id": c.id,
                     "entity_id": c.entity_id,
@@ -107,12 +211,15 @@ class Indexer:
                     "metadata": c.metadata
                 }
                 for c in self.chunk_repo._chunks.values()
-            ]
-        }
-        with open(path / "chunks.json", "w") as f:
-            json.dump(metadata, f)
+            ),
+        )
+        legacy_chunks = path / LEGACY_CHUNKS_FILENAME
+        if legacy_chunks.exists():
+            legacy_chunks.unlink()
+        self.save_embedding_cache(path)
 
         # Save index manifest for compatibility checks at query time.
+        import json
         from dataclasses import asdict
         import time
 
@@ -135,6 +242,7 @@ class Indexer:
         
         # Load vector store
         self.vector_store.load(path / "vectors")
+        self.load_embedding_cache(path)
         
         # Load manifest (optional, for compatibility checks).
         import json
@@ -143,16 +251,17 @@ class Indexer:
             with open(manifest_file, "r", encoding="utf-8") as f:
                 self.manifest = json.load(f)
 
-        # Load chunks
-        from knowcode.models import CodeChunk
-        
-        chunks_file = path / "chunks.json"
+        # Load chunks (indexes saved before NDJSON used a single JSON document)
+        chunks_file = path / CHUNKS_FILENAME
+        legacy_chunks = path / LEGACY_CHUNKS_FILENAME
         if chunks_file.exists():
-            with open(chunks_file) as f:
-                data = json.load(f)
-                for c_data in data["chunks"]:
-                    chunk = CodeChunk(**c_data)
-                    self.chunk_repo.add(chunk)
+            records: Iterable[dict[str, Any]] = iter_ndjson(chunks_file)
+        elif legacy_chunks.exists():
+            records = read_json(legacy_chunks)["chunks"]
+        else:
+            records = ()
+        for c_data in records:
+            self.chunk_repo.add(CodeChunk(**c_data))
                     
     def index_file(self, file_path: str | Path) -> int:
         """Index a single file for incremental updates.
@@ -164,18 +273,13 @@ class Indexer:
             Number of chunks created for the file.
         """
         file_path = Path(file_path)
-        # Simplified for Task 3.6
-        builder = GraphBuilder()
-        from knowcode.indexing.scanner import FileInfo
-        file_info = FileInfo(file_path, str(file_path), file_path.suffix, file_path.stat().st_size)
-        parse_result = builder._parse_file(file_info)
+        if self._graph_builder is None:
+            self._graph_builder = GraphBuilder(parse_cache=self.parse_cache)
+        # Only the path and extension are used for dispatch; skip the stat() call
+        file_info = FileInfo(file_path, str(file_path), file_path.suffix, 0)
+        parse_result = self._graph_builder._parse_file(file_info)
+        if self.parse_cache is not None:
+            self.parse_cache.commit()
         chunks = self.chunker.process_parse_result(parse_result)
         
-        if chunks:
-            contents = [c.content for c in chunks]
-            embeddings = self.embedding_provider.embed(contents)
-            for chunk, emb in zip(chunks, embeddings):
-                chunk.embedding = emb
-                self.chunk_repo.add(chunk)
-                self.vector_store.add(chunk.id, emb)
-        return len(chunks)
+        return self._embed_and_store(chunks)
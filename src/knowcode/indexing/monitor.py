@@ -2,6 +2,8 @@
 
 from __future__ import annotations
 
+import os
+import threading
 from pathlib import Path
 from typing import Optional, TYPE_CHECKING
 
@@ -15,6 +17,17 @@ except ImportError:
 if TYPE_CHECKING:
     from knowcode.indexing.background_indexer import BackgroundIndexer
 
+# Quiet period after the last change before files are queued; editors emit
+# several events (write, rename, chmod) for a single save
+DEBOUNCE_SECONDS = 0.1
+# Checked on the raw event path, before any Path object is built
+_SOURCE_SUFFIXES = (".py", ".js", ".ts", ".java", ".md", ".yml", ".yaml")
+# Directories the scanner always ignores, matched below the watched root;
+# bursts such as git checkouts or package installs happen inside them
+_SKIPPED_DIRS = tuple(
+    f"{os.sep}{name}{os.sep}" for name in (".git", "__pycache__", "node_modules", ".venv", "venv")
+)
+
 
 class FileMonitor:
     """Watches for file changes to trigger re-indexing."""
@@ -29,6 +42,7 @@ class FileMonitor:
         self.root_dir = Path(root_dir)
         self.background_indexer = background_indexer
         self.observer = None
+        self._handler: Optional[IndexingHandler] = None
 
     def start(self) -> None:
         """Start watching the directory for changes."""
@@ -36,9 +50,9 @@ class FileMonitor:
             print("watchdog not installed. Watch mode disabled.")
             return
 
-        event_handler = IndexingHandler(self.background_indexer)
+        self._handler = IndexingHandler(self.background_indexer, root_dir=self.root_dir)
         self.observer = Observer()
-        self.observer.schedule(event_handler, str(self.root_dir), recursive=True)
+        self.observer.schedule(self._handler, str(self.root_dir), recursive=True)
         self.observer.start()
 
     def stop(self) -> None:
@@ -46,18 +60,36 @@ class FileMonitor:
         if self.observer:
             self.observer.stop()
             self.observer.join()
+        if self._handler:
+            self._handler.flush()
 
 
 class IndexingHandler(FileSystemEventHandler):
     """Handles file system events for indexing."""
 
-    def __init__(self, background_indexer: Optional["BackgroundIndexer"]) -> None:
+    def __init__(
+        self,
+        background_indexer: Optional["BackgroundIndexer"],
+        debounce_seconds: float = DEBOUNCE_SECONDS,
+        root_dir: Optional[str | Path] = None,
+    ) -> None:
         """Initialize the handler with an optional background indexer.
 
         Args:
             background_indexer: Worker responsible for indexing changed files.
+            debounce_seconds: Quiet period during which further events for
+                changed files are merged into one indexing request.
+            root_dir: Watched directory, as given to the observer. Ignored
+                directories are only matched below it; without it, no
+                directories are skipped.
         """
         self.background_indexer = background_indexer
+        self._root = str(root_dir).rstrip(os.sep) if root_dir is not None else None
+        self.debounce_seconds = debounce_seconds
+        # Changed files waiting for the quiet period to end, in event order
+        self._pending: dict[Path, None] = {}
+        self._timer: Optional[threading.Timer] = None
+        self._lock = threading.Lock()
 
     def on_modified(self, event):
         """Handle modified file events."""
@@ -70,9 +102,32 @@ class IndexingHandler(FileSystemEventHandler):
             self._handle_change(event.src_path)
 
     def _handle_change(self, path_str: str) -> None:
-        """Queue a file for indexing if it is a supported source type."""
-        if self.background_indexer:
-            path = Path(path_str)
-            # Basic extension filtering
-            if path.suffix in {".py", ".js", ".ts", ".java", ".md", ".yml", ".yaml"}:
-                self.background_indexer.queue_file(path)
+        """Schedule a file for indexing if it is a supported source type."""
+        if not self.background_indexer or not path_str.endswith(_SOURCE_SUFFIXES):
+            return
+        if self._root is not None and path_str.startswith(self._root):
+            relative = path_str[len(self._root):]
+            if any(skipped in relative for skipped in _SKIPPED_DIRS):
+                return
+
+        path = Path(path_str)
+        with self._lock:
+            self._pending[path] = None
+            # Each event restarts the quiet period, so a burst is queued
+            # once it has been quiet for debounce_seconds
+            if self._timer is not None:
+                self._timer.cancel()
+            self._timer = threading.Timer(self.debounce_seconds, self.flush)
+            self._timer.daemon = True
+            self._timer.start()
+
+    def flush(self) -> None:
+        """Queue every pending file once, ending the current quiet period."""
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            paths = list(self._pending)
+            self._pending.clear()
+        for path in paths:
+            self.background_indexer.queue_file(path)
@@ -0,0 +1,176 @@
+"""Persistent cache of per-file parse results."""
+
+from __future__ import annotations
+
+import hashlib
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Any, Optional
+
+from knowcode import __version__
+from knowcode.data_models import (
+    Entity,
+    EntityKind,
+    Location,
+    ParseResult,
+    Relationship,
+    RelationshipKind,
+)
+from knowcode.utils.logger import get_logger
+from knowcode.utils.serialization import dumps, loads
+
+logger = get_logger(__name__)
+
+PARSE_CACHE_FILENAME = "parse_cache.sqlite"
+# Bump when parsers change what they extract from unchanged source
+PARSE_CACHE_VERSION = 2
+
+
+def content_digest(source: bytes) -> bytes:
+    """Return the cache key for a file's content.
+
+    The package and cache versions are mixed in so that results produced
+    by an older parser never match.
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(f"{__version__}:{PARSE_CACHE_VERSION}\0".encode("utf-8"))
+    digest.update(source)
+    return digest.digest()
+
+
+def _result_to_dict(result: ParseResult) -> dict[str, Any]:
+    """Convert a parse result to JSON-compatible data."""
+    return {
+        "file_path": result.file_path,
+        "entities": [
+            {
+                "id": e.id,
+                "kind": e.kind.value,
+                "name": e.name,
+                "qualified_name": e.qualified_name,
+                "location": e.location.to_dict(),
+                "docstring": e.docstring,
+                "signature": e.signature,
+                "source_code": e.source_code,
+                "metadata": e.metadata,
+            }
+            for e in result.entities
+        ],
+        "relationships": [
+            {
+                "source_id": r.source_id,
+                "target_id": r.target_id,
+                "kind": r.kind.value,
+                "metadata": r.metadata,
+            }
+            for r in result.relationships
+        ],
+        "errors": result.errors,
+    }
+
+
+def _dict_to_result(data: dict[str, Any]) -> ParseResult:
+    """Rebuild a parse result from _result_to_dict() output."""
+    return ParseResult(
+        file_path=data["file_path"],
+        entities=[
+            Entity(
+                id=e["id"],
+                kind=EntityKind(e["kind"]),
+                name=e["name"],
+                qualified_name=e["qualified_name"],
+                location=Location(**e["location"]),
+                docstring=e["docstring"],
+                signature=e["signature"],
+                source_code=e["source_code"],
+                metadata=e["metadata"],
+            )
+            for e in data["entities"]
+        ],
+        relationships=[
+            Relationship(
+                source_id=r["source_id"],
+                target_id=r["target_id"],
+                kind=RelationshipKind(r["kind"]),
+                metadata=r["metadata"],
+            )
+            for r in data["relationships"]
+        ],
+        errors=data["errors"],
+    )
+
+
+class ParseCache:
+    """SQLite store of parse results keyed on (file path, content digest).
+
+    A hit replaces reading the syntax tree and extracting entities with
+    one hash and one indexed lookup, so re-running ``analyze`` or ``index``
+    on a mostly unchanged codebase only parses the files that changed.
+    Only the latest result per file is kept. Results are stored as JSON,
+    so a cache file from an untrusted checkout can at worst yield wrong
+    entities, never run code. Writes are committed by commit().
+    """
+
+    def __init__(self, path: str | Path) -> None:
+        """Open (or create) the cache database.
+
+        Args:
+            path: Database file, or ":memory:" for a process-local cache.
+        """
+        if str(path) != ":memory:":
+            Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(path), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS parse_results ("
+            " path TEXT NOT NULL,"
+            " digest BLOB NOT NULL,"
+            " result BLOB NOT NULL,"
+            " PRIMARY KEY (path, digest))"
+        )
+        self._conn.commit()
+
+    def get(self, file_path: str, digest: bytes) -> Optional[ParseResult]:
+        """Return the cached result for a file's content, if present."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT result FROM parse_results WHERE path = ? AND digest = ?",
+                (file_path, digest),
+            ).fetchone()
+        if row is None:
+            return None
+        try:
+            return _dict_to_result(loads(row[0]))
+        except (ValueError, KeyError, TypeError) as e:
+            logger.warning(f"Ignoring unreadable parse cache entry for {file_path}: {e}")
+            return None
+
+    def put(self, file_path: str, digest: bytes, result: ParseResult) -> None:
+        """Store the result for a file's content, replacing older versions.
+
+        The write becomes durable on the next commit().
+        """
+        blob = dumps(_result_to_dict(result))
+        with self._lock:
+            self._conn.execute(
+                "DELETE FROM parse_results WHERE path = ? AND digest != ?",
+                (file_path, digest),
+            )
+            self._conn.execute(
+                "INSERT OR REPLACE INTO parse_results VALUES (?, ?, ?)",
+                (file_path, digest, blob),
+            )
+
+    def commit(self) -> None:
+        """Commit the results stored since the last commit."""
+        with self._lock:
+            self._conn.commit()
+
+    def close(self) -> None:
+        """Commit pending results and close the database connection."""
+        with self._lock:
+            self._conn.commit()
+            self._conn.close()
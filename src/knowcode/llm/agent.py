@@ -1,77 +1,268 @@
 """Agent module for KnowCode."""
 
+import asyncio
+import functools
+import logging
 import os
-from typing import Optional, Any
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from types import MappingProxyType
+from typing import Any, AsyncIterator, Callable, Iterator, Mapping, NamedTuple, Optional
 
 from google import genai
 from google.api_core.exceptions import ResourceExhausted
+import httpx
 import openai
 
 from knowcode.service import KnowCodeService
 from knowcode.config import AppConfig, ModelConfig
-from knowcode.llm.rate_limiter import RateLimiter
-from knowcode.llm.query_classifier import get_prompt_template
+from knowcode.llm.cache import LLMCache, SQLiteBackend
+from knowcode.llm.circuit_breaker import CircuitBreaker
+from knowcode.llm.latency import LatencyEstimator
+from knowcode.llm.rate_limiter import get_rate_limiter
+from knowcode.llm.query_classifier import classify_query, get_prompt_template
 from knowcode.data_models import TaskType
+from knowcode.storage.knowledge_store import KnowledgeStore
+from knowcode.utils.logger import get_logger
+
+try:
+    import h2  # noqa: F401
+    HTTP2_AVAILABLE = True
+except ImportError:
+    # Optional dependency; httpx requires it for HTTP/2
+    HTTP2_AVAILABLE = False
+
+logger = get_logger(__name__)
+
+# Connection pool settings for OpenAI-compatible providers
+HTTP_MAX_KEEPALIVE_CONNECTIONS = 32
+HTTP_MAX_CONNECTIONS = 64
+HTTP_TIMEOUT_SECONDS = 60.0
+
+# Hedge delays for a model whose latency has not been observed yet
+HEDGE_FIRST_CHUNK_FALLBACK_SECONDS = 5.0
+HEDGE_RESPONSE_FALLBACK_SECONDS = 30.0
+# Lower bound on estimated delays, so a model with very steady latency is
+# not raced as soon as it is a little slower than usual
+HEDGE_MIN_DELAY_SECONDS = 1.0
+
+OPENROUTER_BASE_URL = "https://openrouter.ai/api/v1"
+# Read-only so every request can pass the same mapping without copying it
+OPENROUTER_HEADERS: Mapping[str, str] = MappingProxyType(
+    {
+        "HTTP-Referer": "https://github.com/deepakdgupta1/KnowCode",
+        "X-Title": "KnowCode",
+    }
+)
+NO_EXTRA_HEADERS: Mapping[str, str] = MappingProxyType({})
+
+# Local (no-LLM) answer layouts by task type; other types use the GENERAL one
+LOCAL_ANSWER_TEMPLATES: dict[TaskType, str] = {
+    TaskType.LOCATE: "**Found in codebase:**\n\n{context}",
+    TaskType.EXPLAIN: (
+        "**Based on the codebase context:**\n\n{context}\n\n"
+        "*Note: This is a local answer based on retrieved context. "
+        "For more detailed explanations, use `force_llm=True`.*"
+    ),
+    TaskType.GENERAL: (
+        "**Relevant context from codebase:**\n\n{context}\n\n"
+        "*Local answer based on high-confidence context match. "
+        "Use `force_llm=True` for LLM-enhanced responses.*"
+    ),
+}
+
+
+def _http_limits() -> httpx.Limits:
+    """Connection pool limits for OpenAI-compatible providers."""
+    return httpx.Limits(
+        max_keepalive_connections=HTTP_MAX_KEEPALIVE_CONNECTIONS,
+        max_connections=HTTP_MAX_CONNECTIONS,
+    )
+
+
+class ProviderMeta(NamedTuple):
+    """Request settings derived once from a ModelConfig's provider."""
+
+    is_google: bool
+    base_url: Optional[str]
+    extra_headers: Mapping[str, str]
+
+
+class PreparedQuestion(NamedTuple):
+    """A question with its LLM prompt and cache state, from Agent.prepare()."""
+
+    query: str
+    prompt: str
+    cache_key: str
+    embedding: Optional[list[float]]
+    cached: Optional[str]
+
+
+@functools.lru_cache(maxsize=32)
+def _provider_meta(provider: str) -> ProviderMeta:
+    """Return the request settings for a provider string."""
+    is_openrouter = provider == "mistralai" or "openrouter" in provider
+    return ProviderMeta(
+        is_google=provider == "google",
+        base_url=OPENROUTER_BASE_URL if is_openrouter else None,
+        extra_headers=OPENROUTER_HEADERS if is_openrouter else NO_EXTRA_HEADERS,
+    )
+
+
+@functools.lru_cache(maxsize=16)
+def _build_client(provider: str, api_key_env: str) -> Any:
+    """Return the synchronous client for a provider and API key variable.
+
+    Models sharing a provider and API key share one client across all agents.
+
+    Raises:
+        LookupError: If the API key variable is not set. Exceptions are not
+            cached, so a key set later is picked up on the next call.
+    """
+    api_key = os.environ.get(api_key_env)
+    if not api_key:
+        raise LookupError(api_key_env)
+
+    meta = _provider_meta(provider)
+    if meta.is_google:
+        return genai.Client(api_key=api_key)
+    # Assume OpenAI-compatible (OpenAI, OpenRouter, Mistral, etc.)
+    return Agent._get_shared_openai_client(api_key, meta.base_url)
 
 
 class Agent:
     """Agent that answers questions about the codebase using an LLM (Gemini or OpenAI/OpenRouter)."""
 
-    def __init__(self, service: KnowCodeService, config: AppConfig) -> None:
+    # OpenAI-compatible clients shared by all agents, keyed on (base_url, api_key),
+    # so keep-alive connections survive across questions and Agent instances.
+    _shared_openai_clients: dict[tuple[Optional[str], str], openai.OpenAI] = {}
+    # One connection pool behind all of them, so providers on the same host
+    # reuse TLS connections (and share an HTTP/2 socket when h2 is installed)
+    _shared_http_client: Optional[httpx.Client] = None
+
+    def __init__(
+        self,
+        service: KnowCodeService,
+        config: AppConfig,
+        cache: Optional[LLMCache] = None,
+    ) -> None:
         """Initialize the agent.
         
         Args:
             service: KnowCodeService instance for context retrieval.
             config: Application configuration containing model priorities.
+            cache: Response cache; defaults to the on-disk cache in ~/.knowcode.
         """
         self.service = service
         self.config = config
-        self.clients: dict[str, Any] = {}
-        self.rate_limiter = RateLimiter()
+        # Async clients keyed on (provider, api_key_env); sync ones are in _build_client
+        self.async_clients: dict[tuple[str, str], Any] = {}
+        # Pool shared by this agent's async OpenAI-compatible clients
+        self._async_http_client: Optional[httpx.AsyncClient] = None
+        self.rate_limiter = get_rate_limiter()
+        # Breaker state shares the rate limiter's file so other processes see it
+        self._breaker_state = self.rate_limiter.state_file
+        self.breakers: dict[str, CircuitBreaker] = {}
+        # Per-model latency, kept alongside breaker state; times hedged requests
+        self.latency = LatencyEstimator(self._breaker_state)
+        # In-flight LLM calls keyed on prompt, with their number of waiters
+        self._inflight: dict[str, tuple[asyncio.Task, list[int]]] = {}
+        if cache is None:
+            cache = LLMCache(
+                SQLiteBackend(),
+                ttl=config.response_cache_ttl,
+                similarity_threshold=config.semantic_cache_threshold,
+            )
+        self.cache = cache
+
+    @staticmethod
+    def _provider_meta(config: ModelConfig) -> ProviderMeta:
+        """Return the request settings derived from a model's provider string."""
+        return _provider_meta(config.provider)
 
     def _get_client(self, config: ModelConfig) -> Optional[Any]:
         """Get or create client for a specific model configuration."""
-        client_key = f"{config.provider}_{config.api_key_env}"
-        if client_key in self.clients:
-            return self.clients[client_key]
-            
-        api_key = os.environ.get(config.api_key_env)
-        if not api_key:
+        try:
+            return _build_client(config.provider, config.api_key_env)
+        except LookupError:
             return None
-            
-        if config.provider == "google":
-            client = genai.Client(api_key=api_key)
-        else:
-            # Assume OpenAI-compatible (OpenAI, OpenRouter, Mistral, etc.)
-            base_url = None
-            if config.provider == "mistralai" or "openrouter" in config.provider:
-                base_url = "https://openrouter.ai/api/v1"
-            
+
+    @classmethod
+    def _get_shared_openai_client(cls, api_key: str, base_url: Optional[str]) -> openai.OpenAI:
+        """Return the process-wide pooled OpenAI client for an API key and endpoint."""
+        shared_key = (base_url, api_key)
+        client = cls._shared_openai_clients.get(shared_key)
+        if client is None:
+            if cls._shared_http_client is None or cls._shared_http_client.is_closed:
+                cls._shared_http_client = httpx.Client(
+                    http2=HTTP2_AVAILABLE,
+                    limits=_http_limits(),
+                    timeout=HTTP_TIMEOUT_SECONDS,
+                )
             client = openai.OpenAI(
                 api_key=api_key,
-                base_url=base_url
+                base_url=base_url,
+                http_client=cls._shared_http_client,
             )
-            
-        self.clients[client_key] = client
+            cls._shared_openai_clients[shared_key] = client
         return client
 
-    def answer(self, query: str) -> str:
-        """Answer a question about the codebase.
+    def _get_async_client(self, config: ModelConfig) -> Optional[Any]:
+        """Get or create an asyncio-native client for a model configuration."""
+        client_key = (config.provider, config.api_key_env)
+        client = self.async_clients.get(client_key)
+        if client is None:
+            api_key = os.environ.get(config.api_key_env)
+            if not api_key:
+                return None
+            client = self._create_async_client(_provider_meta(config.provider), api_key)
+            self.async_clients[client_key] = client
+        return client
 
-        Args:
-            query: User's question.
+    def _create_async_client(self, meta: ProviderMeta, api_key: str) -> Any:
+        """Build an asyncio-native client for a provider."""
+        if meta.is_google:
+            return genai.Client(api_key=api_key).aio
+        if self._async_http_client is None:
+            self._async_http_client = httpx.AsyncClient(
+                http2=HTTP2_AVAILABLE,
+                limits=_http_limits(),
+                timeout=HTTP_TIMEOUT_SECONDS,
+            )
+        return openai.AsyncOpenAI(
+            api_key=api_key,
+            base_url=meta.base_url,
+            http_client=self._async_http_client,
+        )
+
+    async def aclose(self) -> None:
+        """Close this agent's async connection pool.
+
+        The async clients are dropped as well and will be recreated (with a
+        fresh pool) if the agent is used again.
+        """
+        if self._async_http_client is not None:
+            await self._async_http_client.aclose()
+            self._async_http_client = None
+        self.async_clients.clear()
+
+    @staticmethod
+    def _log_query_type(task_type: TaskType, retrieval: dict[str, Any]) -> None:
+        """Log the detected task type; the confidence is only read when INFO is enabled."""
+        if logger.isEnabledFor(logging.INFO):
+            confidence = float(retrieval.get("task_confidence", 0.0))
+            logger.info("📋 Query type: %s (confidence: %.0f%%)", task_type.value, confidence * 100)
+
+    def _build_prompt(self, query: str) -> tuple[str, dict[str, Any]]:
+        """Retrieve context for a query and build the task-specific LLM prompt.
 
         Returns:
-            The agent's answer.
-            
-        Raises:
-            ValueError: If no API keys are set.
-            Exception: If all models fail.
+            The prompt and the retrieval result it was built from.
         """
         retrieval = self.service.retrieve_context_for_query(query)
         task_type = TaskType(retrieval.get("task_type", TaskType.GENERAL.value))
-        confidence = float(retrieval.get("task_confidence", 0.0))
-        print(f"  📋 Query type: {task_type.value} (confidence: {confidence:.0%})")
+        self._log_query_type(task_type, retrieval)
 
         context_str = retrieval.get("context_text", "")
         if not context_str:
@@ -80,72 +271,591 @@ class Agent:
                 "Answer based on general software engineering principles if possible."
             )
 
-        # 2. Construct Prompt with task-specific system instructions
+        # Construct Prompt with task-specific system instructions
         system_instructions = get_prompt_template(task_type)
-        
+
         prompt = f"{system_instructions}\n\nContext:\n{context_str}\n\nQuestion: {query}"
+        return prompt, retrieval
 
-        # 3. Call LLM with Failover
-        last_error = None
-        
+    def _cache_lookup(
+        self, query: str, prompt: str, retrieval: dict[str, Any]
+    ) -> tuple[Optional[str], str, Optional[list[float]]]:
+        """Look up a cached answer by exact prompt, then by query similarity.
+
+        Returns:
+            The cached answer (or None), the exact cache key, and the query
+            embedding used for the similarity lookup (to store on a miss).
+        """
+        key = self._cache_key(prompt, retrieval)
+        cached = self.cache.get(key)
+        if cached is not None:
+            return cached, key, None
+        cached, embedding = self._semantic_lookup(query, retrieval)
+        return cached, key, embedding
+
+    def _cache_key(self, prompt: str, retrieval: dict[str, Any]) -> str:
+        """Return the exact-match cache key for a prompt."""
+        return LLMCache.make_key(
+            [m.name for m in self.config.models],
+            retrieval.get("task_type", TaskType.GENERAL.value),
+            prompt,
+        )
+
+    def _semantic_lookup(
+        self, query: str, retrieval: dict[str, Any]
+    ) -> tuple[Optional[str], Optional[list[float]]]:
+        """Look up a cached answer for a similar query.
+
+        Returns:
+            The cached answer (or None) and the query embedding (to store on a miss).
+        """
+        embedding = None
+        if self.cache.enabled and retrieval.get("retrieval_mode") == "semantic":
+            # Retrieval already embedded this query; the engine returns its cached vector
+            try:
+                engine = self.service.get_search_engine()
+                embedding = engine.embed_queries([query])[0]
+            except Exception:
+                embedding = None
+        return self.cache.get_similar(self._cache_namespace(), embedding), embedding
+
+    def _query_cache_key(self, query: str) -> str:
+        """Return the cache key for an answer to a raw query in this store.
+
+        Unlike the prompt key, this can be computed before any retrieval.
+        """
+        return LLMCache.make_key(
+            [m.name for m in self.config.models],
+            "query",
+            f"{self._cache_namespace()}\n{query}",
+        )
+
+    def _store_answer(
+        self,
+        query: str,
+        cache_key: str,
+        response_text: str,
+        embedding: Optional[list[float]],
+    ) -> None:
+        """Cache an LLM answer under its prompt key and its raw query key."""
+        namespace = self._cache_namespace()
+        self.cache.set(cache_key, response_text, namespace, embedding)
+        self.cache.set(self._query_cache_key(query), response_text, namespace)
+
+    def _cache_namespace(self) -> str:
+        """Scope cache hits to the knowledge store being queried.
+
+        The store file's modification time and size are included, so answers
+        cached before the store was rebuilt are not served afterwards.
+        """
+        store_path = Path(self.service.store_path).resolve()
+        store_file = (
+            store_path / KnowledgeStore.DEFAULT_FILENAME if store_path.is_dir() else store_path
+        )
+        try:
+            stat = os.stat(store_file)
+        except OSError:
+            return str(store_path)
+        return f"{store_path}@{stat.st_mtime_ns}:{stat.st_size}"
+
+    def _available_models(
+        self, get_client: Callable[[ModelConfig], Optional[Any]]
+    ) -> Iterator[tuple[ModelConfig, Any]]:
+        """Yield (model_config, client) pairs in priority order, skipping unusable models."""
         for model_config in self.config.models:
-            print(f"🤖 Trying model: {model_config.name} ({model_config.provider})...") 
-            
+            logger.info("🤖 Trying model: %s (%s)...", model_config.name, model_config.provider)
+
             # Check Rate Limit (Client-side)
             if not self.rate_limiter.check_availability(model_config):
-                # Warning already printed by check_availability
+                # Warning already logged by check_availability
                 continue
 
-            client = self._get_client(model_config)
-            
+            client = get_client(model_config)
+
             if not client:
-                print(f"  ⚠️ Skipping {model_config.name}: {model_config.api_key_env} not set.")
+                logger.warning("⚠️ Skipping %s: %s not set.", model_config.name, model_config.api_key_env)
                 continue
 
-            try:
-                response_text = ""
-                if model_config.provider == "google":
-                    response = client.models.generate_content(
-                        model=model_config.name,
-                        contents=prompt,
-                    )
-                    response_text = response.text or "No response from LLM."
-                else:
-                    # OpenAI / OpenRouter style
-                    extra_headers = {}
-                    if "openrouter" in model_config.provider or model_config.provider == "mistralai":
-                         extra_headers = {
-                             "HTTP-Referer": "https://github.com/deepakdgupta1/KnowCode",
-                             "X-Title": "KnowCode",
-                         }
-                         
-                    chat_completion = client.chat.completions.create(
-                        model=model_config.name,
-                        messages=[
-                            {"role": "user", "content": prompt}
-                        ],
-                        extra_headers=extra_headers
-                    )
-                    response_text = chat_completion.choices[0].message.content or "No response from LLM."
-                
-                # Success! Record usage and return
-                self.rate_limiter.record_usage(model_config.name)
-                return response_text
+            # Checked last: in the half-open state this claims the single probe slot
+            if not self._breaker(model_config).allow_request():
+                logger.warning("⚠️ Skipping %s: circuit open after repeated failures.", model_config.name)
+                continue
+
+            yield model_config, client
+
+    def _breaker(self, model_config: ModelConfig) -> CircuitBreaker:
+        """Return the circuit breaker for a model, creating it on first use."""
+        breaker = self.breakers.get(model_config.name)
+        if breaker is None:
+            breaker = self.breakers.setdefault(
+                model_config.name,
+                CircuitBreaker(state_file=self._breaker_state, key=model_config.name),
+            )
+        return breaker
+
+    def _hedge_delay(self, model_config: ModelConfig, first_chunk: bool) -> Optional[float]:
+        """Return how long to wait on a model before starting the next one.
+
+        ``config.hedge_delay`` overrides the estimate (0 disables hedging);
+        by default the delay comes from the model's observed latency.
+        """
+        if self.config.hedge_delay is not None:
+            return self.config.hedge_delay if self.config.hedge_delay > 0 else None
+        estimate = self.latency.hedge_delay(model_config.name, first_chunk)
+        if estimate is None:
+            if first_chunk:
+                return HEDGE_FIRST_CHUNK_FALLBACK_SECONDS
+            return HEDGE_RESPONSE_FALLBACK_SECONDS
+        return max(HEDGE_MIN_DELAY_SECONDS, estimate)
+
+    def _generate(self, client: Any, model_config: ModelConfig, prompt: str) -> str:
+        """Send the prompt to one model and return its response text."""
+        meta = self._provider_meta(model_config)
+        if meta.is_google:
+            response = client.models.generate_content(
+                model=model_config.name,
+                contents=prompt,
+            )
+            return response.text or "No response from LLM."
+
+        # OpenAI / OpenRouter style
+        chat_completion = client.chat.completions.create(
+            model=model_config.name,
+            messages=[
+                {"role": "user", "content": prompt}
+            ],
+            extra_headers=meta.extra_headers,
+        )
+        return chat_completion.choices[0].message.content or "No response from LLM."
+
+    async def _generate_async(self, client: Any, model_config: ModelConfig, prompt: str) -> str:
+        """Async counterpart of _generate() using asyncio-native clients."""
+        meta = self._provider_meta(model_config)
+        if meta.is_google:
+            response = await client.models.generate_content(
+                model=model_config.name,
+                contents=prompt,
+            )
+            return response.text or "No response from LLM."
+
+        chat_completion = await client.chat.completions.create(
+            model=model_config.name,
+            messages=[
+                {"role": "user", "content": prompt}
+            ],
+            extra_headers=meta.extra_headers,
+        )
+        return chat_completion.choices[0].message.content or "No response from LLM."
+
+    async def _stream_async(
+        self, client: Any, model_config: ModelConfig, prompt: str
+    ) -> AsyncIterator[str]:
+        """Streaming counterpart of _generate_async(); yields text as it arrives."""
+        meta = self._provider_meta(model_config)
+        if meta.is_google:
+            stream = await client.models.generate_content_stream(
+                model=model_config.name,
+                contents=prompt,
+            )
+            async for chunk in stream:
+                if chunk.text:
+                    yield chunk.text
+            return
+
+        stream = await client.chat.completions.create(
+            model=model_config.name,
+            messages=[
+                {"role": "user", "content": prompt}
+            ],
+            extra_headers=meta.extra_headers,
+            stream=True,
+        )
+        async for chunk in stream:
+            if chunk.choices and chunk.choices[0].delta.content:
+                yield chunk.choices[0].delta.content
+
+    def _report_failure(self, model_config: ModelConfig, error: Exception) -> None:
+        """Record a model failure and log why before moving on to the next one."""
+        self._breaker(model_config).record_failure()
+        if isinstance(error, ResourceExhausted):
+            logger.warning("⚠️ Rate limit exceeded (Server) for %s. Switching...", model_config.name)
+        else:
+            logger.error("❌ Error with %s: %s", model_config.name, error)
+
+    def answer(self, query: str) -> str:
+        """Answer a question about the codebase.
+
+        Args:
+            query: User's question.
+
+        Returns:
+            The agent's answer.
             
-            except ResourceExhausted as e:
-                 print(f"  ⚠️ Rate limit exceeded (Server) for {model_config.name}. Switching...")
-                 last_error = e
-                 continue
+        Raises:
+            ValueError: If no API keys are set.
+            Exception: If all models fail.
+        """
+        prompt, retrieval = self._build_prompt(query)
+
+        cached, cache_key, embedding = self._cache_lookup(query, prompt, retrieval)
+        if cached is not None:
+            logger.info("💾 Using cached answer.")
+            return cached
+
+        # Call LLM with Failover
+        last_error = None
+
+        for model_config, client in self._available_models(self._get_client):
+            try:
+                response_text = self._generate(client, model_config, prompt)
             except Exception as e:
-                 print(f"  ❌ Error with {model_config.name}: {e}")
-                 last_error = e
-                 continue
+                self._report_failure(model_config, e)
+                last_error = e
+                continue
+
+            # Success! Record usage, cache and return
+            self.rate_limiter.record_usage(model_config.name)
+            self._breaker(model_config).record_success()
+            self._store_answer(query, cache_key, response_text, embedding)
+            return response_text
 
         if last_error:
             raise last_error
         
         raise ValueError("No valid configuration found or all models skipped (check API keys or limits).")
 
+    async def answer_async(self, query: str) -> str:
+        """Answer a question without blocking the event loop.
+
+        Context retrieval runs in a worker thread and LLM calls use the
+        asyncio-native provider clients, so several questions can be in
+        flight at once. Models are tried in priority order, but if one has
+        not answered within its hedge delay (see _hedge_delay()) the next
+        model is started as well; the first successful response wins and the
+        other requests are cancelled. On an exact cache miss the LLM request is
+        started while the query is embedded for the similarity lookup, and
+        is shared with any concurrent call for the same prompt.
+
+        Args:
+            query: User's question.
+
+        Returns:
+            The agent's answer.
+
+        Raises:
+            ValueError: If no API keys are set.
+            Exception: If all models fail.
+        """
+        prompt, retrieval = await asyncio.to_thread(self._build_prompt, query)
+
+        cache_key = self._cache_key(prompt, retrieval)
+        cached = await asyncio.to_thread(self.cache.get, cache_key)
+        if cached is not None:
+            logger.info("💾 Using cached answer.")
+            return cached
+
+        # Embedding the query for the similarity lookup is slow too, so the
+        # LLM call is dispatched speculatively alongside it. A similar-query
+        # hit cancels the call; otherwise the embedding is stored with the answer.
+        llm_task = asyncio.ensure_future(self._coalesced_generate(prompt))
+        lookup_task = asyncio.ensure_future(
+            asyncio.to_thread(self._semantic_lookup, query, retrieval)
+        )
+        try:
+            await asyncio.wait({llm_task, lookup_task}, return_when=asyncio.FIRST_COMPLETED)
+            if lookup_task.done() and not llm_task.done():
+                cached, embedding = lookup_task.result()
+                if cached is not None:
+                    logger.info("💾 Using cached answer.")
+                    return cached
+            try:
+                response_text = await llm_task
+            except Exception:
+                # A similar cached answer is better than no answer
+                cached, _ = await lookup_task
+                if cached is not None:
+                    logger.info("💾 Using cached answer.")
+                    return cached
+                raise
+            _, embedding = await lookup_task
+        finally:
+            llm_task.cancel()
+
+        self._store_answer(query, cache_key, response_text, embedding)
+        return response_text
+
+    async def answer_stream(self, query: str) -> AsyncIterator[str]:
+        """Answer a question, yielding the response text as it is generated.
+
+        Models are tried in priority order. A model that fails before sending
+        any text is skipped in favour of the next one, and one that sends
+        nothing within its hedge delay is raced against the next (see
+        _hedged_stream()). Once text has been yielded, a failure is raised to
+        the caller. The full answer is cached when the stream completes. A
+        cached answer is yielded as a single piece.
+
+        Args:
+            query: User's question.
+
+        Yields:
+            Pieces of the agent's answer.
+
+        Raises:
+            ValueError: If no API keys are set.
+            Exception: If all models fail.
+        """
+        prompt, retrieval = await asyncio.to_thread(self._build_prompt, query)
+
+        cached, cache_key, embedding = await asyncio.to_thread(
+            self._cache_lookup, query, prompt, retrieval
+        )
+        if cached is not None:
+            logger.info("💾 Using cached answer.")
+            yield cached
+            return
+
+        pieces: list[str] = []
+        async for piece in self._hedged_stream(prompt):
+            pieces.append(piece)
+            yield piece
+        response_text = "".join(pieces) or "No response from LLM."
+        if not pieces:
+            yield response_text
+        self._store_answer(query, cache_key, response_text, embedding)
+
+    async def _hedged_stream(self, prompt: str) -> AsyncIterator[str]:
+        """Stream from the failover chain, hedging until the first chunk.
+
+        A failure before any text starts the next model immediately; a model
+        that has sent nothing after its hedge delay gets the next one started
+        alongside it. The first model to send text (or finish) wins and the
+        other streams are closed. Usage is recorded for every request sent.
+        """
+        candidates = self._available_models(self._get_async_client)
+        # First-chunk task -> (model, its stream, when the request was sent)
+        pending: dict[asyncio.Task, tuple[ModelConfig, AsyncIterator[str], float]] = {}
+        delay: Optional[float] = None
+        exhausted = False
+        last_error: Optional[Exception] = None
+
+        def launch_next() -> None:
+            nonlocal delay, exhausted
+            candidate = next(candidates, None)
+            if candidate is None:
+                exhausted = True
+                return
+            model_config, client = candidate
+            stream = self._stream_async(client, model_config, prompt)
+            self.rate_limiter.record_usage(model_config.name)
+            task = asyncio.ensure_future(stream.__anext__())
+            pending[task] = (model_config, stream, time.monotonic())
+            delay = self._hedge_delay(model_config, first_chunk=True)
+
+        async def discard(task: asyncio.Task, model_config: ModelConfig, stream: AsyncIterator[str]) -> None:
+            # Cancelled requests have no outcome; free any half-open probe slot
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+            await stream.aclose()
+            self._breaker(model_config).release()
+
+        winner: Optional[tuple[ModelConfig, AsyncIterator[str]]] = None
+        first: Optional[str] = None
+        launch_next()
+        try:
+            while pending and winner is None:
+                done, _ = await asyncio.wait(
+                    pending,
+                    timeout=None if exhausted else delay,
+                    return_when=asyncio.FIRST_COMPLETED,
+                )
+                if not done:
+                    # Nothing yet: hedge with the next model in line
+                    launch_next()
+                    continue
+
+                for task in done:
+                    model_config, stream, sent_at = pending.pop(task)
+                    if winner is not None:
+                        await discard(task, model_config, stream)
+                        continue
+                    try:
+                        first = task.result()
+                    except StopAsyncIteration:
+                        first = None
+                    except Exception as e:
+                        self._report_failure(model_config, e)
+                        last_error = e
+                        continue
+                    self.latency.observe(model_config.name, time.monotonic() - sent_at, first_chunk=True)
+                    winner = (model_config, stream)
+
+                if winner is None and not exhausted:
+                    launch_next()
+        finally:
+            for task, (model_config, stream, _) in list(pending.items()):
+                await discard(task, model_config, stream)
+
+        if winner is None:
+            if last_error:
+                raise last_error
+            raise ValueError("No valid configuration found or all models skipped (check API keys or limits).")
+
+        model_config, stream = winner
+        finished = False
+        try:
+            if first is not None:
+                yield first
+                async for piece in stream:
+                    yield piece
+            finished = True
+        except Exception as e:
+            self._report_failure(model_config, e)
+            raise
+        finally:
+            if not finished:
+                # Abandoned by the consumer (or failed): free any half-open probe slot
+                await stream.aclose()
+                self._breaker(model_config).release()
+        self._breaker(model_config).record_success()
+
+    async def _coalesced_generate(self, prompt: str) -> str:
+        """Run the failover chain, sharing one call between identical prompts.
+
+        Concurrent callers with the same prompt await the first caller's
+        request instead of sending their own. The request is cancelled only
+        once every caller waiting on it has been cancelled.
+        """
+        loop = asyncio.get_running_loop()
+        entry = self._inflight.get(prompt)
+        if entry is None or entry[0].get_loop() is not loop:
+            task = asyncio.ensure_future(self._hedged_generate(prompt))
+            entry = self._inflight[prompt] = (task, [0])
+
+            def forget(_: asyncio.Task, entry: tuple[asyncio.Task, list[int]] = entry) -> None:
+                if self._inflight.get(prompt) is entry:
+                    del self._inflight[prompt]
+
+            task.add_done_callback(forget)
+
+        task, waiters = entry
+        waiters[0] += 1
+        try:
+            return await asyncio.shield(task)
+        finally:
+            waiters[0] -= 1
+            if not waiters[0] and not task.done():
+                task.cancel()
+
+    async def _hedged_generate(self, prompt: str) -> str:
+        """Run the failover chain with hedged requests.
+
+        A failure starts the next model immediately; a model that is merely
+        slow gets its hedge delay (see _hedge_delay()) before the next one is
+        started alongside it. Usage is recorded for every request sent.
+        """
+        candidates = self._available_models(self._get_async_client)
+        # Request task -> (model, when the request was sent)
+        pending: dict[asyncio.Task, tuple[ModelConfig, float]] = {}
+        delay: Optional[float] = None
+        exhausted = False
+        last_error: Optional[Exception] = None
+
+        def launch_next() -> None:
+            nonlocal delay, exhausted
+            candidate = next(candidates, None)
+            if candidate is None:
+                exhausted = True
+                return
+            model_config, client = candidate
+            self.rate_limiter.record_usage(model_config.name)
+            task = asyncio.ensure_future(self._generate_async(client, model_config, prompt))
+            pending[task] = (model_config, time.monotonic())
+            delay = self._hedge_delay(model_config, first_chunk=False)
+
+        launch_next()
+        try:
+            while pending:
+                done, _ = await asyncio.wait(
+                    pending,
+                    timeout=None if exhausted else delay,
+                    return_when=asyncio.FIRST_COMPLETED,
+                )
+                if not done:
+                    # Slowest path: hedge with the next model in line
+                    launch_next()
+                    continue
+
+                for task in done:
+                    model_config, sent_at = pending.pop(task)
+                    try:
+                        response_text = task.result()
+                    except Exception as e:
+                        self._report_failure(model_config, e)
+                        last_error = e
+                        continue
+                    self.latency.observe(model_config.name, time.monotonic() - sent_at, first_chunk=False)
+                    self._breaker(model_config).record_success()
+                    return response_text
+
+                if not exhausted:
+                    launch_next()
+        finally:
+            # Cancelled requests have no outcome; free any half-open probe slots
+            for task, (model_config, _) in pending.items():
+                task.cancel()
+                self._breaker(model_config).release()
+
+        if last_error:
+            raise last_error
+
+        raise ValueError("No valid configuration found or all models skipped (check API keys or limits).")
+
+    def prepare(self, query: str) -> PreparedQuestion:
+        """Retrieve context for a question, build its prompt and look up the cache.
+
+        Together with generate() and remember() this lets callers such as
+        BatchProcessor schedule the LLM calls for many questions themselves.
+        """
+        prompt, retrieval = self._build_prompt(query)
+        cached, cache_key, embedding = self._cache_lookup(query, prompt, retrieval)
+        return PreparedQuestion(query, prompt, cache_key, embedding, cached)
+
+    async def generate(self, prompt: str) -> str:
+        """Send a prompt through the hedged failover chain.
+
+        Concurrent calls with the same prompt share one request.
+
+        Raises:
+            ValueError: If no API keys are set.
+            Exception: If all models fail.
+        """
+        return await self._coalesced_generate(prompt)
+
+    def remember(self, question: PreparedQuestion, answer: str) -> None:
+        """Cache an LLM answer to a prepared question."""
+        self._store_answer(question.query, question.cache_key, answer, question.embedding)
+
+    def claim_model(self) -> Optional[tuple[ModelConfig, Any]]:
+        """Return the highest-priority usable model and its async client.
+
+        The model's circuit breaker may hand out its single half-open probe
+        slot here, so the caller must follow up with record_outcome() once
+        a request was sent, or release_model() if none was.
+        """
+        return next(self._available_models(self._get_async_client), None)
+
+    def release_model(self, model_config: ModelConfig) -> None:
+        """Give back a model from claim_model() without having used it."""
+        self._breaker(model_config).release()
+
+    def record_outcome(self, model_config: ModelConfig, error: Optional[Exception] = None) -> None:
+        """Record a request sent to a model from claim_model() and how it ended."""
+        self.rate_limiter.record_usage(model_config.name)
+        if error is None:
+            self._breaker(model_config).record_success()
+        else:
+            self._report_failure(model_config, error)
+
     def smart_answer(
         self,
         query: str,
@@ -156,6 +866,9 @@ class Agent:
         If context sufficiency >= threshold, returns local answer without LLM.
         Only calls external LLM when context is insufficient.
         
+        A previously cached LLM answer for the same query is returned before
+        any retrieval is done, unless ``force_llm`` is set.
+
         Args:
             query: User's question.
             force_llm: If True, always use LLM regardless of sufficiency.
@@ -163,26 +876,41 @@ class Agent:
         Returns:
             Dict with:
                 - answer: The response text
-                - source: "local" or "llm"
+                - source: "cache", "local" or "llm"
                 - task_type: Detected query type
                 - sufficiency_score: Context quality score
                 - context: The retrieved context
         """
+        cached = None if force_llm else self.cache.get(self._query_cache_key(query))
+        if cached is not None:
+            logger.info("💾 Using cached answer.")
+            task_type, _ = classify_query(query)
+            return {
+                "answer": cached,
+                "source": "cache",
+                "task_type": task_type.value,
+                "sufficiency_score": 0.0,
+                "context": "",
+                "llm_tokens_saved": len(cached.split()),
+            }
+
         retrieval = self.service.retrieve_context_for_query(query)
         task_type = TaskType(retrieval.get("task_type", TaskType.GENERAL.value))
-        confidence = float(retrieval.get("task_confidence", 0.0))
-        print(f"  📋 Query type: {task_type.value} (confidence: {confidence:.0%})")
+        self._log_query_type(task_type, retrieval)
 
         avg_sufficiency = float(retrieval.get("sufficiency_score", 0.0))
         context_str = retrieval.get("context_text", "")
 
         threshold = self.config.sufficiency_threshold
-        print(f"  📊 Sufficiency: {avg_sufficiency:.0%} (threshold: {threshold:.0%})")
+        if logger.isEnabledFor(logging.INFO):
+            logger.info(
+                "📊 Sufficiency: %.0f%% (threshold: %.0f%%)", avg_sufficiency * 100, threshold * 100
+            )
         
         # 3. Decide: local answer or LLM
         if not force_llm and avg_sufficiency >= threshold and context_str:
             # Local-first: sufficient context found
-            print("  ✅ Answering locally (sufficient context)")
+            logger.info("✅ Answering locally (sufficient context)")
             
             local_answer = self._format_local_answer(query, task_type, context_str)
             
@@ -196,9 +924,9 @@ class Agent:
             }
         else:
             # Need LLM
-            print("  🤖 Calling LLM (sufficiency below threshold or forced)")
+            logger.info("🤖 Calling LLM (sufficiency below threshold or forced)")
             
-            llm_answer = self.answer(query)
+            llm_answer = self._answer_blocking(query)
             
             return {
                 "answer": llm_answer,
@@ -209,6 +937,27 @@ class Agent:
                 "llm_tokens_saved": 0,
             }
 
+    def _answer_blocking(self, query: str) -> str:
+        """Run answer_async() to completion from synchronous code.
+
+        This gives smart_answer() the same hedging, speculative cache lookup
+        and request sharing as async callers. The async connection pool is
+        closed afterwards, since it belongs to the event loop run here.
+        """
+        async def run() -> str:
+            try:
+                return await self.answer_async(query)
+            finally:
+                await self.aclose()
+
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            return asyncio.run(run())
+        # Called from inside an event loop (e.g. an MCP tool handler)
+        with ThreadPoolExecutor(max_workers=1) as pool:
+            return pool.submit(asyncio.run, run()).result()
+
     def _format_local_answer(
         self,
         query: str,
@@ -220,13 +969,5 @@ class Agent:
         For simple queries like 'locate', we can answer directly from context.
         For more complex queries, we format the context nicely.
         """
-        if task_type == TaskType.LOCATE:
-            # Extract locations from context
-            return f"**Found in codebase:**\n\n{context}"
-        
-        elif task_type == TaskType.EXPLAIN:
-            return f"**Based on the codebase context:**\n\n{context}\n\n*Note: This is a local answer based on retrieved context. For more detailed explanations, use `force_llm=True`.*"
-        
-        else:
-            # General format
-            return f"**Relevant context from codebase:**\n\n{context}\n\n*Local answer based on high-confidence context match. Use `force_llm=True` for LLM-enhanced responses.*"
+        template = LOCAL_ANSWER_TEMPLATES.get(task_type, LOCAL_ANSWER_TEMPLATES[TaskType.GENERAL])
+        return template.format(context=context)
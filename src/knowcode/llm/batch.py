@@ -0,0 +1,207 @@
+"""Bulk question answering on top of the Agent."""
+
+from __future__ import annotations
+
+import asyncio
+import io
+import json
+from typing import Any, Optional
+
+from knowcode.config import ModelConfig
+from knowcode.llm.agent import Agent, PreparedQuestion
+from knowcode.llm.rate_limiter import AsyncRateLimiter
+from knowcode.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+BATCH_ENDPOINT = "/v1/chat/completions"
+BATCH_COMPLETION_WINDOW = "24h"
+# How long answer_many() waits for a batch job before answering directly;
+# jobs may take up to the whole completion window
+BATCH_TIMEOUT_SECONDS = 30 * 60.0
+BATCH_TERMINAL_STATUSES = frozenset({"completed", "failed", "expired", "cancelled"})
+
+
+class BatchProcessor:
+    """Answers many questions with as few provider round trips as possible.
+
+    Prompts go through the agent's regular failover chain with bounded
+    concurrency and a requests-per-minute limit. With ``use_batch_api``, and
+    when the highest-priority available model is served by OpenAI itself,
+    all uncached prompts are first submitted as one job to the OpenAI Batch
+    API; prompts it has not answered within ``batch_timeout`` (or that it
+    failed) are then sent directly. Cached answers are returned without any
+    provider call.
+    """
+
+    def __init__(
+        self,
+        agent: Agent,
+        max_concurrency: int = 10,
+        rate_limit_rpm: int = 100,
+        use_batch_api: bool = False,
+        poll_interval: float = 10.0,
+        batch_timeout: Optional[float] = BATCH_TIMEOUT_SECONDS,
+    ) -> None:
+        """Initialize the processor.
+
+        Args:
+            agent: Agent providing retrieval, caching and model failover.
+            max_concurrency: Maximum in-flight requests on the fallback path.
+            rate_limit_rpm: Maximum requests started per minute on the fallback path.
+            use_batch_api: Submit to the OpenAI Batch API when possible.
+                Jobs are cheaper but can take hours, so this is opt-in.
+            poll_interval: Seconds between batch job status checks.
+            batch_timeout: Seconds to wait for a batch job before cancelling
+                it and answering directly; None waits for the job to finish.
+        """
+        self.agent = agent
+        self.max_concurrency = max(1, max_concurrency)
+        self.rate_limit_rpm = rate_limit_rpm
+        self.use_batch_api = use_batch_api
+        self.poll_interval = poll_interval
+        self.batch_timeout = batch_timeout
+
+    async def answer_many(self, queries: list[str]) -> list[str]:
+        """Answer a list of questions.
+
+        Args:
+            queries: Questions to answer.
+
+        Returns:
+            Answers in the same order as the questions.
+
+        Raises:
+            Exception: If a question could not be answered by any model.
+        """
+        prepared = await asyncio.to_thread(self._prepare, queries)
+        answers: list[Optional[str]] = [question.cached for question in prepared]
+        todo = [i for i, answer in enumerate(answers) if answer is None]
+
+        prompts = {f"q{i}": prepared[i].prompt for i in todo}
+        batched: dict[str, str] = {}
+        if self.use_batch_api and len(prompts) > 1:
+            batched = await self._run_batch_api(prompts)
+
+        remaining = {cid: prompt for cid, prompt in prompts.items() if cid not in batched}
+        if remaining:
+            batched.update(await self._run_concurrent(remaining))
+
+        for i in todo:
+            answers[i] = batched[f"q{i}"]
+            self.agent.remember(prepared[i], answers[i])
+        return [a for a in answers if a is not None]
+
+    def _prepare(self, queries: list[str]) -> list[PreparedQuestion]:
+        """Build prompts and look up cached answers for every question."""
+        return [self.agent.prepare(query) for query in queries]
+
+    async def _run_concurrent(self, prompts: dict[str, str]) -> dict[str, str]:
+        """Send prompts individually through the agent's failover chain."""
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+        limiter = AsyncRateLimiter(self.rate_limit_rpm)
+
+        async def run_one(prompt: str) -> str:
+            async with semaphore:
+                await limiter.acquire()
+                return await self.agent.generate(prompt)
+
+        results = await asyncio.gather(*(run_one(p) for p in prompts.values()))
+        return dict(zip(prompts, results))
+
+    async def _run_batch_api(self, prompts: dict[str, str]) -> dict[str, str]:
+        """Submit prompts as one OpenAI batch job.
+
+        Returns:
+            Answers keyed on custom id; empty if the batch API is not usable
+            for the current model or the job did not complete in time.
+        """
+        candidate = self.agent.claim_model()
+        if candidate is None:
+            return {}
+        model_config, client = candidate
+        if model_config.provider != "openai":
+            # Batch API is OpenAI-only; leave the model to the regular path
+            self.agent.release_model(model_config)
+            return {}
+
+        logger.info("📦 Submitting %d prompts to the %s batch API...", len(prompts), model_config.name)
+        try:
+            results = await self._submit_batch(client, model_config, prompts)
+        except asyncio.TimeoutError:
+            # Slow, not broken: answer directly without counting a failure
+            logger.warning("⏱️ Batch job not done after %ss; answering directly.", self.batch_timeout)
+            self.agent.release_model(model_config)
+            return {}
+        except Exception as e:
+            self.agent.record_outcome(model_config, e)
+            return {}
+
+        self.agent.record_outcome(model_config)
+        return results
+
+    async def _submit_batch(
+        self, client: Any, model_config: ModelConfig, prompts: dict[str, str]
+    ) -> dict[str, str]:
+        """Upload, run and download one batch job.
+
+        Raises:
+            asyncio.TimeoutError: If the job did not finish within
+                ``batch_timeout``; it is cancelled.
+        """
+        lines = [
+            json.dumps(
+                {
+                    "custom_id": custom_id,
+                    "method": "POST",
+                    "url": BATCH_ENDPOINT,
+                    "body": {
+                        "model": model_config.name,
+                        "messages": [{"role": "user", "content": prompt}],
+                    },
+                }
+            )
+            for custom_id, prompt in prompts.items()
+        ]
+        upload = await client.files.create(
+            file=("knowcode_batch.jsonl", io.BytesIO("\n".join(lines).encode("utf-8"))),
+            purpose="batch",
+        )
+        batch = await client.batches.create(
+            input_file_id=upload.id,
+            endpoint=BATCH_ENDPOINT,
+            completion_window=BATCH_COMPLETION_WINDOW,
+        )
+        try:
+            batch = await asyncio.wait_for(self._wait_for_batch(client, batch), self.batch_timeout)
+        except asyncio.TimeoutError:
+            try:
+                await client.batches.cancel(batch.id)
+            except Exception as e:
+                logger.warning("Failed to cancel batch %s: %s", batch.id, e)
+            raise
+
+        if batch.status != "completed" or not batch.output_file_id:
+            raise RuntimeError(f"Batch {batch.id} ended with status {batch.status}")
+
+        output = await client.files.content(batch.output_file_id)
+        results: dict[str, str] = {}
+        for line in output.text.splitlines():
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            response = record.get("response") or {}
+            if response.get("status_code") != 200:
+                # Failed rows are retried individually by the caller
+                continue
+            choices = response.get("body", {}).get("choices") or [{}]
+            content = choices[0].get("message", {}).get("content")
+            results[record["custom_id"]] = content or "No response from LLM."
+        return results
+
+    async def _wait_for_batch(self, client: Any, batch: Any) -> Any:
+        """Poll a batch job until it reaches a terminal status."""
+        while batch.status not in BATCH_TERMINAL_STATUSES:
+            await asyncio.sleep(self.poll_interval)
+            batch = await client.batches.retrieve(batch.id)
+        return batch
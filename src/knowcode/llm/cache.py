@@ -0,0 +1,269 @@
+"""Response cache for LLM answers."""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Optional, Protocol, Sequence
+
+import numpy as np
+
+from knowcode.llm.embedding import top_k_cosine
+
+DEFAULT_CACHE_PATH = Path.home() / ".knowcode" / "llm_cache.sqlite"
+
+
+@dataclass
+class CacheEntry:
+    """A cached LLM response."""
+
+    key: str
+    response: str
+    namespace: str = ""
+    embedding: Optional[np.ndarray] = None
+    created_at: float = 0.0
+
+
+class CacheBackend(Protocol):
+    """Storage interface for cached responses."""
+
+    def get(self, key: str) -> Optional[CacheEntry]:
+        """Return the entry for a key, if present."""
+        ...
+
+    def set(self, entry: CacheEntry) -> None:
+        """Insert or replace an entry."""
+        ...
+
+    def delete(self, key: str) -> None:
+        """Remove an entry."""
+        ...
+
+    def embedded_entries(self, namespace: str) -> list[CacheEntry]:
+        """Return all entries in a namespace that carry an embedding."""
+        ...
+
+
+class SQLiteBackend:
+    """File-backed cache store with least-recently-used eviction."""
+
+    def __init__(self, path: Optional[str | Path] = None, max_entries: int = 1000) -> None:
+        """Open (or create) the cache database.
+
+        Args:
+            path: Database file, or ":memory:" for a process-local cache.
+                Defaults to DEFAULT_CACHE_PATH.
+            max_entries: Entries kept before the least recently used are evicted.
+        """
+        path = path or DEFAULT_CACHE_PATH
+        if str(path) != ":memory:":
+            Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(path), check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            " key TEXT PRIMARY KEY,"
+            " namespace TEXT NOT NULL,"
+            " response TEXT NOT NULL,"
+            " embedding BLOB,"
+            " created_at REAL NOT NULL,"
+            " accessed_at REAL NOT NULL)"
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS responses_namespace ON responses (namespace)"
+        )
+        self._conn.commit()
+
+    def get(self, key: str) -> Optional[CacheEntry]:
+        """Return the entry for a key and mark it as recently used."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT namespace, response, embedding, created_at FROM responses WHERE key = ?",
+                (key,),
+            ).fetchone()
+            if row is None:
+                return None
+            self._conn.execute(
+                "UPDATE responses SET accessed_at = ? WHERE key = ?", (time.time(), key)
+            )
+            self._conn.commit()
+        return self._to_entry(key, row)
+
+    def set(self, entry: CacheEntry) -> None:
+        """Insert or replace an entry, evicting the least recently used if full."""
+        blob = None
+        if entry.embedding is not None:
+            blob = np.asarray(entry.embedding, dtype=np.float32).tobytes()
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?)",
+                (entry.key, entry.namespace, entry.response, blob, entry.created_at or now, now),
+            )
+            self._conn.execute(
+                "DELETE FROM responses WHERE key IN ("
+                " SELECT key FROM responses ORDER BY accessed_at DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,),
+            )
+            self._conn.commit()
+
+    def delete(self, key: str) -> None:
+        """Remove an entry."""
+        with self._lock:
+            self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+            self._conn.commit()
+
+    def embedded_entries(self, namespace: str) -> list[CacheEntry]:
+        """Return all entries in a namespace that carry an embedding."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT key, namespace, response, embedding, created_at FROM responses"
+                " WHERE namespace = ? AND embedding IS NOT NULL",
+                (namespace,),
+            ).fetchall()
+        return [self._to_entry(row[0], row[1:]) for row in rows]
+
+    @staticmethod
+    def _to_entry(key: str, row: Sequence) -> CacheEntry:
+        namespace, response, blob, created_at = row
+        embedding = np.frombuffer(blob, dtype=np.float32) if blob is not None else None
+        return CacheEntry(
+            key=key,
+            response=response,
+            namespace=namespace,
+            embedding=embedding,
+            created_at=created_at,
+        )
+
+
+class LLMCache:
+    """Exact and semantic cache in front of LLM calls.
+
+    Exact hits are keyed on the model chain, task type and full prompt.
+    On an exact miss, a query embedding can be matched against cached
+    queries from the same namespace by cosine similarity.
+    """
+
+    def __init__(
+        self,
+        backend: CacheBackend,
+        ttl: float = 3600,
+        similarity_threshold: float = 0.92,
+    ) -> None:
+        """Initialize the cache.
+
+        Args:
+            backend: Storage backend for entries.
+            ttl: Seconds an entry stays valid; 0 disables the cache.
+            similarity_threshold: Minimum cosine similarity for a semantic
+                hit; values above 1.0 disable semantic matching.
+        """
+        self.backend = backend
+        self.ttl = ttl
+        self.similarity_threshold = similarity_threshold
+        self.hits = 0
+        self.semantic_hits = 0
+        self.misses = 0
+        # (namespace, dimension) -> (keys, normalized embedding matrix)
+        self._matrices: dict[tuple[str, int], tuple[list[str], np.ndarray]] = {}
+
+    @property
+    def enabled(self) -> bool:
+        """Whether lookups and stores are performed."""
+        return self.ttl > 0
+
+    @staticmethod
+    def make_key(models: Sequence[str], task: str, prompt: str) -> str:
+        """Build the exact-match key for a prompt."""
+        payload = json.dumps({"models": list(models), "task": task, "prompt": prompt}, sort_keys=True)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[str]:
+        """Return a cached response for an exact key."""
+        if not self.enabled:
+            return None
+        entry = self.backend.get(key)
+        if entry is not None and self._expired(entry):
+            self.backend.delete(key)
+            entry = None
+        if entry is None:
+            return None
+        self.hits += 1
+        return entry.response
+
+    def get_similar(self, namespace: str, embedding: Optional[Sequence[float]]) -> Optional[str]:
+        """Return the cached response for the most similar query, if close enough."""
+        if not self.enabled or embedding is None or self.similarity_threshold > 1.0:
+            self.misses += 1
+            return None
+
+        query = _normalize(np.asarray(embedding, dtype=np.float32))
+        keys, matrix = self._matrix(namespace, query.shape[0]) if query is not None else ([], None)
+        if not keys:
+            self.misses += 1
+            return None
+
+        for row in top_k_cosine(matrix, query, len(keys), self.similarity_threshold):
+            entry = self.backend.get(keys[row])
+            if entry is not None and not self._expired(entry):
+                self.semantic_hits += 1
+                return entry.response
+
+        self.misses += 1
+        return None
+
+    def set(
+        self,
+        key: str,
+        response: str,
+        namespace: str = "",
+        embedding: Optional[Sequence[float]] = None,
+    ) -> None:
+        """Store a response under its exact key and optional query embedding."""
+        if not self.enabled:
+            return
+        vec = None if embedding is None else np.asarray(embedding, dtype=np.float32)
+        self.backend.set(
+            CacheEntry(key=key, response=response, namespace=namespace, embedding=vec, created_at=time.time())
+        )
+        # Rebuilt from the backend on the next semantic lookup
+        if vec is not None:
+            self._matrices.pop((namespace, vec.shape[0]), None)
+
+    def stats(self) -> dict[str, int]:
+        """Return hit and miss counters for this process."""
+        return {"hits": self.hits, "semantic_hits": self.semantic_hits, "misses": self.misses}
+
+    def _expired(self, entry: CacheEntry) -> bool:
+        return time.time() - entry.created_at > self.ttl
+
+    def _matrix(self, namespace: str, dimension: int) -> tuple[list[str], np.ndarray]:
+        """Return the normalized embedding matrix of cached queries in a namespace."""
+        cached = self._matrices.get((namespace, dimension))
+        if cached is None:
+            keys: list[str] = []
+            rows: list[np.ndarray] = []
+            for entry in self.backend.embedded_entries(namespace):
+                vec = _normalize(entry.embedding)
+                if vec is not None and vec.shape[0] == dimension and not self._expired(entry):
+                    keys.append(entry.key)
+                    rows.append(vec)
+            matrix = np.vstack(rows) if rows else np.empty((0, dimension), dtype=np.float32)
+            cached = (keys, matrix)
+            self._matrices[(namespace, dimension)] = cached
+        return cached
+
+
+def _normalize(vec: Optional[np.ndarray]) -> Optional[np.ndarray]:
+    if vec is None or not vec.size:
+        return None
+    norm = float(np.linalg.norm(vec))
+    if norm == 0.0:
+        return None
+    return vec / norm
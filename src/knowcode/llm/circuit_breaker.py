@@ -0,0 +1,125 @@
+"""Circuit breaker for LLM providers."""
+
+from __future__ import annotations
+
+import threading
+import time
+from contextlib import contextmanager
+from enum import Enum
+from typing import Iterator, Optional
+
+from knowcode.llm.state_file import SharedStateFile
+
+
+class BreakerState(str, Enum):
+    """State of a circuit breaker."""
+
+    CLOSED = "closed"  # Requests flow normally
+    OPEN = "open"  # Requests are skipped until the reset timeout elapses
+    HALF_OPEN = "half_open"  # One probe request decides whether to close again
+
+
+# Stable codes for persisting the state in a SharedStateFile slot
+_STATE_CODES = (BreakerState.CLOSED, BreakerState.OPEN, BreakerState.HALF_OPEN)
+
+
+class CircuitBreaker:
+    """Skips a model after repeated consecutive failures.
+
+    After ``failure_threshold`` consecutive failures the breaker opens and
+    the model is skipped. Once ``reset_timeout`` seconds have passed, a
+    single probe request is let through; its outcome closes the breaker or
+    opens it for another timeout period.
+
+    With a ``state_file``, the state, failure count and open time are
+    shared with every process using the same file, so a model that keeps
+    failing is skipped by later CLI invocations too. The probe slot stays
+    per process.
+    """
+
+    def __init__(
+        self,
+        failure_threshold: int = 5,
+        reset_timeout: float = 60.0,
+        state_file: Optional[SharedStateFile] = None,
+        key: str = "",
+    ) -> None:
+        """Initialize a closed breaker.
+
+        Args:
+            failure_threshold: Consecutive failures that open the breaker.
+            reset_timeout: Seconds to stay open before allowing a probe.
+            state_file: Optional shared state to load from and persist to.
+            key: Slot name in ``state_file`` (the model name).
+        """
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = BreakerState.CLOSED
+        self.failure_count = 0
+        self.opened_at = 0.0
+        self.in_flight_probe = False
+        self.state_file = state_file
+        self.key = key
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def _synced(self) -> Iterator[None]:
+        """Lock the breaker, refreshing from and persisting to the state file."""
+        with self._lock:
+            if self.state_file is None:
+                yield
+                return
+            with self.state_file.locked():
+                slot = self.state_file.read(self.key)
+                self.state = _STATE_CODES[slot.breaker_state]
+                self.failure_count = slot.breaker_failures
+                self.opened_at = slot.breaker_opened_at
+                yield
+                self.state_file.write(
+                    self.key,
+                    slot._replace(
+                        breaker_state=_STATE_CODES.index(self.state),
+                        breaker_failures=self.failure_count,
+                        breaker_opened_at=self.opened_at,
+                    ),
+                )
+
+    def allow_request(self) -> bool:
+        """Return True if a request may be sent now.
+
+        In the half-open state only the first caller gets True; it must
+        report the outcome via record_success(), record_failure() or
+        release().
+        """
+        with self._synced():
+            if self.state == BreakerState.OPEN:
+                if time.time() - self.opened_at < self.reset_timeout:
+                    return False
+                self.state = BreakerState.HALF_OPEN
+
+            if self.state == BreakerState.HALF_OPEN:
+                if self.in_flight_probe:
+                    return False
+                self.in_flight_probe = True
+            return True
+
+    def record_success(self) -> None:
+        """Close the breaker after a successful request."""
+        with self._synced():
+            self.state = BreakerState.CLOSED
+            self.failure_count = 0
+            self.in_flight_probe = False
+
+    def record_failure(self) -> None:
+        """Count a failed request, opening the breaker if needed."""
+        with self._synced():
+            self.failure_count += 1
+            self.in_flight_probe = False
+            if self.state == BreakerState.HALF_OPEN or self.failure_count >= self.failure_threshold:
+                self.state = BreakerState.OPEN
+                self.opened_at = time.time()
+
+    def release(self) -> None:
+        """Give up a probe slot without an outcome (e.g. a cancelled request)."""
+        with self._lock:
+            self.in_flight_probe = False
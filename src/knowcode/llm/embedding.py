@@ -3,12 +3,21 @@
 from __future__ import annotations
 
 from abc import ABC, abstractmethod
+import asyncio
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+import functools
+import hashlib
 import os
+import threading
+from typing import Iterator
 
+import numpy as np
 from openai import OpenAI
 
 from knowcode.config import AppConfig
 from knowcode.data_models import EmbeddingConfig
+from knowcode.llm.rate_limiter import AsyncRateLimiter
 
 _OPENAI_EMBED_DIMENSIONS: dict[str, int] = {
     "text-embedding-3-small": 1536,
@@ -21,28 +30,246 @@ _VOYAGE_EMBED_DIMENSIONS: dict[str, int] = {
     "voyage-code-3": 1024,
 }
 
+# Embedding requests kept in flight by embed_many()
+EMBED_CONCURRENCY = 8
+# Conservative characters-per-token estimate for code and prose; keeps
+# requests under provider token limits without running a tokenizer
+CHARS_PER_TOKEN_ESTIMATE = 3
+# Query embeddings remembered per process by BatchingEmbedder (~6 KB each at 1536 dims)
+QUERY_EMBEDDING_CACHE_ENTRIES = 10_000
+# The most recently used of them stay float32; older ones are stored as int8
+QUERY_EMBEDDING_FULL_PRECISION_ENTRIES = 256
+
+
+@functools.lru_cache(maxsize=8)
+def _openai_client(api_key: str, base_url: str | None) -> OpenAI:
+    """Return the process-wide OpenAI client for an API key and endpoint.
+
+    Providers created for the same key share one client, and with it one
+    connection pool, so later providers skip the TLS handshake.
+    """
+    return OpenAI(api_key=api_key, base_url=base_url)
+
+
+def _estimate_tokens(text: str) -> int:
+    """Return a rough, deliberately high token count for a text."""
+    return len(text) // CHARS_PER_TOKEN_ESTIMATE + 1
+
+
+def _quantize(vec: np.ndarray) -> tuple[np.ndarray, float]:
+    """Symmetrically quantize a vector to int8 with one scale factor."""
+    peak = float(np.abs(vec).max()) if vec.size else 0.0
+    scale = peak / 127.0 if peak > 0 else 1.0
+    return np.round(vec / scale).astype(np.int8), scale
+
+
+def _dequantize(quantized: np.ndarray, scale: float) -> np.ndarray:
+    """Restore an approximate float32 vector from its int8 form."""
+    return quantized.astype(np.float32) * np.float32(scale)
+
+
+def _to_matrix(embeddings: list[list[float]], normalize: bool) -> np.ndarray:
+    """Pack a batch of embeddings into an (N, dim) float32 matrix.
+
+    With ``normalize``, every row is scaled to unit length in one NumPy
+    pass; zero vectors are left unchanged.
+    """
+    matrix = np.asarray(embeddings, dtype=np.float32)
+    if normalize:
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        np.divide(matrix, np.where(norms > 0, norms, 1.0), out=matrix)
+    return matrix
+
+
+def top_k_cosine(
+    matrix: np.ndarray,
+    query: np.ndarray,
+    k: int,
+    min_score: float | None = None,
+) -> np.ndarray:
+    """Return the rows of ``matrix`` most similar to ``query``, best first.
+
+    Rows and query are expected to be unit length, so cosine similarity is
+    one matrix-vector product. Only the top ``k`` candidates are sorted.
+
+    Args:
+        matrix: (N, dim) float32 matrix of normalized embeddings.
+        query: Normalized query embedding of length dim.
+        k: Maximum number of row indices to return.
+        min_score: If set, rows scoring below it are dropped.
+
+    Returns:
+        Row indices ordered by decreasing similarity.
+    """
+    scores = matrix @ query
+    if min_score is None:
+        candidates = np.arange(len(scores))
+    else:
+        candidates = np.flatnonzero(scores >= min_score)
+    if k <= 0 or not len(candidates):
+        return candidates[:0]
+    if k < len(candidates):
+        candidates = candidates[np.argpartition(-scores[candidates], k - 1)[:k]]
+    return candidates[np.argsort(-scores[candidates], kind="stable")]
+
 
 class EmbeddingProvider(ABC):
     """Abstract interface for generating embeddings."""
 
+    # Per-request API limits honoured by embed_many(); None means no limit
+    max_request_items: int | None = None
+    max_request_tokens: int | None = None
+    max_input_tokens: int | None = None
+
     def __init__(self, config: EmbeddingConfig) -> None:
         """Initialize the provider with the embedding configuration."""
         self.config = config
 
     @abstractmethod
-    def embed(self, texts: list[str]) -> list[list[float]]:
-        """Generate embeddings for a batch of texts."""
+    def embed(self, texts: list[str]) -> np.ndarray:
+        """Generate an (N, dim) float32 embedding matrix for a batch of texts."""
         pass
 
     @abstractmethod
-    def embed_single(self, text: str) -> list[float]:
-        """Generate embedding for a single text."""
+    def embed_single(self, text: str) -> np.ndarray:
+        """Generate a float32 embedding vector for a single text."""
         pass
 
+    def embed_into(self, texts: list[str], out: np.ndarray, row_offset: int = 0) -> None:
+        """Write embeddings for a batch of texts into rows of a preallocated matrix.
+
+        Args:
+            texts: Input texts to embed.
+            out: (N, dim) float32 matrix, e.g. an ``np.memmap``.
+            row_offset: Row of ``out`` receiving the first embedding.
+
+        Raises:
+            ValueError: If the provider returned a matrix of the wrong shape,
+                e.g. fewer rows than texts or another dimension.
+        """
+        if not texts:
+            return
+        target = out[row_offset : row_offset + len(texts)]
+        embeddings = np.asarray(self.embed(texts), dtype=np.float32)
+        if embeddings.shape != target.shape:
+            raise ValueError(
+                f"{type(self).__name__} returned embeddings of shape {embeddings.shape}, "
+                f"expected {target.shape}"
+            )
+        target[...] = embeddings
+
+    async def aembed_many(
+        self,
+        texts: list[str],
+        batch_size: int | None = None,
+        concurrency: int = EMBED_CONCURRENCY,
+        rate_limit_rpm: int = 0,
+        out: np.ndarray | None = None,
+    ) -> np.ndarray:
+        """Embed a large input in batches with overlapping requests.
+
+        Each batch is one embed_into() call running in a worker thread, so
+        the network round trips of up to ``concurrency`` batches overlap, and
+        every batch writes its rows straight into the result matrix. Batches
+        are also cut to stay within the provider's item and token limits,
+        and inputs longer than the model accepts are truncated.
+
+        Args:
+            texts: Input texts to embed.
+            batch_size: Texts per request; defaults to ``config.batch_size``.
+            concurrency: Maximum requests in flight.
+            rate_limit_rpm: Maximum requests started per minute; 0 disables limiting.
+            out: Optional preallocated (N, dim) float32 matrix to fill, such
+                as an ``np.memmap``; allocated in memory if omitted.
+
+        Returns:
+            (N, dim) float32 matrix with rows in input order (``out`` if given).
+
+        Raises:
+            ValueError: If ``out`` does not have one row per text.
+        """
+        if out is None:
+            out = np.empty((len(texts), self.config.dimension), dtype=np.float32)
+        elif len(out) != len(texts):
+            raise ValueError(f"out has {len(out)} rows for {len(texts)} texts")
+        if not texts:
+            return out
+        size = max(1, batch_size or self.config.batch_size)
+        semaphore = asyncio.Semaphore(max(1, concurrency))
+        limiter = AsyncRateLimiter(rate_limit_rpm)
+
+        async def embed_batch(batch: list[str], row_offset: int) -> None:
+            async with semaphore:
+                await limiter.acquire()
+                await asyncio.to_thread(self.embed_into, batch, out, row_offset)
+
+        jobs = []
+        row_offset = 0
+        for batch in self._batches(texts, size):
+            jobs.append(embed_batch(batch, row_offset))
+            row_offset += len(batch)
+        await asyncio.gather(*jobs)
+        return out
+
+    def _batches(self, texts: list[str], batch_size: int) -> Iterator[list[str]]:
+        """Split texts, in order, into request-sized batches."""
+        max_items = min(batch_size, self.max_request_items or batch_size)
+        max_chars = (self.max_input_tokens or 0) * CHARS_PER_TOKEN_ESTIMATE
+        batch: list[str] = []
+        batch_tokens = 0
+        for text in texts:
+            if max_chars and len(text) > max_chars:
+                text = text[:max_chars]
+            tokens = _estimate_tokens(text)
+            if batch and (
+                len(batch) >= max_items
+                or (self.max_request_tokens and batch_tokens + tokens > self.max_request_tokens)
+            ):
+                yield batch
+                batch, batch_tokens = [], 0
+            batch.append(text)
+            batch_tokens += tokens
+        if batch:
+            yield batch
+
+    def embed_many(
+        self,
+        texts: list[str],
+        batch_size: int | None = None,
+        concurrency: int = EMBED_CONCURRENCY,
+        rate_limit_rpm: int = 0,
+        out: np.ndarray | None = None,
+    ) -> np.ndarray:
+        """Blocking wrapper around aembed_many(); safe to call from any thread."""
+        coro = self.aembed_many(texts, batch_size, concurrency, rate_limit_rpm, out)
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            return asyncio.run(coro)
+        # Called from inside an event loop (e.g. an MCP tool handler)
+        with ThreadPoolExecutor(max_workers=1) as pool:
+            return pool.submit(asyncio.run, coro).result()
+
+    def embed_queries(self, texts: list[str]) -> np.ndarray:
+        """Embed a batch of search queries (as opposed to documents)."""
+        return self.embed(texts)
+
+    def embed_as_list(self, texts: list[str]) -> list[list[float]]:
+        """Generate embeddings as plain Python lists (e.g. for JSON output)."""
+        return self.embed(texts).tolist()
+
+    def _empty(self) -> np.ndarray:
+        """Return an embedding matrix with no rows."""
+        return np.empty((0, self.config.dimension), dtype=np.float32)
+
 
 class OpenAIEmbeddingProvider(EmbeddingProvider):
     """OpenAI embedding provider."""
 
+    max_request_items = 2048
+    max_request_tokens = 300_000
+    max_input_tokens = 8191
+
     def __init__(
         self,
         config: EmbeddingConfig,
@@ -65,7 +292,7 @@ class OpenAIEmbeddingProvider(EmbeddingProvider):
             # We allow init without key, but embed() will fail if not provided later
             self.client = None
         else:
-            self.client = OpenAI(api_key=api_key, base_url=base_url)
+            self.client = _openai_client(api_key, base_url)
 
     def _get_client(self) -> OpenAI:
         """Return an initialized OpenAI client, loading credentials if needed."""
@@ -73,47 +300,40 @@ class OpenAIEmbeddingProvider(EmbeddingProvider):
             api_key = os.environ.get(self.api_key_env)
             if not api_key:
                 raise ValueError(f"{self.api_key_env} environment variable is not set.")
-            self.client = OpenAI(api_key=api_key, base_url=self.base_url)
+            self.client = _openai_client(api_key, self.base_url)
         return self.client
 
-    def embed(self, texts: list[str]) -> list[list[float]]:
+    def embed(self, texts: list[str]) -> np.ndarray:
         """Generate embeddings for a batch of texts.
 
         Args:
             texts: Input texts to embed.
 
         Returns:
-            List of embedding vectors (one per input).
+            (N, dim) float32 matrix with one embedding row per input.
         """
         if not texts:
-            return []
+            return self._empty()
             
         client = self._get_client()
         response = client.embeddings.create(
             model=self.config.model_name,
             input=texts
         )
-        embeddings = [item.embedding for item in response.data]
-        
-        if self.config.normalize:
-            embeddings = [self._normalize(e) for e in embeddings]
-            
-        return embeddings
+        return _to_matrix([item.embedding for item in response.data], self.config.normalize)
 
-    def embed_single(self, text: str) -> list[float]:
+    def embed_single(self, text: str) -> np.ndarray:
         """Generate an embedding for a single text input."""
         return self.embed([text])[0]
 
-    def _normalize(self, vec: list[float]) -> list[float]:
-        """Normalize a vector to unit length for cosine similarity."""
-        import math
-        norm = math.sqrt(sum(x*x for x in vec))
-        return [x / norm for x in vec] if norm > 0 else vec
-
 
 class VoyageAIEmbeddingProvider(EmbeddingProvider):
     """VoyageAI embedding provider."""
 
+    max_request_items = 1000
+    max_request_tokens = 120_000
+    max_input_tokens = 32_000
+
     def __init__(
         self,
         config: EmbeddingConfig,
@@ -144,10 +364,10 @@ class VoyageAIEmbeddingProvider(EmbeddingProvider):
 
         return self.client
 
-    def embed(self, texts: list[str]) -> list[list[float]]:
-        """Generate document embeddings for a batch of texts."""
+    def embed(self, texts: list[str]) -> np.ndarray:
+        """Generate an (N, dim) float32 matrix of document embeddings."""
         if not texts:
-            return []
+            return self._empty()
 
         client = self._get_client()
         embeddings = client.embed(
@@ -156,33 +376,198 @@ class VoyageAIEmbeddingProvider(EmbeddingProvider):
             input_type="document",
         )
         if not embeddings:
-            return []
+            return self._empty()
 
-        if self.config.normalize:
-            embeddings = [self._normalize(e) for e in embeddings]
+        return _to_matrix(embeddings, self.config.normalize)
 
-        return embeddings
+    def embed_queries(self, texts: list[str]) -> np.ndarray:
+        """Generate an (N, dim) float32 matrix of query embeddings."""
+        if not texts:
+            return self._empty()
 
-    def embed_single(self, text: str) -> list[float]:
-        """Generate a query embedding for a single text input."""
         client = self._get_client()
         embeddings = client.embed(
-            texts=[text],
+            texts=texts,
             model=self.config.model_name,
             input_type="query",
         )
         if not embeddings:
-            return []
+            return self._empty()
+
+        return _to_matrix(embeddings, self.config.normalize)
+
+    def embed_single(self, text: str) -> np.ndarray:
+        """Generate a query embedding for a single text input."""
+        embeddings = self.embed_queries([text])
+        return embeddings[0] if len(embeddings) else np.empty(0, dtype=np.float32)
+
+
+class _PendingBatch:
+    """Queries collected for one provider call, and where results land."""
+
+    def __init__(self) -> None:
+        self.texts: list[str] = []
+        self.full = threading.Event()
+        self.done = threading.Event()
+        self.result: np.ndarray | None = None
+        self.error: BaseException | None = None
 
-        emb = embeddings[0]
-        return self._normalize(emb) if self.config.normalize else emb
 
-    def _normalize(self, vec: list[float]) -> list[float]:
-        """Normalize a vector to unit length for cosine similarity."""
-        import math
+class BatchingEmbedder(EmbeddingProvider):
+    """Coalesces concurrent single-query embeddings into batched calls.
 
-        norm = math.sqrt(sum(x * x for x in vec))
-        return [x / norm for x in vec] if norm > 0 else vec
+    The first caller to arrive waits up to ``max_wait_ms`` (or until
+    ``max_batch`` queries have joined) and then embeds every collected
+    query with one provider call; the other callers block until their rows
+    are ready. Document embeddings pass straight through to the wrapped
+    provider.
+
+    Query embeddings are also kept in a process-wide LRU cache keyed on the
+    model, normalization setting and query text, so a repeated query never
+    goes back to the provider. Recently used vectors are kept as float32;
+    older ones are quantized to int8 (a quarter of the memory) and restored
+    to float32 when they are used again.
+    """
+
+    _shared_cache: OrderedDict[bytes, np.ndarray] = OrderedDict()
+    _shared_quantized: OrderedDict[bytes, tuple[np.ndarray, float]] = OrderedDict()
+    _shared_cache_lock = threading.Lock()
+
+    def __init__(
+        self,
+        provider: EmbeddingProvider,
+        max_batch: int = 64,
+        max_wait_ms: float = 8.0,
+    ) -> None:
+        """Wrap a provider.
+
+        Args:
+            provider: Provider that performs the actual embedding calls.
+            max_batch: Maximum queries sent in one call.
+            max_wait_ms: How long the first query waits for others to join.
+        """
+        super().__init__(provider.config)
+        self.provider = provider
+        self.max_batch = max(1, max_batch)
+        self.max_wait = max_wait_ms / 1000.0
+        self._lock = threading.Lock()
+        self._pending: _PendingBatch | None = None
+
+    def embed(self, texts: list[str]) -> np.ndarray:
+        """Generate document embeddings with the wrapped provider."""
+        return self.provider.embed(texts)
+
+    def embed_queries(self, texts: list[str]) -> np.ndarray:
+        """Embed queries, from cache or in one call batched with concurrent callers."""
+        if not texts:
+            return self._empty()
+        keys = [self._cache_key(text) for text in texts]
+        vectors = [self._lookup(key) for key in keys]
+        missing = list(dict.fromkeys(t for t, v in zip(texts, vectors) if v is None))
+        if missing:
+            embedded = self._embed_batched(missing)
+            if len(embedded) != len(missing):
+                return self._empty()
+            fresh = dict(zip(missing, embedded))
+            with self._shared_cache_lock:
+                for text, vector in fresh.items():
+                    self._remember(self._cache_key(text), vector)
+            vectors = [fresh[t] if v is None else v for t, v in zip(texts, vectors)]
+        return np.vstack(vectors)
+
+    def _cache_key(self, text: str) -> bytes:
+        """Return the process-wide cache key for a query under this config."""
+        digest = hashlib.blake2b(digest_size=16)
+        cfg = self.config
+        digest.update(f"{cfg.provider}|{cfg.model_name}|{cfg.normalize}|".encode("utf-8"))
+        digest.update(text.encode("utf-8"))
+        return digest.digest()
+
+    def embed_single(self, text: str) -> np.ndarray:
+        """Embed one query, from cache or batched with concurrent callers."""
+        key = self._cache_key(text)
+        cached = self._lookup(key)
+        if cached is not None:
+            return cached
+
+        embedded = self._embed_batched([text])
+        if not len(embedded):
+            return np.empty(0, dtype=np.float32)
+        vector = embedded[0]
+        with self._shared_cache_lock:
+            self._remember(key, vector)
+        return vector
+
+    @classmethod
+    def _lookup(cls, key: bytes) -> np.ndarray | None:
+        """Return a cached query vector, restoring it from int8 if needed."""
+        with cls._shared_cache_lock:
+            cached = cls._shared_cache.get(key)
+            if cached is not None:
+                cls._shared_cache.move_to_end(key)
+                return cached
+            quantized = cls._shared_quantized.pop(key, None)
+            if quantized is not None:
+                vector = _dequantize(*quantized)
+                cls._remember(key, vector)
+                return vector
+        return None
+
+    @classmethod
+    def _remember(cls, key: bytes, vector: np.ndarray) -> None:
+        """Add a vector to the float32 tier, demoting the oldest to int8.
+
+        Must be called with ``_shared_cache_lock`` held.
+        """
+        # Shared between callers, so it must not be modified in place
+        vector.flags.writeable = False
+        cls._shared_cache[key] = vector
+        while len(cls._shared_cache) > QUERY_EMBEDDING_FULL_PRECISION_ENTRIES:
+            old_key, old_vector = cls._shared_cache.popitem(last=False)
+            cls._shared_quantized[old_key] = _quantize(old_vector)
+        quantized_limit = QUERY_EMBEDDING_CACHE_ENTRIES - QUERY_EMBEDDING_FULL_PRECISION_ENTRIES
+        while len(cls._shared_quantized) > max(0, quantized_limit):
+            cls._shared_quantized.popitem(last=False)
+
+    def _embed_batched(self, texts: list[str]) -> np.ndarray:
+        """Embed queries, sharing a provider call with concurrent callers.
+
+        Returns:
+            One row per text, or no rows if the provider returned too few.
+        """
+        with self._lock:
+            batch = self._pending
+            leader = batch is None
+            if leader:
+                batch = self._pending = _PendingBatch()
+            start = len(batch.texts)
+            batch.texts.extend(texts)
+            if len(batch.texts) >= self.max_batch:
+                # Later callers start a new batch
+                self._pending = None
+                batch.full.set()
+
+        if leader:
+            batch.full.wait(self.max_wait)
+            with self._lock:
+                if self._pending is batch:
+                    self._pending = None
+            try:
+                batch.result = self.provider.embed_queries(batch.texts)
+            except BaseException as e:
+                batch.error = e
+            finally:
+                batch.done.set()
+        else:
+            batch.done.wait()
+
+        if batch.error is not None:
+            raise batch.error
+        rows = batch.result[start : start + len(texts)]
+        if len(rows) != len(texts):
+            return rows[:0]
+        # Copy the rows so cached vectors do not pin the whole batch matrix
+        return rows.copy()
 
 
 def create_embedding_provider(
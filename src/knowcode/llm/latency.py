@@ -0,0 +1,70 @@
+"""Observed LLM latency, used to time hedged requests."""
+
+from __future__ import annotations
+
+from typing import Optional
+
+from knowcode.llm.state_file import SharedStateFile
+
+# Smoothing gains for the mean and mean deviation (as in TCP's RTO estimator)
+LATENCY_GAIN = 0.125
+DEVIATION_GAIN = 0.25
+# Deviations added to the mean: requests slower than this are in the tail
+DEVIATION_MULTIPLIER = 4.0
+
+
+class LatencyEstimator:
+    """Smoothed per-model latency of first streamed chunks and of responses.
+
+    Each observation updates an exponentially weighted mean and mean
+    deviation, the estimator TCP uses for retransmission timeouts.
+    hedge_delay() is the mean plus four deviations, so only requests in the
+    slow tail of a model's own history are hedged. Estimates live in the
+    shared state file, so later CLI invocations start from what earlier
+    ones observed.
+    """
+
+    def __init__(self, state_file: SharedStateFile) -> None:
+        """Initialize the estimator.
+
+        Args:
+            state_file: Shared state holding one slot per model.
+        """
+        self.state_file = state_file
+
+    def observe(self, model_name: str, seconds: float, first_chunk: bool) -> None:
+        """Record how long a successful request took.
+
+        Args:
+            model_name: Model that answered.
+            seconds: Time from sending the request to the first chunk
+                (``first_chunk``) or to the complete response.
+            first_chunk: Which of the two latencies ``seconds`` measures.
+        """
+        mean_field, dev_field = _fields(first_chunk)
+        with self.state_file.locked():
+            slot = self.state_file.read(model_name)
+            mean, dev = getattr(slot, mean_field), getattr(slot, dev_field)
+            if mean <= 0.0:
+                mean, dev = seconds, seconds / 2
+            else:
+                dev += DEVIATION_GAIN * (abs(seconds - mean) - dev)
+                mean += LATENCY_GAIN * (seconds - mean)
+            self.state_file.write(model_name, slot._replace(**{mean_field: mean, dev_field: dev}))
+
+    def hedge_delay(self, model_name: str, first_chunk: bool) -> Optional[float]:
+        """Return how long to wait on a model before hedging, if it has been observed."""
+        mean_field, dev_field = _fields(first_chunk)
+        with self.state_file.locked():
+            slot = self.state_file.read(model_name)
+        mean = getattr(slot, mean_field)
+        if mean <= 0.0:
+            return None
+        return mean + DEVIATION_MULTIPLIER * getattr(slot, dev_field)
+
+
+def _fields(first_chunk: bool) -> tuple[str, str]:
+    """Return the ModelSlot fields holding one latency's mean and deviation."""
+    if first_chunk:
+        return "first_chunk_latency", "first_chunk_deviation"
+    return "response_latency", "response_deviation"
@@ -4,11 +4,21 @@ Classifies user queries into TaskTypes (explain, debug, extend, review, locate)
 to enable task-specific context prioritization and prompt templates.
 """
 
+import functools
 import re
-from typing import Tuple
+from typing import Optional, Tuple
 
 from knowcode.data_models import TaskType
+from knowcode.utils.logger import get_logger
 
+try:
+    import hyperscan
+    HYPERSCAN_AVAILABLE = True
+except ImportError:
+    # Optional dependency; classify_query falls back to one re.search per pattern
+    HYPERSCAN_AVAILABLE = False
+
+logger = get_logger(__name__)
 
 # Pattern definitions for each task type
 # Each pattern is a tuple of (compiled_regex, weight)
@@ -56,10 +66,67 @@ TASK_PATTERNS = {
     TaskType.LOCATE: LOCATE_PATTERNS,
 }
 
+# Flattened (pattern, task_type, weight) rows; a row's index is its scan id
+_PATTERN_TABLE = [
+    (pattern, task_type, weight)
+    for task_type, patterns in TASK_PATTERNS.items()
+    for pattern, weight in patterns
+]
+_MAX_SCORES: dict[TaskType, int] = {
+    task_type: sum(weight for _, weight in patterns)
+    for task_type, patterns in TASK_PATTERNS.items()
+}
+# Copied at the start of every classification
+_INITIAL_SCORES: dict[TaskType, int] = {t: 0 for t in TaskType if t != TaskType.GENERAL}
+
+
+def _compile_scanner() -> Optional["hyperscan.Database"]:
+    """Compile every pattern into one Hyperscan database, if available."""
+    if not HYPERSCAN_AVAILABLE:
+        return None
+    # UCP mode does not support \b, so word boundaries are ASCII-only here
+    flags = hyperscan.HS_FLAG_CASELESS | hyperscan.HS_FLAG_SINGLEMATCH | hyperscan.HS_FLAG_UTF8
+    try:
+        db = hyperscan.Database()
+        db.compile(
+            expressions=[pattern.pattern.encode("utf-8") for pattern, _, _ in _PATTERN_TABLE],
+            ids=list(range(len(_PATTERN_TABLE))),
+            elements=len(_PATTERN_TABLE),
+            flags=flags,
+        )
+    except hyperscan.error as e:
+        logger.warning("Hyperscan could not compile query patterns, using re. Error: %s", e)
+        return None
+    return db
+
+
+_SCANNER = _compile_scanner()
+
 
+def _matched_patterns(query: str) -> list[int]:
+    """Return the table ids of all patterns found in the query."""
+    if _SCANNER is None:
+        return [i for i, (pattern, _, _) in enumerate(_PATTERN_TABLE) if pattern.search(query)]
+
+    matched: list[int] = []
+
+    def on_match(pattern_id: int, _start: int, _end: int, _flags: int, _context: object) -> None:
+        # SINGLEMATCH reports each pattern at most once per scan
+        matched.append(pattern_id)
+
+    _SCANNER.scan(query.encode("utf-8", "ignore"), match_event_handler=on_match)
+    return matched
+
+
+@functools.lru_cache(maxsize=2048)
 def classify_query(query: str) -> Tuple[TaskType, float]:
     """Classify a query into a TaskType with confidence score.
     
+    All patterns are matched in a single Hyperscan scan when the optional
+    ``hyperscan`` package is installed, and one by one with ``re`` otherwise.
+    Results are memoized: the classifier is pure, and the same query is
+    often classified again (retries, repeated questions, cached answers).
+
     Args:
         query: User's natural language query.
         
@@ -67,31 +134,34 @@ def classify_query(query: str) -> Tuple[TaskType, float]:
         Tuple of (TaskType, confidence) where confidence is 0.0-1.0.
         Returns (TaskType.GENERAL, 0.0) if no patterns match.
     """
-    scores: dict[TaskType, int] = {t: 0 for t in TaskType if t != TaskType.GENERAL}
+    scores = _INITIAL_SCORES.copy()
     
-    for task_type, patterns in TASK_PATTERNS.items():
-        for pattern, weight in patterns:
-            if pattern.search(query):
-                scores[task_type] += weight
+    # One pass over the query finds every matching pattern
+    for pattern_id in _matched_patterns(query):
+        _, task_type, weight = _PATTERN_TABLE[pattern_id]
+        scores[task_type] += weight
     
-    # Find highest scoring type
-    max_score = max(scores.values())
+    # Track the best type and the top two scores in one pass
+    best_type = TaskType.GENERAL
+    max_score = second_score = 0
+    for task_type, score in scores.items():
+        if score > max_score:
+            second_score = max_score
+            max_score, best_type = score, task_type
+        elif score > second_score:
+            second_score = score
     
     if max_score == 0:
         return TaskType.GENERAL, 0.0
     
-    best_type = max(scores, key=scores.get)  # type: ignore
-    
     # Calculate confidence based on score relative to maximum possible
     # and gap to second-best
-    total_possible = sum(weight for _, weight in TASK_PATTERNS[best_type])
+    total_possible = _MAX_SCORES[best_type]
     base_confidence = min(1.0, max_score / (total_possible * 0.5))  # 50% of max = full confidence
     
     # Boost confidence if clear winner (large gap to second place)
-    sorted_scores = sorted(scores.values(), reverse=True)
-    if len(sorted_scores) > 1 and sorted_scores[0] > 0:
-        gap_ratio = 1 - (sorted_scores[1] / sorted_scores[0])
-        base_confidence = min(1.0, base_confidence * (1 + gap_ratio * 0.3))
+    gap_ratio = 1 - (second_score / max_score)
+    base_confidence = min(1.0, base_confidence * (1 + gap_ratio * 0.3))
     
     return best_type, round(base_confidence, 2)
 
@@ -1,96 +1,134 @@
 """Rate limiter for LLM requests."""
 
-import json
+import asyncio
+import functools
 import time
 from pathlib import Path
-from typing import Dict, List
+from typing import Optional
 
 from knowcode.config import ModelConfig
+from knowcode.llm.state_file import ModelSlot, SharedStateFile
+from knowcode.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+DEFAULT_STATE_PATH = Path.home() / ".knowcode" / "rate_state.mmap"
+MINUTE_NS = 60 * 1_000_000_000
+DAY_NS = 86400 * 1_000_000_000
 
 
 class RateLimiter:
-    """Tracks and limits LLM usage based on RPM and RPD."""
+    """Tracks and limits LLM usage based on RPM and RPD.
+
+    Usage is counted per model in a minute window and a day window, each
+    starting at the first request made after the previous one expired.
+    Counters live in a memory-mapped file, so every KnowCode process on the
+    machine enforces the same limits.
+    """
 
-    def __init__(self, persistence_path: Path = Path.home() / ".knowcode" / "usage_stats.json"):
+    def __init__(self, persistence_path: Optional[Path] = None):
         """Initialize the rate limiter.
-        
+
         Args:
-            persistence_path: Path to the JSON file storing usage stats.
+            persistence_path: Path to the memory-mapped usage state; defaults
+                to ~/.knowcode/rate_state.mmap.
         """
-        self.persistence_path = persistence_path
-        self.usage_data: Dict[str, List[float]] = {}
-        self._load()
-
-    def _load(self) -> None:
-        """Load usage data from disk."""
-        if self.persistence_path.exists():
-            try:
-                with open(self.persistence_path, "r", encoding="utf-8") as f:
-                    self.usage_data = json.load(f)
-            except (json.JSONDecodeError, OSError) as e:
-                print(f"Warning: Failed to load usage stats, starting fresh. Error: {e}")
-                self.usage_data = {}
-        else:
-            self.usage_data = {}
-
-        # Ensure directory exists for future saves
-        self.persistence_path.parent.mkdir(parents=True, exist_ok=True)
-
-    def _save(self) -> None:
-        """Save usage data to disk."""
-        try:
-            # Clean up old data before saving to keep file small
-            self._cleanup()
-            with open(self.persistence_path, "w", encoding="utf-8") as f:
-                json.dump(self.usage_data, f)
-        except OSError as e:
-             print(f"Warning: Failed to save usage stats. Error: {e}")
-
-    def _cleanup(self) -> None:
-        """Remove timestamps older than 24 hours."""
-        now = time.time()
-        cutoff = now - 86400  # 24 hours
-        
-        cleaned_data = {}
-        for model, timestamps in self.usage_data.items():
-            valid = [t for t in timestamps if t > cutoff]
-            if valid:
-                cleaned_data[model] = valid
-        
-        self.usage_data = cleaned_data
+        self.persistence_path = persistence_path or DEFAULT_STATE_PATH
+        self.state_file = SharedStateFile(self.persistence_path)
+
+    @staticmethod
+    def _window_counts(slot: ModelSlot, now_ns: int) -> tuple[int, int]:
+        """Return the (minute, day) request counts still inside their windows."""
+        minute = slot.minute_count if now_ns - slot.minute_start_ns < MINUTE_NS else 0
+        day = slot.day_count if now_ns - slot.day_start_ns < DAY_NS else 0
+        return minute, day
 
     def check_availability(self, model_config: ModelConfig) -> bool:
         """Check if a model is within its rate limits.
-        
+
         Args:
             model_config: The model configuration containing limits.
-            
+
         Returns:
             True if available, False if limit exceeded.
         """
-        timestamps = self.usage_data.get(model_config.name, [])
-        now = time.time()
-        
-        # Check RPM (last 60 seconds)
-        cutoff_min = now - 60
-        last_minute_requests = [t for t in timestamps if t > cutoff_min]
-        if len(last_minute_requests) >= model_config.rpm_free_tier_limit:
-            print(f"  ⚠️ Limit Reached: {model_config.name} used {len(last_minute_requests)}/{model_config.rpm_free_tier_limit} RPM.")
+        with self.state_file.locked():
+            slot = self.state_file.read(model_config.name)
+        used_minute, used_day = self._window_counts(slot, time.time_ns())
+
+        if used_minute >= model_config.rpm_free_tier_limit:
+            logger.warning(
+                "⚠️ Limit Reached: %s used %d/%d RPM.",
+                model_config.name,
+                used_minute,
+                model_config.rpm_free_tier_limit,
+            )
             return False
-            
-        # Check RPD (last 24 hours)
-        cutoff_day = now - 86400
-        last_day_requests = [t for t in timestamps if t > cutoff_day]
-        if len(last_day_requests) >= model_config.rpd_free_tier_limit:
-            print(f"  ⚠️ Limit Reached: {model_config.name} used {len(last_day_requests)}/{model_config.rpd_free_tier_limit} RPD.")
+
+        if used_day >= model_config.rpd_free_tier_limit:
+            logger.warning(
+                "⚠️ Limit Reached: %s used %d/%d RPD.",
+                model_config.name,
+                used_day,
+                model_config.rpd_free_tier_limit,
+            )
             return False
-            
+
         return True
 
     def record_usage(self, model_name: str) -> None:
         """Record a successful request."""
-        if model_name not in self.usage_data:
-            self.usage_data[model_name] = []
-        
-        self.usage_data[model_name].append(time.time())
-        self._save()
+        now = time.time_ns()
+        with self.state_file.locked():
+            slot = self.state_file.read(model_name)
+            used_minute, used_day = self._window_counts(slot, now)
+            self.state_file.write(
+                model_name,
+                slot._replace(
+                    minute_start_ns=slot.minute_start_ns if used_minute else now,
+                    minute_count=used_minute + 1,
+                    day_start_ns=slot.day_start_ns if used_day else now,
+                    day_count=used_day + 1,
+                ),
+            )
+
+
+def get_rate_limiter(persistence_path: Optional[Path] = None) -> RateLimiter:
+    """Return the process-wide rate limiter for a state file.
+
+    Args:
+        persistence_path: Path to the memory-mapped usage state; defaults
+            to ~/.knowcode/rate_state.mmap.
+    """
+    return _shared_rate_limiter(persistence_path or DEFAULT_STATE_PATH)
+
+
+@functools.lru_cache(maxsize=4)
+def _shared_rate_limiter(path: Path) -> RateLimiter:
+    """Open each state file once per process, however many agents use it."""
+    return RateLimiter(path)
+
+
+class AsyncRateLimiter:
+    """Spaces out request starts to stay under a requests-per-minute budget."""
+
+    def __init__(self, rate_limit_rpm: int) -> None:
+        """Initialize the limiter.
+
+        Args:
+            rate_limit_rpm: Maximum request starts per minute; 0 disables limiting.
+        """
+        self.interval = 60.0 / rate_limit_rpm if rate_limit_rpm > 0 else 0.0
+        self._next_slot = 0.0
+        self._lock = asyncio.Lock()
+
+    async def acquire(self) -> None:
+        """Wait until the next request may start."""
+        if not self.interval:
+            return
+        async with self._lock:
+            now = time.monotonic()
+            wait = self._next_slot - now
+            self._next_slot = max(now, self._next_slot) + self.interval
+        if wait > 0:
+            await asyncio.sleep(wait)
@@ -0,0 +1,150 @@
+"""Memory-mapped per-model state shared between KnowCode processes."""
+
+from __future__ import annotations
+
+import hashlib
+import mmap
+import os
+import struct
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Iterator, NamedTuple, Optional
+
+from knowcode.utils.logger import get_logger
+
+try:
+    import fcntl
+except ImportError:  # Windows: slots are shared, but updates are only serialized in-process
+    fcntl = None  # type: ignore[assignment]
+
+logger = get_logger(__name__)
+
+STATE_MAGIC = b"KCRS"
+STATE_VERSION = 2
+HEADER = struct.Struct("<4sI8x")
+# key hash, minute window start/count, day window start/count,
+# breaker state/failures/opened_at, first-chunk and response latency
+# (smoothed mean and deviation of each)
+SLOT = struct.Struct("<QQIQIBIdffff")
+SLOT_SIZE = 64
+SLOT_COUNT = 64
+
+
+class ModelSlot(NamedTuple):
+    """Fixed-size record kept for one model."""
+
+    minute_start_ns: int = 0
+    minute_count: int = 0
+    day_start_ns: int = 0
+    day_count: int = 0
+    breaker_state: int = 0
+    breaker_failures: int = 0
+    breaker_opened_at: float = 0.0
+    first_chunk_latency: float = 0.0
+    first_chunk_deviation: float = 0.0
+    response_latency: float = 0.0
+    response_deviation: float = 0.0
+
+
+def _slot_key(name: str) -> int:
+    """Hash a model name to a non-zero slot key (zero marks a free slot)."""
+    digest = hashlib.blake2b(name.encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(digest, "little") or 1
+
+
+class SharedStateFile:
+    """Fixed-size model slots in a memory-mapped file.
+
+    Every process mapping the same file sees the others' updates without
+    re-reading or re-parsing it. Callers group reads and writes that must
+    be atomic in ``locked()``, which holds an exclusive ``flock`` where
+    available. If the file cannot be opened, state falls back to an
+    anonymous in-memory map for the lifetime of the process.
+    """
+
+    def __init__(self, path: Path, slot_count: int = SLOT_COUNT) -> None:
+        """Open (creating if needed) the state file.
+
+        Args:
+            path: Location of the memory-mapped file.
+            slot_count: Number of model slots in the file.
+        """
+        self.path = path
+        self.slot_count = slot_count
+        self._size = HEADER.size + slot_count * SLOT_SIZE
+        self._fd: Optional[int] = None
+        self._lock = threading.Lock()
+        try:
+            self._map = self._open_file()
+        except OSError as e:
+            logger.warning("Failed to open rate state at %s, keeping it in memory. Error: %s", path, e)
+            self._fd = None
+            self._map = mmap.mmap(-1, self._size)
+
+        with self.locked():
+            magic, version = HEADER.unpack_from(self._map, 0)
+            if magic != STATE_MAGIC or version != STATE_VERSION:
+                self._map[: self._size] = bytes(self._size)
+                HEADER.pack_into(self._map, 0, STATE_MAGIC, STATE_VERSION)
+
+    def _open_file(self) -> mmap.mmap:
+        """Map the backing file, growing it to the required size."""
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o600)
+        try:
+            if os.fstat(fd).st_size < self._size:
+                os.ftruncate(fd, self._size)
+            mapped = mmap.mmap(fd, self._size)
+        except OSError:
+            os.close(fd)
+            raise
+        self._fd = fd
+        return mapped
+
+    @contextmanager
+    def locked(self) -> Iterator[None]:
+        """Hold an exclusive lock on the state for a read-modify-write."""
+        with self._lock:
+            if fcntl is not None and self._fd is not None:
+                fcntl.flock(self._fd, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                if fcntl is not None and self._fd is not None:
+                    fcntl.flock(self._fd, fcntl.LOCK_UN)
+
+    def _find(self, key: int, claim: bool) -> Optional[int]:
+        """Return the byte offset of a key's slot (open addressing)."""
+        for probe in range(self.slot_count):
+            offset = HEADER.size + ((key + probe) % self.slot_count) * SLOT_SIZE
+            (slot_key,) = struct.unpack_from("<Q", self._map, offset)
+            if slot_key == key:
+                return offset
+            if slot_key == 0:
+                return offset if claim else None
+        return None
+
+    def read(self, name: str) -> ModelSlot:
+        """Return the slot for a model; call inside ``locked()``."""
+        key = _slot_key(name)
+        offset = self._find(key, claim=False)
+        if offset is None:
+            return ModelSlot()
+        return ModelSlot(*SLOT.unpack_from(self._map, offset)[1:])
+
+    def write(self, name: str, slot: ModelSlot) -> None:
+        """Store the slot for a model; call inside ``locked()``."""
+        key = _slot_key(name)
+        offset = self._find(key, claim=True)
+        if offset is None:
+            logger.warning("Rate state is full; not persisting state for %s.", name)
+            return
+        SLOT.pack_into(self._map, offset, key, *slot)
+
+    def close(self) -> None:
+        """Unmap the file and release its descriptor."""
+        self._map.close()
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
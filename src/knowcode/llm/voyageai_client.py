@@ -5,6 +5,7 @@ Provides integration with VoyageAI's embedding and reranking APIs:
 - rerank-2.5: Cross-encoder reranking for improved relevance
 """
 
+import functools
 import os
 from typing import Any, Optional
 
@@ -106,6 +107,8 @@ class VoyageAIClient:
 
 def get_voyageai_client(api_key_env: str = "VOYAGE_API_KEY_1") -> Optional[VoyageAIClient]:
     """Get VoyageAI client if available and configured.
+
+    Callers using the same API key share one client.
     
     Args:
         api_key_env: Environment variable for API key.
@@ -113,7 +116,13 @@ def get_voyageai_client(api_key_env: str = "VOYAGE_API_KEY_1") -> Optional[Voyag
     Returns:
         VoyageAIClient or None if not available.
     """
-    try:
-        return VoyageAIClient(api_key_env=api_key_env)
-    except (ImportError, ValueError):
+    api_key = os.environ.get(api_key_env)
+    if not VOYAGEAI_AVAILABLE or not api_key:
         return None
+    return _shared_client(api_key)
+
+
+@functools.lru_cache(maxsize=4)
+def _shared_client(api_key: str) -> VoyageAIClient:
+    """Return the process-wide client for an API key, reusing its connections."""
+    return VoyageAIClient(api_key=api_key)
@@ -7,9 +7,13 @@ to LLM applications via the Model Context Protocol.
 from __future__ import annotations
 
 import asyncio
+import functools
 import json
+import os
+import threading
+from collections import OrderedDict
 from pathlib import Path
-from typing import Any, Optional
+from typing import Any, Callable, Optional
 
 # MCP imports - requires: pip install mcp
 try:
@@ -27,6 +31,7 @@ except ImportError:
 from knowcode.service import KnowCodeService
 from knowcode.storage.knowledge_store import KnowledgeStore
 from knowcode.data_models import TaskType
+from knowcode.utils.serialization import dumps
 
 
 # Tool definitions for MCP
@@ -142,6 +147,56 @@ TOOL_DEFINITIONS = [
 ]
 
 
+# Tools whose results depend only on their arguments and the loaded store
+MEMOIZED_TOOLS = frozenset({"get_entity_context", "trace_calls", "retrieve_context_for_query"})
+# Serialized tool results kept per server
+TOOL_RESULT_CACHE_SIZE = 512
+# Deepest call trace served by trace_calls
+MAX_TRACE_DEPTH = 5
+# Tool calls executed at once in worker threads
+TOOL_CALL_CONCURRENCY = os.cpu_count() or 4
+
+# Task type values accepted from tool arguments; unknown values mean GENERAL
+_TASK_TYPES = {t.value: t for t in TaskType}
+
+# Tool objects are immutable, so list_tools() serves the same instances
+_TOOLS: list["Tool"] = (
+    [
+        Tool(name=t["name"], description=t["description"], inputSchema=t["inputSchema"])
+        for t in TOOL_DEFINITIONS
+    ]
+    if MCP_AVAILABLE
+    else []
+)
+
+
+def _encode(result: Any) -> str:
+    """Serialize a tool result as compact JSON (orjson when installed)."""
+    return dumps(result).decode("utf-8")
+
+
+def _is_memoizable(result: Any) -> bool:
+    """Return whether a tool result may be replayed for the same arguments.
+
+    Failures are not cached: plain ``error`` replies, and retrievals that
+    report ``errors`` (e.g. a failed auto-analyze or a semantic search that
+    fell back to lexical) or found no retrieval mode at all.
+    """
+    if not isinstance(result, dict):
+        return True
+    return (
+        "error" not in result
+        and not result.get("errors")
+        and result.get("retrieval_mode") != "none"
+    )
+
+
+@functools.lru_cache(maxsize=64)
+def _unknown_tool_response(name: str) -> str:
+    """Return the serialized error for a call to an unknown tool."""
+    return _encode({"error": f"Unknown tool: {name}"})
+
+
 class KnowCodeMCPServer:
     """MCP Server wrapper for KnowCode."""
     
@@ -155,9 +210,27 @@ class KnowCodeMCPServer:
         self.store_path = Path(store_path)
         self.config_path = config_path
         self._service: Optional[KnowCodeService] = None
-        
+        # Serialized results of MEMOIZED_TOOLS, valid for one store snapshot
+        self._results: OrderedDict[tuple[str, str], str] = OrderedDict()
+        self._results_store: Any = None
+        # Tool calls run in worker threads (see create_server)
+        self._lock = threading.Lock()
+        self._results_lock = threading.Lock()
+        # Tool name -> handler taking the raw MCP arguments
+        self._dispatch: dict[str, Callable[[dict[str, Any]], Any]] = {
+            "search_codebase": self._call_search_codebase,
+            "get_entity_context": self._call_get_entity_context,
+            "trace_calls": self._call_trace_calls,
+            "retrieve_context_for_query": self._call_retrieve_context_for_query,
+        }
+
     def _ensure_service(self, allow_missing_store: bool = False) -> KnowCodeService:
         """Create the shared service (loads store/index lazily)."""
+        with self._lock:
+            return self._create_service(allow_missing_store)
+
+    def _create_service(self, allow_missing_store: bool) -> KnowCodeService:
+        """Create the service on first use; call with ``self._lock`` held."""
         if self._service is None:
             store_file = self.store_path
             if store_file.is_dir():
@@ -175,13 +248,30 @@ class KnowCodeMCPServer:
             )
         return self._service
 
+    def prewarm(self) -> None:
+        """Load the knowledge store and its search text ahead of the first call.
+
+        Does nothing if the store has not been built yet; tool calls then
+        build it on demand as before. The load happens under the service's
+        lock for lazy members, so concurrent tool calls reuse it.
+        """
+        try:
+            service = self._ensure_service()
+        except FileNotFoundError:
+            return
+        # An empty pattern matches the first entity, building the search text
+        service.store.search("", limit=1)
+
     def _ensure_store_ready(self, service: KnowCodeService) -> None:
         """Ensure the knowledge store exists by running analyze if needed."""
         store_root = service.store_path if service.store_path.is_dir() else service.store_path.parent
         store_file = store_root / KnowledgeStore.DEFAULT_FILENAME
         if store_file.exists():
             return
-        service.analyze(directory=store_root, output=store_root)
+        with self._lock:
+            # Concurrent tool calls must not analyze the same directory twice
+            if not store_file.exists():
+                service.analyze(directory=store_root, output=store_root)
     
     def search_codebase(self, query: str, limit: int = 10) -> list[dict[str, Any]]:
         """Search for entities by name pattern.
@@ -195,7 +285,7 @@ class KnowCodeMCPServer:
         """
         service = self._ensure_service(allow_missing_store=True)
         self._ensure_store_ready(service)
-        entities = service.store.search(query)[:limit]
+        entities = service.store.search(query, limit=limit)
         
         return [
             {
@@ -227,10 +317,7 @@ class KnowCodeMCPServer:
         """
         service = self._ensure_service(allow_missing_store=True)
         self._ensure_store_ready(service)
-        try:
-            task = TaskType(task_type)
-        except ValueError:
-            task = TaskType.GENERAL
+        task = _TASK_TYPES.get(task_type, TaskType.GENERAL)
 
         try:
             bundle = service.get_context(entity_id, max_tokens=max_tokens, task_type=task)
@@ -242,8 +329,10 @@ class KnowCodeMCPServer:
                 "task_type": task.value,
             }
 
-        entity = service.store.get_entity(bundle.get("entity_id", entity_id))
-        qualified_name = entity.qualified_name if entity else ""
+        qualified_name = bundle.get("qualified_name")
+        if qualified_name is None:
+            entity = service.store.get_entity(bundle.get("entity_id", entity_id))
+            qualified_name = entity.qualified_name if entity else ""
 
         return {
             "entity_id": bundle.get("entity_id", entity_id),
@@ -275,7 +364,7 @@ class KnowCodeMCPServer:
         return service.store.trace_calls(
             entity_id,
             direction=direction,
-            depth=min(depth, 5),
+            depth=min(depth, MAX_TRACE_DEPTH),
             max_results=50,
         )
 
@@ -291,10 +380,7 @@ class KnowCodeMCPServer:
         service = self._ensure_service(allow_missing_store=True)
         task_override: Optional[TaskType] = None
         if task_type != "auto":
-            try:
-                task_override = TaskType(task_type)
-            except ValueError:
-                task_override = TaskType.GENERAL
+            task_override = _TASK_TYPES.get(task_type, TaskType.GENERAL)
 
         return service.retrieve_context_for_query(
             query=query,
@@ -314,46 +400,97 @@ class KnowCodeMCPServer:
         Returns:
             JSON string result.
         """
+        key: Optional[tuple[str, str]] = None
+        if name in MEMOIZED_TOOLS:
+            depth = arguments.get("depth", 1)
+            if name == "trace_calls" and isinstance(depth, int):
+                # Deeper traces are clamped, so they share the clamped result;
+                # other values go through to the handler and its error reply
+                arguments = {**arguments, "depth": min(depth, MAX_TRACE_DEPTH)}
+            try:
+                key = (name, json.dumps(arguments, sort_keys=True))
+            except (TypeError, ValueError):
+                key = None
+        if key is not None:
+            with self._results_lock:
+                cached = self._current_results().get(key)
+                if cached is not None:
+                    self._results.move_to_end(key)
+                    return cached
+
+        handler = self._dispatch.get(name)
+        if handler is None:
+            return _unknown_tool_response(name)
         try:
-            if name == "search_codebase":
-                result = self.search_codebase(
-                    query=arguments["query"],
-                    limit=arguments.get("limit", 10),
-                )
-            elif name == "get_entity_context":
-                result = self.get_entity_context(
-                    entity_id=arguments["entity_id"],
-                    task_type=arguments.get("task_type", "general"),
-                    max_tokens=arguments.get("max_tokens", 2000),
-                )
-            elif name == "trace_calls":
-                result = self.trace_calls(
-                    entity_id=arguments["entity_id"],
-                    direction=arguments.get("direction", "callees"),
-                    depth=arguments.get("depth", 1),
-                )
-            elif name == "retrieve_context_for_query":
-                result = self.retrieve_context_for_query(
-                    query=arguments["query"],
-                    task_type=arguments.get("task_type", "auto"),
-                    max_tokens=arguments.get("max_tokens", 6000),
-                    limit_entities=arguments.get("limit_entities", 3),
-                    expand_deps=arguments.get("expand_deps", True),
-                )
-            else:
-                result = {"error": f"Unknown tool: {name}"}
-                
-            return json.dumps(result, indent=2)
+            result = handler(arguments)
         except Exception as e:
-            return json.dumps({"error": str(e)})
+            return _encode({"error": str(e)})
+
+        text = _encode(result)
+        if key is not None and _is_memoizable(result):
+            with self._results_lock:
+                results = self._current_results()
+                results[key] = text
+                if len(results) > TOOL_RESULT_CACHE_SIZE:
+                    results.popitem(last=False)
+        return text
+
+    def _current_results(self) -> OrderedDict[tuple[str, str], str]:
+        """Return the result cache, emptied if the service's store was replaced.
+
+        Call with ``self._results_lock`` held.
+        """
+        store = getattr(self._service, "_store", None)
+        if store is not self._results_store:
+            self._results.clear()
+            self._results_store = store
+        return self._results
 
+    def _call_search_codebase(self, arguments: dict[str, Any]) -> Any:
+        """Run search_codebase with MCP tool arguments."""
+        return self.search_codebase(
+            query=arguments["query"],
+            limit=arguments.get("limit", 10),
+        )
+
+    def _call_get_entity_context(self, arguments: dict[str, Any]) -> Any:
+        """Run get_entity_context with MCP tool arguments."""
+        return self.get_entity_context(
+            entity_id=arguments["entity_id"],
+            task_type=arguments.get("task_type", "general"),
+            max_tokens=arguments.get("max_tokens", 2000),
+        )
+
+    def _call_trace_calls(self, arguments: dict[str, Any]) -> Any:
+        """Run trace_calls with MCP tool arguments."""
+        return self.trace_calls(
+            entity_id=arguments["entity_id"],
+            direction=arguments.get("direction", "callees"),
+            depth=arguments.get("depth", 1),
+        )
+
+    def _call_retrieve_context_for_query(self, arguments: dict[str, Any]) -> Any:
+        """Run retrieve_context_for_query with MCP tool arguments."""
+        return self.retrieve_context_for_query(
+            query=arguments["query"],
+            task_type=arguments.get("task_type", "auto"),
+            max_tokens=arguments.get("max_tokens", 6000),
+            limit_entities=arguments.get("limit_entities", 3),
+            expand_deps=arguments.get("expand_deps", True),
+        )
 
-def create_server(store_path: str | Path, config_path: Optional[str] = None) -> "Server":
+
+def create_server(
+    store_path: str | Path,
+    config_path: Optional[str] = None,
+    knowcode: Optional[KnowCodeMCPServer] = None,
+) -> "Server":
     """Create an MCP server instance.
     
     Args:
         store_path: Path to knowledge store.
         config_path: Optional configuration file path for model priorities.
+        knowcode: Tool backend to serve; created from the paths if omitted.
         
     Returns:
         Configured MCP Server.
@@ -364,24 +501,21 @@ def create_server(store_path: str | Path, config_path: Optional[str] = None) ->
         )
     
     server = Server("knowcode")
-    knowcode = KnowCodeMCPServer(store_path, config_path=config_path)
+    if knowcode is None:
+        knowcode = KnowCodeMCPServer(store_path, config_path=config_path)
+    tool_slots = asyncio.Semaphore(TOOL_CALL_CONCURRENCY)
     
     @server.list_tools()
     async def list_tools() -> list[Tool]:
         """List available KnowCode tools."""
-        return [
-            Tool(
-                name=t["name"],
-                description=t["description"],
-                inputSchema=t["inputSchema"],
-            )
-            for t in TOOL_DEFINITIONS
-        ]
+        return _TOOLS
     
     @server.call_tool()
     async def call_tool(name: str, arguments: dict[str, Any]) -> CallToolResult:
         """Execute a KnowCode tool."""
-        result_text = knowcode.handle_tool_call(name, arguments)
+        # Run off the event loop so slow calls don't stall stdio traffic
+        async with tool_slots:
+            result_text = await asyncio.to_thread(knowcode.handle_tool_call, name, arguments)
         return CallToolResult(
             content=[TextContent(type="text", text=result_text)]
         )
@@ -401,8 +535,14 @@ async def run_server_async(store_path: str | Path, config_path: Optional[str] =
             "MCP package not installed. Install with: pip install mcp"
         )
     
-    server = create_server(store_path, config_path=config_path)
-    
+    knowcode = KnowCodeMCPServer(store_path, config_path=config_path)
+    server = create_server(store_path, config_path=config_path, knowcode=knowcode)
+
+    # Load the store while the client connects; a tool call arriving first
+    # waits on KnowCodeService's lock for that load instead of starting another
+    warmup = asyncio.create_task(asyncio.to_thread(knowcode.prewarm))
+    warmup.add_done_callback(_consume_prewarm_failure)
+
     async with stdio_server() as (read_stream, write_stream):
         await server.run(
             read_stream,
@@ -411,6 +551,15 @@ async def run_server_async(store_path: str | Path, config_path: Optional[str] =
         )
 
 
+def _consume_prewarm_failure(task: "asyncio.Task[None]") -> None:
+    """Drop a failed warm-up's exception; the next tool call reports it instead.
+
+    Nothing is logged here, since stdout carries the MCP protocol.
+    """
+    if not task.cancelled():
+        task.exception()
+
+
 def run_server(store_path: str | Path, config_path: Optional[str] = None) -> None:
     """Run the MCP server (blocking).
     
@@ -1,8 +1,13 @@
 """Base parser using Tree-sitter."""
 
 from __future__ import annotations
+import functools
+import queue
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
 from pathlib import Path
-from typing import Any, Optional
+from typing import Any, Iterator, Optional
 
 from tree_sitter import Parser
 import tree_sitter_languages
@@ -15,6 +20,73 @@ from knowcode.data_models import (
     Relationship,
 )
 
+# Files whose last syntax tree is kept for incremental reparsing
+PARSE_TREE_CACHE_SIZE = 256
+# Bytes compared per step when looking for the edited region
+_DIFF_BLOCK = 4096
+# Idle tree-sitter parsers per language. A Parser is not safe to use from
+# two threads at once, so each parse borrows one and returns it afterwards.
+_IDLE_PARSERS: dict[str, queue.SimpleQueue[Parser]] = {}
+
+
+def _common_prefix(a: bytes, b: bytes) -> int:
+    """Return the length of the common prefix of two byte strings."""
+    limit = min(len(a), len(b))
+    i = 0
+    while i < limit and a[i : i + _DIFF_BLOCK] == b[i : i + _DIFF_BLOCK]:
+        i += _DIFF_BLOCK
+    i = min(i, limit)
+    while i < limit and a[i] == b[i]:
+        i += 1
+    return i
+
+
+def _point(source: bytes, offset: int) -> tuple[int, int]:
+    """Return the (row, byte column) of an offset, as tree-sitter counts them."""
+    return source.count(b"\n", 0, offset), offset - (source.rfind(b"\n", 0, offset) + 1)
+
+
+def _edit_tree(tree: Any, old: bytes, new: bytes) -> None:
+    """Describe the change from ``old`` to ``new`` to ``tree`` as one edit."""
+    start = _common_prefix(old, new)
+    # Common suffix, not overlapping the prefix
+    max_suffix = min(len(old), len(new)) - start
+    suffix = _common_prefix(old[::-1][:max_suffix], new[::-1][:max_suffix])
+    old_end = len(old) - suffix
+    new_end = len(new) - suffix
+    tree.edit(
+        start_byte=start,
+        old_end_byte=old_end,
+        new_end_byte=new_end,
+        start_point=_point(old, start),
+        old_end_point=_point(old, old_end),
+        new_end_point=_point(new, new_end),
+    )
+
+
+@functools.lru_cache(maxsize=None)
+def _get_language(language_name: str) -> Any:
+    """Load a grammar once per process; every parser of a language shares it."""
+    return tree_sitter_languages.get_language(language_name)
+
+
+@functools.lru_cache(maxsize=None)
+def _compile_query(language_name: str, source: str) -> Any:
+    """Compile a query once per process for a language."""
+    return _get_language(language_name).query(source)
+
+
+def document_order(node: Any) -> tuple[int, int]:
+    """Sort key placing a node after its ancestors and before later nodes."""
+    return node.start_byte, -node.end_byte
+
+
+def _line_count(source: bytes) -> int:
+    """Return the number of lines in newline-normalized source."""
+    if not source:
+        return 0
+    return source.count(b"\n") + (not source.endswith(b"\n"))
+
 
 class TreeSitterParser:
     """Base class for parsers using Tree-sitter."""
@@ -26,9 +98,33 @@ class TreeSitterParser:
             language_name: Name of the language (e.g., 'python', 'javascript', 'java').
         """
         self.language_name = language_name
-        self.language = tree_sitter_languages.get_language(language_name)
-        self.parser = Parser()
-        self.parser.set_language(self.language)
+        self.language = _get_language(language_name)
+        self._idle_parsers = _IDLE_PARSERS.setdefault(language_name, queue.SimpleQueue())
+        # path -> (source bytes, tree) of the last parse, for incremental reparsing
+        self._tree_cache: OrderedDict[str, tuple[bytes, Any]] = OrderedDict()
+        self._tree_cache_lock = threading.Lock()
+
+    @contextmanager
+    def _borrow_parser(self) -> Iterator[Parser]:
+        """Lend an idle parser for this language, creating one if none is free."""
+        try:
+            parser = self._idle_parsers.get_nowait()
+        except queue.Empty:
+            parser = Parser()
+            parser.set_language(self.language)
+        try:
+            yield parser
+        finally:
+            self._idle_parsers.put(parser)
+
+    def _query(self, source: str) -> Any:
+        """Return a compiled query for this parser's language."""
+        return _compile_query(self.language_name, source)
+
+    def forget(self, file_path: str | Path) -> None:
+        """Drop the cached syntax tree of a file (e.g. after it was deleted)."""
+        with self._tree_cache_lock:
+            self._tree_cache.pop(str(file_path), None)
 
     def parse_file(self, file_path: str | Path) -> ParseResult:
         """Parse a source file.
@@ -43,7 +139,13 @@ class TreeSitterParser:
         errors: list[str] = []
 
         try:
-            source_code = file_path.read_text(encoding="utf-8")
+            source_bytes = file_path.read_bytes()
+            if b"\r" in source_bytes:
+                # Match text-mode newline translation so node text has no "\r".
+                # "\r" and "\n" never occur inside a UTF-8 multi-byte
+                # sequence, so this is safe before decoding.
+                source_bytes = source_bytes.replace(b"\r\n", b"\n").replace(b"\r", b"\n")
+            source_code = source_bytes.decode("utf-8")
         except Exception as e:
             return ParseResult(
                 file_path=str(file_path),
@@ -53,7 +155,7 @@ class TreeSitterParser:
             )
 
         try:
-            tree = self.parser.parse(bytes(source_code, "utf8"))
+            tree = self._parse_incremental(str(file_path), source_bytes)
         except Exception as e:
             return ParseResult(
                 file_path=str(file_path),
@@ -64,7 +166,6 @@ class TreeSitterParser:
 
         entities: list[Entity] = []
         relationships: list[Relationship] = []
-        source_lines = source_code.splitlines()
 
         # Create module entity
         module_name = file_path.stem
@@ -77,14 +178,14 @@ class TreeSitterParser:
             location=Location(
                 file_path=str(file_path),
                 line_start=1,
-                line_end=len(source_lines),
+                line_end=_line_count(source_bytes),
             ),
         )
         entities.append(module_entity)
 
         # Delegate to language-specific extraction
         child_entities, child_rels = self._extract_entities(
-            tree.root_node, file_path, module_id, source_code, source_lines
+            tree.root_node, file_path, module_id, source_code, source_bytes
         )
         entities.extend(child_entities)
         relationships.extend(child_rels)
@@ -102,13 +203,40 @@ class TreeSitterParser:
             errors=errors,
         )
 
+    def _parse_incremental(self, key: str, source_bytes: bytes) -> Any:
+        """Parse a file, reusing its previous tree when it was parsed before.
+
+        Tree-sitter then only re-parses the region that changed, which is
+        what makes re-indexing a file on every save cheap.
+        """
+        # Popped while in use, so a concurrent parse of the same file
+        # starts from scratch instead of editing the same tree
+        with self._tree_cache_lock:
+            cached = self._tree_cache.pop(key, None)
+        if cached is not None and cached[0] == source_bytes:
+            tree = cached[1]
+        else:
+            with self._borrow_parser() as parser:
+                if cached is None:
+                    tree = parser.parse(source_bytes)
+                else:
+                    old_bytes, old_tree = cached
+                    _edit_tree(old_tree, old_bytes, source_bytes)
+                    tree = parser.parse(source_bytes, old_tree)
+
+        with self._tree_cache_lock:
+            self._tree_cache[key] = (source_bytes, tree)
+            if len(self._tree_cache) > PARSE_TREE_CACHE_SIZE:
+                self._tree_cache.popitem(last=False)
+        return tree
+
     def _extract_entities(
         self,
         node: Any,
         file_path: Path,
         parent_id: str,
         source_code: str,
-        source_lines: list[str],
+        source_bytes: bytes,
     ) -> tuple[list[Entity], list[Relationship]]:
         """Extract entities from the AST. Must be implemented by subclasses.
         
@@ -117,7 +245,7 @@ class TreeSitterParser:
             file_path: Path to the file being parsed.
             parent_id: ID of the parent entity (for containment).
             source_code: Full source code text.
-            source_lines: Source code split by lines.
+            source_bytes: Source code as parsed, in UTF-8.
             
         Returns:
             Tuple of (entities list, relationships list).
@@ -125,9 +253,15 @@ class TreeSitterParser:
         raise NotImplementedError
 
 
-    def _get_text(self, node: Any, source_bytes: bytes) -> str:
-        """Get text content of a node."""
-        return node.text.decode("utf8")
+    def _get_text(self, node: Any, source_bytes: Optional[bytes]) -> str:
+        """Get text content of a node.
+
+        Slicing the parsed source is cheaper than ``node.text``; callers
+        without the source may pass None.
+        """
+        if source_bytes is None:
+            return node.text.decode("utf8")
+        return source_bytes[node.start_byte : node.end_byte].decode("utf-8")
 
     def _get_location(self, node: Any, file_path: Path) -> Location:
         """Get location object for a node."""
@@ -146,15 +280,17 @@ class TreeSitterParser:
         name: str,
         qualified_name: str,
         file_path: Path,
-        source_lines: list[str],
+        source_bytes: bytes,
         docstring: Optional[str] = None,
         signature: Optional[str] = None,
     ) -> Entity:
         """Helper to create an entity."""
-        # Extract source code for the node
-        start_line = node.start_point[0]
-        end_line = node.end_point[0] + 1
-        node_source = "\n".join(source_lines[start_line:end_line])
+        # Source of the node's full lines, sliced from the bytes in one copy
+        start = source_bytes.rfind(b"\n", 0, node.start_byte) + 1
+        end = source_bytes.find(b"\n", node.end_byte)
+        if end == -1:
+            end = len(source_bytes)
+        node_source = source_bytes[start:end].decode("utf-8")
 
         return Entity(
             id=f"{file_path}::{qualified_name}",
@@ -4,7 +4,13 @@ from pathlib import Path
 from typing import Any
 
 from knowcode.data_models import Entity, EntityKind, Relationship, RelationshipKind
-from knowcode.parsers.base import TreeSitterParser
+from knowcode.parsers.base import TreeSitterParser, document_order
+
+# Method invocations (receiver optional) and constructor calls
+CALLS_QUERY = """
+(method_invocation object: (_)? @object name: (_) @name) @call
+(object_creation_expression type: (_) @type) @new
+"""
 
 
 class JavaParser(TreeSitterParser):
@@ -20,7 +26,7 @@ class JavaParser(TreeSitterParser):
         file_path: Path,
         parent_id: str,
         source_code: str,
-        source_lines: list[str],
+        source_bytes: bytes,
     ) -> tuple[list[Entity], list[Relationship]]:
         """Extract entities from Java AST."""
         entities: list[Entity] = []
@@ -49,7 +55,7 @@ class JavaParser(TreeSitterParser):
                         break
                 
                 if name_node:
-                    imported_name = self._get_text(name_node, None)
+                    imported_name = self._get_text(name_node, source_bytes)
                     relationships.append(
                         Relationship(
                             source_id=parent_id,
@@ -60,7 +66,7 @@ class JavaParser(TreeSitterParser):
             
             elif child_type == "class_declaration":
                 class_entities, class_rels = self._parse_class(
-                    child, file_path, parent_id, source_code, source_lines
+                    child, file_path, parent_id, source_code, source_bytes
                 )
                 entities.extend(class_entities)
                 relationships.extend(class_rels)
@@ -68,7 +74,7 @@ class JavaParser(TreeSitterParser):
             elif child_type == "interface_declaration":
                  # Treat interface as class for MVP
                 class_entities, class_rels = self._parse_class(
-                    child, file_path, parent_id, source_code, source_lines, kind=EntityKind.CLASS
+                    child, file_path, parent_id, source_code, source_bytes, kind=EntityKind.CLASS
                 )
                 entities.extend(class_entities)
                 relationships.extend(class_rels)
@@ -81,14 +87,14 @@ class JavaParser(TreeSitterParser):
         file_path: Path,
         parent_id: str,
         source_code: str,
-        source_lines: list[str],
+        source_bytes: bytes,
         kind: EntityKind = EntityKind.CLASS
     ) -> tuple[list[Entity], list[Relationship]]:
         entities: list[Entity] = []
         relationships: list[Relationship] = []
 
         name_node = node.child_by_field_name("name")
-        class_name = self._get_text(name_node, None)
+        class_name = self._get_text(name_node, source_bytes)
         qualified_name = class_name # Simplified
         class_id = f"{file_path}::{qualified_name}"
 
@@ -101,7 +107,7 @@ class JavaParser(TreeSitterParser):
              # superclass node contains type_identifier "Foo"
              # Actually, superclass: (superclass (type_identifier))
              # Just get text of the whole node for now
-             base_text = self._get_text(superclass_node, None).replace("extends ", "").strip()
+             base_text = self._get_text(superclass_node, source_bytes).replace("extends ", "").strip()
              relationships.append(
                 Relationship(
                     source_id=class_id,
@@ -111,7 +117,7 @@ class JavaParser(TreeSitterParser):
              )
 
         entity = self._create_entity(
-            node, kind, class_name, qualified_name, file_path, source_lines
+            node, kind, class_name, qualified_name, file_path, source_bytes
         )
         entities.append(entity)
         
@@ -124,7 +130,7 @@ class JavaParser(TreeSitterParser):
             for child in body_node.children:
                 if child.type == "method_declaration":
                     method_entities, method_rels = self._parse_method(
-                        child, file_path, class_id, source_code, source_lines, parent_name=class_name
+                        child, file_path, class_id, source_code, source_bytes, parent_name=class_name
                     )
                     entities.extend(method_entities)
                     relationships.extend(method_rels)
@@ -132,7 +138,7 @@ class JavaParser(TreeSitterParser):
                 elif child.type == "constructor_declaration":
                      # Handle constructor as method
                     method_entities, method_rels = self._parse_method(
-                        child, file_path, class_id, source_code, source_lines, parent_name=class_name
+                        child, file_path, class_id, source_code, source_bytes, parent_name=class_name
                     )
                     entities.extend(method_entities)
                     relationships.extend(method_rels)
@@ -145,19 +151,19 @@ class JavaParser(TreeSitterParser):
         file_path: Path,
         parent_id: str,
         source_code: str,
-        source_lines: list[str],
+        source_bytes: bytes,
         parent_name: str
     ) -> tuple[list[Entity], list[Relationship]]:
         entities = []
         rels = []
         
         name_node = node.child_by_field_name("name")
-        method_name = self._get_text(name_node, None)
+        method_name = self._get_text(name_node, source_bytes)
         qualified_name = f"{parent_name}.{method_name}"
         method_id = f"{file_path}::{qualified_name}"
         
         entity = self._create_entity(
-            node, EntityKind.METHOD, method_name, qualified_name, file_path, source_lines
+            node, EntityKind.METHOD, method_name, qualified_name, file_path, source_bytes
         )
         entities.append(entity)
         
@@ -168,68 +174,41 @@ class JavaParser(TreeSitterParser):
         # Calls
         body_node = node.child_by_field_name("body")
         if body_node:
-             calls = self._walk_for_calls(body_node, method_id)
+             calls = self._walk_for_calls(body_node, method_id, source_bytes)
              rels.extend(calls)
              
         return entities, rels
 
-    def _walk_for_calls(self, node, source_id):
+    def _walk_for_calls(self, node, source_id, source_bytes):
+        """Find method calls and constructor calls under a node.
+
+        A single query run collects every call site together with its name
+        and receiver, rather than visiting each node of the body from Python.
+        """
         rels = []
-        cursor = node.walk()
-        visited_children = False
-        
-        while True:
-            if cursor.node.type == "method_invocation":
-                # foo.bar(args)
-                # object: (identifier), name: (identifier), arguments
-                # OR bar(args) -> name: (identifier), arguments
-                
-                name_node = cursor.node.child_by_field_name("name")
-                object_node = cursor.node.child_by_field_name("object")
-                
-                method_name = self._get_text(name_node, None)
+        matches = self._query(CALLS_QUERY).matches(node)
+        for _, captures in sorted(
+            matches, key=lambda m: document_order(m[1].get("call") or m[1]["new"])
+        ):
+            if "call" in captures:
+                # foo.bar(args) or bar(args)
+                method_name = self._get_text(captures["name"], source_bytes)
+                object_node = captures.get("object")
                 if object_node:
-                    obj_name = self._get_text(object_node, None)
+                    obj_name = self._get_text(object_node, source_bytes)
                     callee = f"{obj_name}.{method_name}"
                 else:
                     callee = method_name
-                
-                rels.append(
-                    Relationship(
-                        source_id=source_id,
-                        target_id=f"ref::{callee}",
-                        kind=RelationshipKind.CALLS
-                    )
+            else:
+                # new Foo(); constructor calls count as calls to the type
+                callee = self._get_text(captures["type"], source_bytes)
+
+            rels.append(
+                Relationship(
+                    source_id=source_id,
+                    target_id=f"ref::{callee}",
+                    kind=RelationshipKind.CALLS
                 )
+            )
 
-            elif cursor.node.type == "object_creation_expression":
-                 # new Foo()
-                 type_node = cursor.node.child_by_field_name("type")
-                 if type_node:
-                     type_name = self._get_text(type_node, None)
-                     rels.append(
-                         Relationship(
-                            source_id=source_id,
-                            target_id=f"ref::{type_name}",
-                            kind=RelationshipKind.CALLS # Constructor call
-                         )
-                     )
-
-            # Traverse
-            if not visited_children and cursor.goto_first_child():
-                visited_children = False
-                continue
-            
-            if cursor.goto_next_sibling():
-                visited_children = False
-                continue
-            
-            if cursor.goto_parent():
-                visited_children = True
-                if cursor.node == node:
-                    break
-                continue
-            else:
-                break
-                
         return rels
@@ -4,7 +4,9 @@ from pathlib import Path
 from typing import Any
 
 from knowcode.data_models import Entity, EntityKind, Relationship, RelationshipKind
-from knowcode.parsers.base import TreeSitterParser
+from knowcode.parsers.base import TreeSitterParser, document_order
+
+CALLS_QUERY = "(call_expression) @call"
 
 
 class JavaScriptParser(TreeSitterParser):
@@ -20,7 +22,7 @@ class JavaScriptParser(TreeSitterParser):
         file_path: Path,
         parent_id: str,
         source_code: str,
-        source_lines: list[str],
+        source_bytes: bytes,
     ) -> tuple[list[Entity], list[Relationship]]:
         """Extract entities from JavaScript AST."""
         entities: list[Entity] = []
@@ -42,14 +44,14 @@ class JavaScriptParser(TreeSitterParser):
             
             if child_type == "class_declaration":
                 class_entities, class_rels = self._parse_class(
-                    child, file_path, parent_id, source_code, source_lines
+                    child, file_path, parent_id, source_code, source_bytes
                 )
                 entities.extend(class_entities)
                 relationships.extend(class_rels)
                 
             elif child_type == "function_declaration":
                 func_entity, func_rels = self._parse_function(
-                    child, file_path, parent_id, source_code, source_lines, kind=EntityKind.FUNCTION
+                    child, file_path, parent_id, source_code, source_bytes, kind=EntityKind.FUNCTION
                 )
                 entities.append(func_entity)
                 relationships.extend(func_rels)
@@ -65,7 +67,7 @@ class JavaScriptParser(TreeSitterParser):
                          if value_node and value_node.type == "arrow_function":
                              # Treat as function
                              func_entity, func_rels = self._parse_arrow_function(
-                                 value_node, var_name_node, file_path, parent_id, source_code, source_lines
+                                 value_node, var_name_node, file_path, parent_id, source_code, source_bytes
                              )
                              entities.append(func_entity)
                              relationships.extend(func_rels)
@@ -76,7 +78,7 @@ class JavaScriptParser(TreeSitterParser):
                 source_node = child.child_by_field_name("source")
                 if source_node:
                     # Remove quotes
-                    module_name = self._get_text(source_node, None).strip("'\"")
+                    module_name = self._get_text(source_node, source_bytes).strip("'\"")
                     relationships.append(
                         Relationship(
                             source_id=parent_id, # Imports belong to the module scope usually
@@ -87,7 +89,7 @@ class JavaScriptParser(TreeSitterParser):
             
             elif child_type == "call_expression":
                  # Extract calls
-                 call_rel = self._extract_call(child, parent_id)
+                 call_rel = self._extract_call(child, parent_id, source_bytes)
                  if call_rel:
                      relationships.append(call_rel)
 
@@ -99,7 +101,7 @@ class JavaScriptParser(TreeSitterParser):
         file_path: Path,
         parent_id: str,
         source_code: str,
-        source_lines: list[str],
+        source_bytes: bytes,
     ) -> tuple[list[Entity], list[Relationship]]:
         entities: list[Entity] = []
         relationships: list[Relationship] = []
@@ -108,7 +110,7 @@ class JavaScriptParser(TreeSitterParser):
         if not name_node:
             return [], [] # Anonymous class
 
-        class_name = self._get_text(name_node, None)
+        class_name = self._get_text(name_node, source_bytes)
         qualified_name = class_name # Simplified for now
         class_id = f"{file_path}::{qualified_name}"
         
@@ -122,7 +124,7 @@ class JavaScriptParser(TreeSitterParser):
                  # extends Foo
                  extends_node = child.child_by_field_name("super_class") # or just iterate
                  if extends_node: # Usually the last child of heritage
-                     base_name = self._get_text(extends_node, None)
+                     base_name = self._get_text(extends_node, source_bytes)
                      relationships.append(
                         Relationship(
                             source_id=class_id,
@@ -132,7 +134,7 @@ class JavaScriptParser(TreeSitterParser):
                      )
 
         entity = self._create_entity(
-            node, EntityKind.CLASS, class_name, qualified_name, file_path, source_lines
+            node, EntityKind.CLASS, class_name, qualified_name, file_path, source_bytes
         )
         entities.append(entity)
         
@@ -146,7 +148,7 @@ class JavaScriptParser(TreeSitterParser):
             for child in body_node.children:
                 if child.type == "method_definition":
                     method_entity, method_rels = self._parse_function(
-                        child, file_path, class_id, source_code, source_lines, kind=EntityKind.METHOD, parent_name=class_name
+                        child, file_path, class_id, source_code, source_bytes, kind=EntityKind.METHOD, parent_name=class_name
                     )
                     entities.append(method_entity)
                     relationships.extend(method_rels)
@@ -159,7 +161,7 @@ class JavaScriptParser(TreeSitterParser):
         file_path: Path,
         parent_id: str,
         source_code: str,
-        source_lines: list[str],
+        source_bytes: bytes,
         kind: EntityKind,
         parent_name: str = ""
     ) -> tuple[Entity, list[Relationship]]:
@@ -168,14 +170,14 @@ class JavaScriptParser(TreeSitterParser):
             # Check if it is a constructor
             if kind == EntityKind.METHOD:
                  name_node = node.child_by_field_name("name") # method_definition has name
-                 if not name_node and self._get_text(node, None).startswith("constructor"):
+                 if not name_node and self._get_text(node, source_bytes).startswith("constructor"):
                      name = "constructor"
                  else:
-                     name = self._get_text(name_node, None) if name_node else "anonymous"
+                     name = self._get_text(name_node, source_bytes) if name_node else "anonymous"
             else:
                 return Exception("Anonymous function not fully supported yet"), [] 
                 
-        name = self._get_text(name_node, None) if name_node else "constructor"
+        name = self._get_text(name_node, source_bytes) if name_node else "constructor"
         
         if parent_name:
             qualified_name = f"{parent_name}.{name}"
@@ -185,7 +187,7 @@ class JavaScriptParser(TreeSitterParser):
         func_id = f"{file_path}::{qualified_name}"
         
         entity = self._create_entity(
-            node, kind, name, qualified_name, file_path, source_lines
+            node, kind, name, qualified_name, file_path, source_bytes
         )
         
         relationships = [
@@ -195,24 +197,24 @@ class JavaScriptParser(TreeSitterParser):
         # Extract calls from body
         body_node = node.child_by_field_name("body")
         if body_node:
-            child_entities, child_rels = self._extract_entities(body_node, file_path, func_id, source_code, source_lines)
+            child_entities, child_rels = self._extract_entities(body_node, file_path, func_id, source_code, source_bytes)
             # We ignore child entities declared INSIDE functions for now (local vars/funcs), 
             # but we want the calls from child_rels
             # Actually, _extract_entities returns variable_declarations too.
             # For now, let's just grab calls.
             
             # Helper to just walk for calls
-            calls = self._walk_for_calls(body_node, func_id)
+            calls = self._walk_for_calls(body_node, func_id, source_bytes)
             relationships.extend(calls)
 
         return entity, relationships
 
-    def _parse_arrow_function(self, node, name_node, file_path, parent_id, source_code, source_lines):
-        name = self._get_text(name_node, None)
+    def _parse_arrow_function(self, node, name_node, file_path, parent_id, source_code, source_bytes):
+        name = self._get_text(name_node, source_bytes)
         func_id = f"{file_path}::{name}"
         
         entity = self._create_entity(
-            node, EntityKind.FUNCTION, name, name, file_path, source_lines
+            node, EntityKind.FUNCTION, name, name, file_path, source_bytes
         )
         
         relationships = [
@@ -221,54 +223,33 @@ class JavaScriptParser(TreeSitterParser):
         
         body_node = node.child_by_field_name("body")
         if body_node:
-            calls = self._walk_for_calls(body_node, func_id)
+            calls = self._walk_for_calls(body_node, func_id, source_bytes)
             relationships.extend(calls)
             
         return entity, relationships
 
-    def _walk_for_calls(self, node, source_id):
-        """Recursive walk to find call_expression.
-        
-        Note: We use a cursor walk here which is significantly more performant 
-        than recursively creating Node objects for every child in the tree.
+    def _walk_for_calls(self, node, source_id, source_bytes):
+        """Find call_expression nodes under a node.
+
+        A single query run returns every call site, rather than visiting
+        each node of the body from Python.
         """
         rels = []
-        cursor = node.walk()
+        calls = [n for n, _ in self._query(CALLS_QUERY).captures(node)]
+        for call in sorted(calls, key=document_order):
+            rel = self._extract_call(call, source_id, source_bytes)
+            if rel:
+                rels.append(rel)
 
-        visited_children = False
-        
-        while True:
-            if cursor.node.type == "call_expression":
-                rel = self._extract_call(cursor.node, source_id)
-                if rel:
-                    rels.append(rel)
-            
-            # Traverse
-            if not visited_children and cursor.goto_first_child():
-                visited_children = False
-                continue
-            
-            if cursor.goto_next_sibling():
-                visited_children = False
-                continue
-            
-            if cursor.goto_parent():
-                visited_children = True
-                if cursor.node == node: # Back at start
-                    break
-                continue
-            else:
-                break
-                
         return rels
 
-    def _extract_call(self, node, source_id):
+    def _extract_call(self, node, source_id, source_bytes):
         # call_expression: function: (identifier) arguments: (arguments)
         func_node = node.child_by_field_name("function")
         if not func_node:
             return None
         
-        callee_name = self._get_text(func_node, None)
+        callee_name = self._get_text(func_node, source_bytes)
         # Verify it's not a keyword/syntax
         if " " in callee_name or "\n" in callee_name:
             # Complex expression call like (a+b)() or require('foo')
@@ -279,7 +260,7 @@ class JavaScriptParser(TreeSitterParser):
                  if args and args.named_child_count > 0:
                      first_arg = args.named_child(0)
                      if first_arg.type == "string":
-                         module = self._get_text(first_arg, None).strip("'\"")
+                         module = self._get_text(first_arg, source_bytes).strip("'\"")
                          return Relationship(
                              source_id=source_id,
                              target_id=f"external::{module}",
@@ -1,5 +1,7 @@
 """Hybrid BM25 + Vector search index."""
 
+from typing import Optional
+
 from knowcode.storage.chunk_repository import ChunkRepository
 from knowcode.data_models import CodeChunk
 from knowcode.utils.tokenizer import tokenize_code
@@ -30,7 +32,9 @@ class HybridIndex:
         self,
         query: str,
         query_embedding: list[float],
-        limit: int = 10
+        limit: int = 10,
+        variant_embeddings: Optional[list[list[float]]] = None,
+        variant_weight: float = 0.5,
     ) -> list[tuple[CodeChunk, float]]:
         """Search using hybrid retrieval. 
         Combines BM25 sparse retrieval with dense vector search.         
@@ -40,6 +44,10 @@ class HybridIndex:
             query: Raw query string for sparse matching.
             query_embedding: Dense embedding of the query.
             limit: Maximum number of chunks to return.
+            variant_embeddings: Embeddings of query variants whose dense
+                results are fused in as well.
+            variant_weight: Weight of each variant's dense ranking relative
+                to the query's own.
 
         Returns:
             List of (chunk, score) tuples ranked by reciprocal rank fusion.
@@ -63,6 +71,11 @@ class HybridIndex:
             
         for rank, (chunk_id, _) in enumerate(dense_results):
             combined_scores[chunk_id] = combined_scores.get(chunk_id, 0.0) + self.alpha / (K + rank + 1)
+
+        for embedding in variant_embeddings or ():
+            weight = self.alpha * variant_weight
+            for rank, (chunk_id, _) in enumerate(self.vector_store.search(embedding, limit=limit * 2)):
+                combined_scores[chunk_id] = combined_scores.get(chunk_id, 0.0) + weight / (K + rank + 1)
             
         # 4. Sort and return
         sorted_ids = sorted(combined_scores.items(), key=lambda x: x[1], reverse=True)
@@ -2,8 +2,10 @@
 
 from __future__ import annotations
 
+import threading
+from collections import OrderedDict
 from dataclasses import dataclass
-from typing import Optional
+from typing import Optional, Sequence
 
 from knowcode.storage.chunk_repository import ChunkRepository
 from knowcode.retrieval.completeness import expand_dependencies
@@ -14,6 +16,10 @@ from knowcode.data_models import CodeChunk
 from knowcode.retrieval.reranker import Reranker
 from knowcode.config import AppConfig
 
+# Recent query embeddings kept per engine (a query is typically embedded
+# again right after retrieval, for the semantic answer cache)
+QUERY_EMBEDDING_CACHE_SIZE = 128
+
 
 @dataclass(frozen=True)
 class ScoredChunk:
@@ -54,12 +60,45 @@ class SearchEngine:
             use_voyageai=use_voyageai_reranking,
             config=config,
         )
+        self._query_embeddings: OrderedDict[str, Sequence[float]] = OrderedDict()
+        self._query_embeddings_lock = threading.Lock()
+
+    def embed_queries(self, queries: Sequence[str]) -> list[Sequence[float]]:
+        """Embed query strings, batching all cache misses into one provider call.
+
+        Args:
+            queries: Query strings to embed.
+
+        Returns:
+            One embedding per query, in input order.
+        """
+        with self._query_embeddings_lock:
+            cached = {q: self._query_embeddings.get(q) for q in queries}
+            for q, emb in cached.items():
+                if emb is not None:
+                    self._query_embeddings.move_to_end(q)
+
+        missing = [q for q, emb in cached.items() if emb is None]
+        if missing:
+            if len(missing) == 1:
+                embedded = [self.embedding_provider.embed_single(missing[0])]
+            else:
+                embedded = self.embedding_provider.embed_queries(missing)
+            with self._query_embeddings_lock:
+                for q, emb in zip(missing, embedded):
+                    cached[q] = emb
+                    self._query_embeddings[q] = emb
+                while len(self._query_embeddings) > QUERY_EMBEDDING_CACHE_SIZE:
+                    self._query_embeddings.popitem(last=False)
+
+        return [cached[q] for q in queries]
 
     def search_scored(
         self,
         query: str,
         limit: int = 10,
         expand_deps: bool = True,
+        query_variants: Optional[Sequence[str]] = None,
     ) -> list[ScoredChunk]:
         """Execute the full search pipeline and return scored chunks.
 
@@ -70,12 +109,24 @@ class SearchEngine:
             query: Natural language query string.
             limit: Maximum number of primary chunks to return (before expansion).
             expand_deps: Whether to include dependency context from the graph.
+            query_variants: Optional alternative phrasings (e.g. extracted
+                keywords), embedded in the same batch as the query and fused
+                into the dense ranking at a lower weight.
 
         Returns:
             Ranked list of ScoredChunk objects.
         """
-        query_embedding = self.embedding_provider.embed_single(query)
-        results = self.hybrid_index.search(query, query_embedding, limit=limit * 2)
+        variants = [v for v in dict.fromkeys(query_variants or ()) if v and v != query]
+        embeddings = self.embed_queries([query, *variants])
+        if variants:
+            results = self.hybrid_index.search(
+                query,
+                embeddings[0],
+                limit=limit * 2,
+                variant_embeddings=embeddings[1:],
+            )
+        else:
+            results = self.hybrid_index.search(query, embeddings[0], limit=limit * 2)
         reranked = self.reranker.rerank(query, results, top_k=limit)
         primary = [ScoredChunk(chunk=c, score=s, source="retrieved") for c, s in reranked]
 
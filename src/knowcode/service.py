@@ -2,13 +2,17 @@
 
 from __future__ import annotations
 
+import hashlib
 import re
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
 from pathlib import Path
 from typing import Any, Optional, TYPE_CHECKING
 
 from knowcode.analysis.context_synthesizer import ContextSynthesizer
 from knowcode.config import AppConfig
 from knowcode.indexing.graph_builder import GraphBuilder
+from knowcode.indexing.parse_cache import PARSE_CACHE_FILENAME, ParseCache
 from knowcode.storage.knowledge_store import KnowledgeStore
 
 if TYPE_CHECKING:
@@ -16,6 +20,19 @@ if TYPE_CHECKING:
     from knowcode.indexing.indexer import Indexer
     from knowcode.retrieval.search_engine import SearchEngine
 
+# Upper bound on threads used to synthesize context bundles for one query
+CONTEXT_WORKERS = 4
+
+# Identifier-like tokens (including dotted names) in natural-language queries
+_IDENT_RE = re.compile(r"\b[a-zA-Z_][a-zA-Z0-9_.]+\b")
+_STOPWORDS = frozenset(
+    {
+        "how", "what", "where", "when", "why", "who", "does", "did", "is", "are",
+        "can", "will", "the", "a", "an", "in", "on", "at", "for", "to", "of",
+        "and", "or",
+    }
+)
+
 
 class KnowCodeService:
     """Service to handle core KnowCode operations."""
@@ -38,13 +55,21 @@ class KnowCodeService:
         self._store: Optional[KnowledgeStore] = None
         self._search_engine: Optional["SearchEngine"] = None
         self._indexer: Optional["Indexer"] = None
+        # Guards the lazy members above, which concurrent requests (e.g. MCP
+        # tool calls in worker threads) may ask for at the same time.
+        # Reentrant because the search engine builds the indexer and store.
+        self._init_lock = threading.RLock()
 
     @property
     def store(self) -> KnowledgeStore:
         """Get or load the knowledge store."""
-        if self._store is None:
-            self._store = KnowledgeStore.load(self.store_path)
-        return self._store
+        store = self._store
+        if store is None:
+            with self._init_lock:
+                if self._store is None:
+                    self._store = KnowledgeStore.load(self.store_path)
+                store = self._store
+        return store
 
     def get_indexer(self, index_path: Optional[str | Path] = None) -> "Indexer":
         """Get or create the indexer.
@@ -55,22 +80,26 @@ class KnowCodeService:
         Returns:
             Initialized Indexer instance.
         """
-        if self._indexer is None:
-            from knowcode.llm.embedding import create_embedding_provider
-            from knowcode.indexing.indexer import Indexer
-            
-            provider = create_embedding_provider(app_config=self.app_config)
-            self._indexer = Indexer(provider)
-            
-            if index_path:
-                self._indexer.load(Path(index_path))
-            else:
-                store_root = self.store_path if self.store_path.is_dir() else self.store_path.parent
-                default_index = store_root / "knowcode_index"
-                if default_index.exists():
-                    self._indexer.load(default_index)
-                
-        return self._indexer
+        if self._indexer is not None:
+            return self._indexer
+        with self._init_lock:
+            if self._indexer is None:
+                from knowcode.llm.embedding import create_embedding_provider
+                from knowcode.indexing.indexer import Indexer
+
+                provider = create_embedding_provider(app_config=self.app_config)
+                indexer = Indexer(provider)
+
+                if index_path:
+                    indexer.load(Path(index_path))
+                else:
+                    store_root = self.store_path if self.store_path.is_dir() else self.store_path.parent
+                    default_index = store_root / "knowcode_index"
+                    if default_index.exists():
+                        indexer.load(default_index)
+                # Published only once loaded, so other threads never see it half-built
+                self._indexer = indexer
+            return self._indexer
 
     def get_search_engine(self, index_path: Optional[str | Path] = None) -> "SearchEngine":
         """Get or create the search engine.
@@ -81,21 +110,26 @@ class KnowCodeService:
         Returns:
             SearchEngine wired to the current knowledge store.
         """
-        if self._search_engine is None:
-            from knowcode.retrieval.hybrid_index import HybridIndex
-            from knowcode.retrieval.search_engine import SearchEngine
-            
-            indexer = self.get_indexer(index_path)
-            hybrid_index = HybridIndex(indexer.chunk_repo, indexer.vector_store)
-            
-            self._search_engine = SearchEngine(
-                indexer.chunk_repo, 
-                indexer.embedding_provider, 
-                hybrid_index, 
-                self.store,
-                config=self.app_config,
-            )
-        return self._search_engine
+        if self._search_engine is not None:
+            return self._search_engine
+        with self._init_lock:
+            if self._search_engine is None:
+                from knowcode.llm.embedding import BatchingEmbedder
+                from knowcode.retrieval.hybrid_index import HybridIndex
+                from knowcode.retrieval.search_engine import SearchEngine
+
+                indexer = self.get_indexer(index_path)
+                hybrid_index = HybridIndex(indexer.chunk_repo, indexer.vector_store)
+
+                # Queries from concurrent requests share embedding calls
+                self._search_engine = SearchEngine(
+                    indexer.chunk_repo,
+                    BatchingEmbedder(indexer.embedding_provider),
+                    hybrid_index,
+                    self.store,
+                    config=self.app_config,
+                )
+            return self._search_engine
 
     def retrieve_context_for_query(
         self,
@@ -181,84 +215,102 @@ class KnowCodeService:
         evidence: list[dict[str, Any]] = []
         retrieval_mode = "lexical"
 
+        lexical_future: Optional[Future[list[str]]] = None
         if index_path.exists():
-            try:
-                engine = self.get_search_engine()
-                self._validate_index_compatibility(index_path)
-                scored = engine.search_scored(
-                    query,
-                    limit=max(10, limit_entities * 5),
-                    expand_deps=expand_deps,
-                )
-                retrieval_mode = "semantic"
-
-                primary = [s for s in scored if s.source == "retrieved"]
-                seen_entities: set[str] = set()
-                for s in primary:
-                    if s.chunk.entity_id in seen_entities:
-                        continue
-                    seen_entities.add(s.chunk.entity_id)
-                    selected_entity_ids.append(s.chunk.entity_id)
-                    if len(selected_entity_ids) >= limit_entities:
-                        break
-
-                for rank, s in enumerate(scored, start=1):
-                    evidence.append(
-                        {
-                            "rank": rank,
-                            "chunk_id": s.chunk.id,
-                            "entity_id": s.chunk.entity_id,
-                            "score": s.score,
-                            "source": s.source,
-                        }
+            with ThreadPoolExecutor(max_workers=1) as executor:
+                try:
+                    engine = self.get_search_engine()
+                    self._validate_index_compatibility(index_path)
+                    # The store is loaded by now; keyword search runs alongside
+                    # the embedding query instead of only after it fails.
+                    lexical_future = executor.submit(
+                        self._lexical_candidates, query, limit_entities
                     )
-
-            except Exception as e:
-                errors.append(f"Semantic retrieval failed; falling back to lexical: {e}")
-                retrieval_mode = "lexical"
+                    scored = engine.search_scored(
+                        query,
+                        limit=max(10, limit_entities * 5),
+                        expand_deps=expand_deps,
+                        query_variants=self._extract_query_keywords(query)[:3],
+                    )
+                    retrieval_mode = "semantic"
+
+                    primary = [s for s in scored if s.source == "retrieved"]
+                    seen_entities: set[str] = set()
+                    for s in primary:
+                        if s.chunk.entity_id in seen_entities:
+                            continue
+                        seen_entities.add(s.chunk.entity_id)
+                        selected_entity_ids.append(s.chunk.entity_id)
+                        if len(selected_entity_ids) >= limit_entities:
+                            break
+
+                    for rank, s in enumerate(scored, start=1):
+                        evidence.append(
+                            {
+                                "rank": rank,
+                                "chunk_id": s.chunk.id,
+                                "entity_id": s.chunk.entity_id,
+                                "score": s.score,
+                                "source": s.source,
+                            }
+                        )
+
+                except Exception as e:
+                    errors.append(f"Semantic retrieval failed; falling back to lexical: {e}")
+                    retrieval_mode = "lexical"
 
         if retrieval_mode == "lexical":
-            candidates: list[str] = []
-            seen: set[str] = set()
-
-            def add_entity_ids(items: list[dict[str, Any]]) -> None:
-                for item in items:
-                    entity_id = item.get("id")
-                    if not entity_id or entity_id in seen:
-                        continue
-                    seen.add(entity_id)
-                    candidates.append(entity_id)
-
-            add_entity_ids(self.search(query))
-            if len(candidates) < limit_entities:
-                for kw in self._extract_query_keywords(query):
-                    add_entity_ids(self.search(kw))
-                    if len(candidates) >= limit_entities:
-                        break
-
+            if lexical_future is not None:
+                candidates = lexical_future.result()
+            else:
+                candidates = self._lexical_candidates(query, limit_entities)
             selected_entity_ids = candidates[:limit_entities]
             for rank, entity_id in enumerate(selected_entity_ids, start=1):
                 evidence.append({"rank": rank, "entity_id": entity_id, "source": "lexical"})
+        elif lexical_future is not None and len(selected_entity_ids) < limit_entities:
+            # Fill slots the semantic hits left open with keyword matches
+            try:
+                candidates = lexical_future.result()
+            except Exception as e:
+                errors.append(f"Lexical retrieval failed: {e}")
+                candidates = []
+            rank = len(evidence)
+            for entity_id in candidates:
+                if len(selected_entity_ids) >= limit_entities:
+                    break
+                if entity_id in selected_entity_ids:
+                    continue
+                selected_entity_ids.append(entity_id)
+                rank += 1
+                evidence.append({"rank": rank, "entity_id": entity_id, "source": "lexical"})
 
         selected_entities: list[dict[str, Any]] = []
         context_parts: list[str] = []
+        # 8-byte fingerprints of included context texts, to drop repeats
+        seen_parts: set[bytes] = set()
         sufficiency_scores: list[float] = []
         total_tokens = 0
         truncated = False
 
-        for entity_id in selected_entity_ids:
-            try:
-                bundle = self.get_context(
-                    entity_id,
-                    max_tokens=per_entity_max_tokens,
-                    task_type=resolved_task_type,
-                )
-            except Exception as e:
-                errors.append(f"Failed to synthesize context for {entity_id}: {e}")
+        bundles = self.get_context_batch(
+            selected_entity_ids,
+            max_tokens=per_entity_max_tokens,
+            task_type=resolved_task_type,
+        )
+
+        for entity_id, bundle in zip(selected_entity_ids, bundles):
+            if isinstance(bundle, Exception):
+                errors.append(f"Failed to synthesize context for {entity_id}: {bundle}")
                 continue
 
-            context_parts.append(bundle.get("context_text", ""))
-            total_tokens += int(bundle.get("total_tokens", 0))
+            text = bundle.get("context_text", "")
+            if text:
+                fingerprint = hashlib.blake2b(text.encode("utf-8"), digest_size=8).digest()
+                if fingerprint not in seen_parts:
+                    seen_parts.add(fingerprint)
+                    context_parts.append(text)
+                    # Only count tokens for text that reaches the combined context
+                    total_tokens += int(bundle.get("total_tokens", 0))
             truncated = truncated or bool(bundle.get("truncated", False))
 
             s = bundle.get("sufficiency_score")
@@ -275,7 +327,7 @@ class KnowCodeService:
                 }
             )
 
-        context_text = "\n\n---\n\n".join([p for p in context_parts if p])
+        context_text = "\n\n---\n\n".join(context_parts)
         sufficiency = (
             round(sum(sufficiency_scores) / len(sufficiency_scores), 2)
             if sufficiency_scores
@@ -297,50 +349,52 @@ class KnowCodeService:
             "errors": errors,
         }
 
-    def _build_index(self, directory: str | Path, index_path: str | Path) -> int:
+    def _build_index(
+        self,
+        directory: str | Path,
+        index_path: str | Path,
+        parse_cache: Optional[ParseCache] = None,
+        parse_workers: int = 1,
+    ) -> int:
         """Build a semantic index for a directory and persist it."""
         from knowcode.llm.embedding import create_embedding_provider
         from knowcode.indexing.indexer import Indexer
 
         provider = create_embedding_provider(app_config=self.app_config)
-        indexer = Indexer(provider)
+        indexer = Indexer(provider, parse_cache=parse_cache, parse_workers=parse_workers)
+        indexer.load_embedding_cache(index_path)
         count = indexer.index_directory(directory)
         indexer.save(index_path)
         self._indexer = indexer
         return count
 
+    def _lexical_candidates(self, query: str, limit_entities: int) -> list[str]:
+        """Return entity ids matching the query text, then its keywords, in order."""
+        candidates: list[str] = []
+        seen: set[str] = set()
+
+        def add_entity_ids(items: list[dict[str, Any]]) -> None:
+            for item in items:
+                entity_id = item.get("id")
+                if not entity_id or entity_id in seen:
+                    continue
+                seen.add(entity_id)
+                candidates.append(entity_id)
+
+        add_entity_ids(self.search(query))
+        if len(candidates) < limit_entities:
+            for kw in self._extract_query_keywords(query):
+                add_entity_ids(self.search(kw))
+                if len(candidates) >= limit_entities:
+                    break
+        return candidates
+
     def _extract_query_keywords(self, query: str) -> list[str]:
         """Extract identifier-like keywords from a natural-language query."""
-        stopwords = {
-            "how",
-            "what",
-            "where",
-            "when",
-            "why",
-            "who",
-            "does",
-            "did",
-            "is",
-            "are",
-            "can",
-            "will",
-            "the",
-            "a",
-            "an",
-            "in",
-            "on",
-            "at",
-            "for",
-            "to",
-            "of",
-            "and",
-            "or",
-        }
-        tokens = re.findall(r"\b[a-zA-Z_][a-zA-Z0-9_.]+\b", query)
         keywords = [
             t
-            for t in tokens
-            if len(t) > 3 and t.lower() not in stopwords
+            for t in _IDENT_RE.findall(query)
+            if len(t) > 3 and t.lower() not in _STOPWORDS
         ]
         return keywords[:10]
 
@@ -393,6 +447,8 @@ class KnowCodeService:
         ignore: list[str] = None,
         temporal: bool = False,
         coverage: str | Path = None,
+        lazy_source: bool = False,
+        parse_workers: int = 1,
     ) -> dict[str, Any]:
         """Analyze a codebase and persist the resulting knowledge store.
 
@@ -402,26 +458,38 @@ class KnowCodeService:
             ignore: Additional ignore patterns.
             temporal: Whether to include git history analysis.
             coverage: Optional Cobertura coverage report path.
+            lazy_source: Omit source code from the store file and re-read it
+                from the analyzed files when needed.
+            parse_workers: Processes used to parse files in parallel.
 
         Returns:
             Statistics from the graph builder.
         """
-        builder = GraphBuilder()
-        builder.build_from_directory(
-            root_dir=directory,
-            additional_ignores=ignore,
-            analyze_temporal=temporal,
-            coverage_path=Path(coverage) if coverage else None,
-        )
-
-        store = KnowledgeStore.from_graph_builder(builder)
         output_path = Path(output)
-        store.save(output_path)
-        self._store = store
-
         store_root = output_path if output_path.is_dir() else output_path.parent
         index_path = store_root / "knowcode_index"
-        index_count = self._build_index(Path(directory), index_path)
+        # Shared by the graph build and the index build, so the latter
+        # never parses a file a second time
+        parse_cache = ParseCache(index_path / PARSE_CACHE_FILENAME)
+
+        try:
+            builder = GraphBuilder(parse_cache=parse_cache, parse_workers=parse_workers)
+            builder.build_from_directory(
+                root_dir=directory,
+                additional_ignores=ignore,
+                analyze_temporal=temporal,
+                coverage_path=Path(coverage) if coverage else None,
+            )
+
+            store = KnowledgeStore.from_graph_builder(builder)
+            store.save(output_path, lazy_source=lazy_source)
+            self._store = store
+
+            index_count = self._build_index(
+                Path(directory), index_path, parse_cache, parse_workers
+            )
+        finally:
+            parse_cache.close()
 
         stats = builder.stats()
         stats["indexed_chunks"] = index_count
@@ -469,19 +537,55 @@ class KnowCodeService:
         Raises:
             ValueError: If no matching entity is found or context synthesis fails.
         """
-        # Try exact match first
-        entity = self.store.get_entity(target)
-        if not entity:
-            # Try search
-            matches = self.store.search(target)
-            if matches:
-                entity = matches[0]
+        synthesizer = ContextSynthesizer(self.store, max_tokens=max_tokens)
+        return self._synthesize_context(synthesizer, target, task_type)
 
+    def get_context_batch(
+        self,
+        targets: list[str],
+        max_tokens: int = 2000,
+        task_type: Optional["TaskType"] = None,
+    ) -> list[dict[str, Any] | Exception]:
+        """Get context bundles for several entities at once.
+
+        All bundles share one synthesizer (and its tokenizer) and are built
+        concurrently, since they only read from the store.
+
+        Args:
+            targets: Entity IDs or search patterns.
+            max_tokens: Maximum token budget for each context bundle.
+            task_type: Optional task type for context prioritization.
+
+        Returns:
+            One entry per target, in input order: the context dictionary as
+            returned by get_context(), or the exception raised for that target.
+        """
+        synthesizer = ContextSynthesizer(self.store, max_tokens=max_tokens)
+
+        def build(target: str) -> dict[str, Any] | Exception:
+            try:
+                return self._synthesize_context(synthesizer, target, task_type)
+            except Exception as e:
+                return e
+
+        if len(targets) <= 1:
+            return [build(target) for target in targets]
+
+        # map() keeps results in input order
+        with ThreadPoolExecutor(max_workers=min(len(targets), CONTEXT_WORKERS)) as executor:
+            return list(executor.map(build, targets))
+
+    def _synthesize_context(
+        self,
+        synthesizer: ContextSynthesizer,
+        target: str,
+        task_type: Optional["TaskType"],
+    ) -> dict[str, Any]:
+        """Resolve a target and build its context dictionary with a given synthesizer."""
+        entity = self.store.resolve(target)
         if not entity:
             raise ValueError(f"Entity not found: {target}")
 
-        synthesizer = ContextSynthesizer(self.store, max_tokens=max_tokens)
-        
         # Use task-specific synthesis if task_type provided
         if task_type is not None:
             bundle = synthesizer.synthesize_with_task(entity.id, task_type)
@@ -493,6 +597,7 @@ class KnowCodeService:
 
         result = {
             "entity_id": bundle.target_entity.id,
+            "qualified_name": bundle.target_entity.qualified_name,
             "context_text": bundle.context_text,
             "total_tokens": bundle.total_tokens,
             "truncated": bundle.truncated,
@@ -516,15 +621,8 @@ class KnowCodeService:
             Aggregated counts of entities, relationships, and index state.
         """
         # This is slightly different from builder.stats() as we might not have the builder
-        by_kind: dict[str, int] = {}
-        for entity in self.store.entities.values():
-            kind = entity.kind.value
-            by_kind[kind] = by_kind.get(kind, 0) + 1
-
-        rel_types: dict[str, int] = {}
-        for rel in self.store.relationships:
-            kind = rel.kind.value
-            rel_types[kind] = rel_types.get(kind, 0) + 1
+        by_kind = self.store.count_by_kind()
+        rel_types = self.store.count_relationships_by_kind()
 
         stats = {
             "total_entities": len(self.store.entities),
@@ -559,13 +657,14 @@ class KnowCodeService:
         Useful when the underlying JSON file has been updated by a 
         separate process (e.g., a CLI scan).
         """
-        self._store = None
-        try:
-            # Force reload by accessing the property
-            _ = self.store
-        except FileNotFoundError:
-            # If the file is gone, keep _store as None
-            pass
+        with self._init_lock:
+            self._store = None
+            try:
+                # Force reload by accessing the property
+                _ = self.store
+            except FileNotFoundError:
+                # If the file is gone, keep _store as None
+                pass
 
     def get_entity_details(self, entity_id: str) -> Optional[dict[str, Any]]:
         """Get detailed information about an entity as a dictionary.
@@ -580,14 +679,12 @@ class KnowCodeService:
         # Convert to dictionary (using internal helper or creating one)
         # We can reuse the knowledge store's _entity_to_dict if exposed, 
         # or just construct it manually here to be safe and explicit.
-        from dataclasses import asdict
-
         return {
             "id": entity.id,
             "kind": entity.kind.value,
             "name": entity.name,
             "qualified_name": entity.qualified_name,
-            "location": asdict(entity.location),
+            "location": entity.location.to_dict(),
             "docstring": entity.docstring,
             "signature": entity.signature,
             "source_code": entity.source_code,
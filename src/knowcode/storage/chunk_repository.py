@@ -1,7 +1,7 @@
 """Repository interface for code chunks."""
 
 from abc import ABC, abstractmethod
-from typing import Optional
+from typing import Optional, Sequence
 
 from knowcode.data_models import CodeChunk
 
@@ -51,6 +51,11 @@ class InMemoryChunkRepository(ChunkRepository):
         if chunk.id not in self._by_entity[chunk.entity_id]:
             self._by_entity[chunk.entity_id].append(chunk.id)
 
+    def add_many(self, chunks: Sequence[CodeChunk]) -> None:
+        """Add several chunks at once."""
+        for chunk in chunks:
+            self.add(chunk)
+
     def get(self, chunk_id: str) -> Optional[CodeChunk]:
         """Fetch a chunk by its ID."""
         return self._chunks.get(chunk_id)
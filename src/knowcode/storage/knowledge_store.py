@@ -2,12 +2,15 @@
 
 from __future__ import annotations
 
-import json
-from dataclasses import asdict
+import marshal
+import os
+import sys
+from bisect import bisect_right
+from collections import deque
 from pathlib import Path
 from typing import Any, Optional
 
-from knowcode.indexing.graph_builder import GraphBuilder
+from knowcode.indexing.graph_builder import GraphBuilder, intern_metadata
 from knowcode.data_models import (
     Entity,
     EntityKind,
@@ -15,6 +18,27 @@ from knowcode.data_models import (
     Relationship,
     RelationshipKind,
 )
+from knowcode.utils.serialization import read_json, write_json
+
+# Relationship kinds that make one entity depend on another
+DEPENDENCY_KINDS = frozenset({RelationshipKind.CALLS, RelationshipKind.IMPORTS})
+
+# Columnar marshal copy of the JSON store, written next to it by save()
+SNAPSHOT_SUFFIX = ".kcsnap"
+SNAPSHOT_VERSION = 1
+_ENTITY_KINDS = {k.value: k for k in EntityKind}
+_RELATIONSHIP_KINDS = {k.value: k for k in RelationshipKind}
+
+
+def _snapshot_path(path: Path) -> Path:
+    """Return the snapshot file kept alongside a JSON store file."""
+    return path.with_name(path.name + SNAPSHOT_SUFFIX)
+
+
+def _file_stamp(path: Path) -> tuple[int, int]:
+    """Identify a file's current contents by modification time and size."""
+    stat = os.stat(path)
+    return stat.st_mtime_ns, stat.st_size
 
 
 class KnowledgeStore:
@@ -28,6 +52,29 @@ class KnowledgeStore:
         self.relationships: list[Relationship] = []
         self.metadata: dict[str, Any] = {}
 
+        # Entity ids grouped by kind, rebuilt whenever `entities` is
+        # reassigned or resized (keyed on the dict identity and size).
+        self._by_kind: dict[EntityKind, list[str]] = {}
+        self._by_kind_key: Optional[tuple[int, int]] = None
+        self._rel_kind_counts: dict[RelationshipKind, int] = {}
+        self._rel_kind_counts_key: Optional[tuple[int, int]] = None
+        # CALLS adjacency in both directions (entity id -> neighbour ids in
+        # relationship order), rebuilt like the indexes above
+        self._callees: dict[str, list[str]] = {}
+        self._callers: dict[str, list[str]] = {}
+        self._calls_key: Optional[tuple[int, int]] = None
+
+        # Lowercased "name\tqualified_name" lines for all entities, searched
+        # with str.find; _search_starts holds each line's offset.
+        self._search_text = ""
+        self._search_ids: list[str] = []
+        self._search_starts: list[int] = []
+        self._search_key: Optional[tuple[int, int]] = None
+
+        # Entities saved without source_code; filled from disk on first access
+        self._lazy_source_ids: set[str] = set()
+        self._source_lines: dict[str, list[str]] = {}
+
     @classmethod
     def from_graph_builder(cls, builder: GraphBuilder) -> "KnowledgeStore":
         """Create store from a graph builder.
@@ -47,10 +94,11 @@ class KnowledgeStore:
         }
         return store
 
-    def save(self, path: str | Path) -> None:
+    def save(self, path: str | Path, lazy_source: bool = False) -> None:
         """Save knowledge store to JSON file.
-        
-        The format includes:
+
+        The file is written as compact JSON (gzip-compressed if the path
+        ends in ``.gz``). The format includes:
         - version: Schema version for compatibility.
         - metadata: Global scan stats and errors.
         - entities: Dictionary mapping Entity IDs to their full data.
@@ -58,18 +106,29 @@ class KnowledgeStore:
 
         Args:
             path: Path to save file (directory or file).
+            lazy_source: Omit source code that can be re-read from the
+                entity's file by line range. Such entities get their source
+                back from disk on first get_entity() after load, so the
+                files must still be present (and unchanged) at that point.
         """
         path = Path(path)
         if path.is_dir():
             path = path / self.DEFAULT_FILENAME
 
+        entities: dict[str, dict[str, Any]] = {}
+        lazy_ids: set[str] = set()
+        for eid, e in self.entities.items():
+            edata = self._entity_to_dict(e)
+            if lazy_source and e.source_code and self._read_source(e) == e.source_code:
+                # A missing key (unlike an explicit null) marks lazy source
+                del edata["source_code"]
+                lazy_ids.add(eid)
+            entities[eid] = edata
+
         data = {
             "version": "1.0",
             "metadata": self.metadata,
-            "entities": {
-                eid: self._entity_to_dict(e)
-                for eid, e in self.entities.items()
-            },
+            "entities": entities,
             "relationships": [
                 self._relationship_to_dict(r)
                 for r in self.relationships
@@ -77,8 +136,54 @@ class KnowledgeStore:
         }
 
         path.parent.mkdir(parents=True, exist_ok=True)
-        with open(path, "w", encoding="utf-8") as f:
-            json.dump(data, f, indent=2)
+        write_json(path, data)
+        self._source_lines.clear()
+        self._save_snapshot(path, lazy_ids)
+
+    def _save_snapshot(self, path: Path, lazy_ids: set[str]) -> None:
+        """Write the columnar snapshot that load() prefers over the JSON file.
+
+        Entity and relationship fields are stored as parallel tuples of
+        primitives in marshal format, which decodes several times faster
+        than JSON and needs no per-record dict. The snapshot records the
+        JSON file's mtime and size and is ignored once they no longer match.
+        """
+        entities = list(self.entities.values())
+        locations = [e.location for e in entities]
+        rels = self.relationships
+        snapshot = (
+            SNAPSHOT_VERSION,
+            _file_stamp(path),
+            self.metadata,
+            (
+                tuple(e.id for e in entities),
+                tuple(e.kind.value for e in entities),
+                tuple(e.name for e in entities),
+                tuple(e.qualified_name for e in entities),
+                tuple(loc.file_path for loc in locations),
+                tuple(loc.line_start for loc in locations),
+                tuple(loc.line_end for loc in locations),
+                tuple(loc.column_start for loc in locations),
+                tuple(loc.column_end for loc in locations),
+                tuple(e.docstring for e in entities),
+                tuple(e.signature for e in entities),
+                tuple(None if e.id in lazy_ids else e.source_code for e in entities),
+                tuple(e.metadata for e in entities),
+            ),
+            tuple(lazy_ids),
+            (
+                tuple(r.source_id for r in rels),
+                tuple(r.target_id for r in rels),
+                tuple(r.kind.value for r in rels),
+                tuple(r.metadata for r in rels),
+            ),
+        )
+        snapshot_path = _snapshot_path(path)
+        try:
+            snapshot_path.write_bytes(marshal.dumps(snapshot))
+        except (OSError, ValueError):
+            # Unwritable or unmarshallable metadata: load() falls back to JSON
+            snapshot_path.unlink(missing_ok=True)
 
     @classmethod
     def load(cls, path: str | Path) -> "KnowledgeStore":
@@ -94,20 +199,72 @@ class KnowledgeStore:
         if path.is_dir():
             path = path / cls.DEFAULT_FILENAME
 
-        with open(path, "r", encoding="utf-8") as f:
-            data = json.load(f)
+        store = cls._load_snapshot(path)
+        if store is not None:
+            return store
+
+        data = read_json(path)
 
         store = cls()
         store.metadata = data.get("metadata", {})
 
         for eid, edata in data.get("entities", {}).items():
+            eid = sys.intern(eid)
             store.entities[eid] = cls._dict_to_entity(edata)
+            if "source_code" not in edata:
+                store._lazy_source_ids.add(eid)
 
         for rdata in data.get("relationships", []):
             store.relationships.append(cls._dict_to_relationship(rdata))
 
         return store
 
+    @classmethod
+    def _load_snapshot(cls, path: Path) -> Optional["KnowledgeStore"]:
+        """Load the store from its snapshot if one matches the JSON file."""
+        try:
+            (
+                version, stamp, metadata, entity_columns, lazy_ids, rel_columns
+            ) = marshal.loads(_snapshot_path(path).read_bytes())
+            if version != SNAPSHOT_VERSION or tuple(stamp) != _file_stamp(path):
+                return None
+        except (OSError, EOFError, ValueError, TypeError):
+            return None
+
+        intern = sys.intern
+        store = cls()
+        store.metadata = metadata
+        entities = store.entities
+        for (
+            eid, kind, name, qualified_name, file_path, line_start, line_end,
+            column_start, column_end, docstring, signature, source_code, entity_metadata,
+        ) in zip(*entity_columns):
+            eid = intern(eid)
+            entities[eid] = Entity(
+                id=eid,
+                kind=_ENTITY_KINDS[kind],
+                name=intern(name),
+                qualified_name=intern(qualified_name),
+                location=Location(
+                    intern(file_path), line_start, line_end, column_start, column_end
+                ),
+                docstring=docstring,
+                signature=signature,
+                source_code=source_code,
+                metadata=intern_metadata(entity_metadata),
+            )
+        store._lazy_source_ids = {intern(eid) for eid in lazy_ids}
+        store.relationships = [
+            Relationship(
+                source_id=intern(source_id),
+                target_id=intern(target_id),
+                kind=_RELATIONSHIP_KINDS[kind],
+                metadata=intern_metadata(rel_metadata),
+            )
+            for source_id, target_id, kind, rel_metadata in zip(*rel_columns)
+        ]
+        return store
+
     def _entity_to_dict(self, entity: Entity) -> dict[str, Any]:
         """Convert entity to dictionary."""
         return {
@@ -115,7 +272,7 @@ class KnowledgeStore:
             "kind": entity.kind.value,
             "name": entity.name,
             "qualified_name": entity.qualified_name,
-            "location": asdict(entity.location),
+            "location": entity.location.to_dict(),
             "docstring": entity.docstring,
             "signature": entity.signature,
             "source_code": entity.source_code,
@@ -125,16 +282,20 @@ class KnowledgeStore:
     @staticmethod
     def _dict_to_entity(data: dict[str, Any]) -> Entity:
         """Convert dictionary to entity."""
+        # Ids, names and paths repeat across entities and relationships;
+        # interning lets every reference share one string object.
+        location = Location(**data["location"])
+        location.file_path = sys.intern(location.file_path)
         return Entity(
-            id=data["id"],
+            id=sys.intern(data["id"]),
             kind=EntityKind(data["kind"]),
-            name=data["name"],
-            qualified_name=data["qualified_name"],
-            location=Location(**data["location"]),
+            name=sys.intern(data["name"]),
+            qualified_name=sys.intern(data["qualified_name"]),
+            location=location,
             docstring=data.get("docstring"),
             signature=data.get("signature"),
             source_code=data.get("source_code"),
-            metadata=data.get("metadata", {}),
+            metadata=intern_metadata(data.get("metadata", {})),
         )
 
     def _relationship_to_dict(self, rel: Relationship) -> dict[str, Any]:
@@ -150,33 +311,103 @@ class KnowledgeStore:
     def _dict_to_relationship(data: dict[str, Any]) -> Relationship:
         """Convert dictionary to relationship."""
         return Relationship(
-            source_id=data["source_id"],
-            target_id=data["target_id"],
+            source_id=sys.intern(data["source_id"]),
+            target_id=sys.intern(data["target_id"]),
             kind=RelationshipKind(data["kind"]),
-            metadata=data.get("metadata", {}),
+            metadata=intern_metadata(data.get("metadata", {})),
         )
 
     # Query methods
 
     def get_entity(self, entity_id: str) -> Optional[Entity]:
-        """Get entity by ID."""
-        return self.entities.get(entity_id)
+        """Get entity by ID, loading lazily stored source code if needed."""
+        entity = self.entities.get(entity_id)
+        if entity is not None and entity_id in self._lazy_source_ids:
+            self._lazy_source_ids.discard(entity_id)
+            entity.source_code = self._read_source(entity)
+        return entity
+
+    def _read_source(self, entity: Entity) -> Optional[str]:
+        """Slice an entity's source from its file by line range."""
+        file_path = entity.location.file_path
+        lines = self._source_lines.get(file_path)
+        if lines is None:
+            try:
+                lines = Path(file_path).read_text(encoding="utf-8").splitlines()
+            except (OSError, UnicodeDecodeError):
+                lines = []
+            self._source_lines[file_path] = lines
+        if not lines:
+            return None
+        loc = entity.location
+        return "\n".join(lines[loc.line_start - 1:loc.line_end])
+
+    def resolve(self, target: str) -> Optional[Entity]:
+        """Return the entity with an ID, else the first name match for it.
+
+        Args:
+            target: Entity ID or search pattern.
+        """
+        entity = self.get_entity(target)
+        if entity is None:
+            matches = self.search(target, limit=1)
+            entity = matches[0] if matches else None
+        return entity
+
+    def search(self, pattern: str, limit: Optional[int] = None) -> list[Entity]:
+        """Search entities by name pattern (case-insensitive substring).
 
-    def search(self, pattern: str) -> list[Entity]:
-        """Search entities by name pattern."""
+        Args:
+            pattern: Substring to look for in names and qualified names.
+            limit: Stop after this many matches; all matches if None.
+        """
+        if limit is not None and limit <= 0:
+            return []
         pattern_lower = pattern.lower()
-        return [
-            e for e in self.entities.values()
-            if pattern_lower in e.name.lower()
-            or pattern_lower in e.qualified_name.lower()
-        ]
+        if "\n" in pattern_lower or "\t" in pattern_lower:
+            return [
+                e for e in self.entities.values()
+                if pattern_lower in e.name.lower()
+                or pattern_lower in e.qualified_name.lower()
+            ][:limit]
+
+        self._ensure_search_text()
+        text, starts, ids = self._search_text, self._search_starts, self._search_ids
+        if not starts:
+            return []
+        matches: list[Entity] = []
+        pos = text.find(pattern_lower)
+        while pos != -1:
+            line = bisect_right(starts, pos) - 1
+            matches.append(self.entities[ids[line]])
+            if line + 1 == len(starts) or len(matches) == limit:
+                break
+            # Skip to the next entity so each one is reported once
+            pos = text.find(pattern_lower, starts[line + 1])
+        return matches
+
+    def _ensure_search_text(self) -> None:
+        """Rebuild the search text if entities were reassigned or resized."""
+        key = (id(self.entities), len(self.entities))
+        if key == self._search_key:
+            return
+
+        lines: list[str] = []
+        starts: list[int] = []
+        offset = 0
+        for entity in self.entities.values():
+            line = f"{entity.name.lower()}\t{entity.qualified_name.lower()}"
+            starts.append(offset)
+            lines.append(line)
+            offset += len(line) + 1
+        self._search_text = "\n".join(lines)
+        self._search_starts = starts
+        self._search_ids = list(self.entities)
+        self._search_key = key
 
     def get_callers(self, entity_id: str) -> list[Entity]:
         """Get entities that call the given entity."""
-        caller_ids = [
-            r.source_id for r in self.relationships
-            if r.target_id == entity_id and r.kind == RelationshipKind.CALLS
-        ]
+        caller_ids = self._call_index("callers").get(entity_id, ())
         return [
             self.entities[cid] for cid in caller_ids
             if cid in self.entities
@@ -184,10 +415,7 @@ class KnowledgeStore:
 
     def get_callees(self, entity_id: str) -> list[Entity]:
         """Get entities called by the given entity."""
-        callee_ids = [
-            r.target_id for r in self.relationships
-            if r.source_id == entity_id and r.kind == RelationshipKind.CALLS
-        ]
+        callee_ids = self._call_index("callees").get(entity_id, ())
         return [
             self.entities[cid] for cid in callee_ids
             if cid in self.entities
@@ -223,7 +451,7 @@ class KnowledgeStore:
         dep_ids = set()
         for r in self.relationships:
             if r.source_id == entity_id:
-                if r.kind in {RelationshipKind.CALLS, RelationshipKind.IMPORTS}:
+                if r.kind in DEPENDENCY_KINDS:
                     dep_ids.add(r.target_id)
         return [
             self.entities[did] for did in dep_ids
@@ -235,7 +463,7 @@ class KnowledgeStore:
         dependent_ids = set()
         for r in self.relationships:
             if r.target_id == entity_id:
-                if r.kind in {RelationshipKind.CALLS, RelationshipKind.IMPORTS}:
+                if r.kind in DEPENDENCY_KINDS:
                     dependent_ids.add(r.source_id)
         return [
             self.entities[did] for did in dependent_ids
@@ -267,7 +495,48 @@ class KnowledgeStore:
                 kind = EntityKind(kind)
             except ValueError:
                 return []
-        return [e for e in self.entities.values() if e.kind == kind]
+        return [self.entities[eid] for eid in self._entities_by_kind().get(kind, [])]
+
+    def count_by_kind(self) -> dict[str, int]:
+        """Return the number of entities per kind value."""
+        return {k.value: len(ids) for k, ids in self._entities_by_kind().items()}
+
+    def count_relationships_by_kind(self) -> dict[str, int]:
+        """Return the number of relationships per kind value."""
+        key = (id(self.relationships), len(self.relationships))
+        if key != self._rel_kind_counts_key:
+            counts: dict[RelationshipKind, int] = {}
+            for rel in self.relationships:
+                counts[rel.kind] = counts.get(rel.kind, 0) + 1
+            self._rel_kind_counts = counts
+            self._rel_kind_counts_key = key
+        return {k.value: n for k, n in self._rel_kind_counts.items()}
+
+    def _entities_by_kind(self) -> dict[EntityKind, list[str]]:
+        """Return the kind index, rebuilding it if entities changed."""
+        key = (id(self.entities), len(self.entities))
+        if key != self._by_kind_key:
+            by_kind: dict[EntityKind, list[str]] = {}
+            for eid, entity in self.entities.items():
+                by_kind.setdefault(entity.kind, []).append(eid)
+            self._by_kind = by_kind
+            self._by_kind_key = key
+        return self._by_kind
+
+    def _call_index(self, direction: str) -> dict[str, list[str]]:
+        """Return CALLS adjacency for "callers" or "callees", rebuilding if needed."""
+        key = (id(self.relationships), len(self.relationships))
+        if key != self._calls_key:
+            callees: dict[str, list[str]] = {}
+            callers: dict[str, list[str]] = {}
+            for rel in self.relationships:
+                if rel.kind == RelationshipKind.CALLS:
+                    callees.setdefault(rel.source_id, []).append(rel.target_id)
+                    callers.setdefault(rel.target_id, []).append(rel.source_id)
+            self._callees = callees
+            self._callers = callers
+            self._calls_key = key
+        return self._callees if direction == "callees" else self._callers
 
     def get_outgoing_relationships(self, entity_id: str) -> list[Relationship]:
         """Return relationships where the entity is the source."""
@@ -301,29 +570,18 @@ class KnowledgeStore:
         if direction not in ("callers", "callees"):
             raise ValueError(f"direction must be 'callers' or 'callees', got {direction}")
             
+        adjacency = self._call_index(direction)
         results: list[dict[str, Any]] = []
         visited: set[str] = {entity_id}
-        frontier: list[tuple[str, int]] = [(entity_id, 0)]
+        frontier: deque[tuple[str, int]] = deque([(entity_id, 0)])
         
         while frontier and len(results) < max_results:
-            current_id, current_depth = frontier.pop(0)
+            current_id, current_depth = frontier.popleft()
             
             if current_depth >= depth:
                 continue
                 
-            # Get next hop entities
-            if direction == "callees":
-                next_ids = [
-                    r.target_id for r in self.relationships
-                    if r.source_id == current_id and r.kind == RelationshipKind.CALLS
-                ]
-            else:  # callers
-                next_ids = [
-                    r.source_id for r in self.relationships
-                    if r.target_id == current_id and r.kind == RelationshipKind.CALLS
-                ]
-            
-            for next_id in next_ids:
+            for next_id in adjacency.get(current_id, ()):
                 if next_id in visited:
                     continue
                     
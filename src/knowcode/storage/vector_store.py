@@ -2,7 +2,7 @@
 
 import json
 from pathlib import Path
-from typing import Optional
+from typing import Optional, Sequence
 
 import numpy as np
 
@@ -50,6 +50,24 @@ class VectorStore:
         self.index.add(vec)
         self.id_map[idx] = chunk_id
 
+    def add_many(self, chunk_ids: list[str], embeddings: Sequence[Sequence[float]]) -> None:
+        """Add a batch of chunk embeddings with a single FAISS call.
+
+        No-op if FAISS is unavailable.
+
+        Args:
+            chunk_ids: Chunk IDs, aligned with ``embeddings``.
+            embeddings: One embedding per chunk ID.
+        """
+        if not self.index or not chunk_ids:
+            return
+
+        vecs = np.asarray(embeddings, dtype="float32").reshape(len(chunk_ids), -1)
+        start = self.index.ntotal
+        self.index.add(vecs)
+        for offset, chunk_id in enumerate(chunk_ids):
+            self.id_map[start + offset] = chunk_id
+
     def search(self, embedding: list[float], limit: int = 10) -> list[tuple[str, float]]:
         """Search for similar embeddings.
 
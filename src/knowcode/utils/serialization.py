@@ -0,0 +1,110 @@
+"""JSON serialization helpers for on-disk persistence."""
+
+from __future__ import annotations
+
+import gzip
+import json
+from pathlib import Path
+from typing import Any, Iterable, Iterator
+
+try:
+    import orjson
+except ImportError:
+    # Optional dependency
+    orjson = None
+
+GZIP_MAGIC = b"\x1f\x8b"
+
+
+def dumps(data: Any) -> bytes:
+    """Serialize data to compact UTF-8 JSON bytes.
+
+    Uses orjson when installed and falls back to the standard library.
+
+    Args:
+        data: JSON-compatible data to serialize.
+
+    Returns:
+        Encoded JSON document without indentation.
+    """
+    if orjson is not None:
+        return orjson.dumps(data, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(data, separators=(",", ":")).encode("utf-8")
+
+
+def loads(raw: bytes | str) -> Any:
+    """Deserialize a JSON document produced by dumps()."""
+    if orjson is not None:
+        return orjson.loads(raw)
+    return json.loads(raw)
+
+
+def write_json(path: str | Path, data: Any) -> None:
+    """Write data to a JSON file.
+
+    Files with a ``.gz`` suffix are gzip-compressed.
+
+    Args:
+        path: Destination file path.
+        data: JSON-compatible data to write.
+    """
+    path = Path(path)
+    payload = dumps(data)
+    if path.suffix == ".gz":
+        payload = gzip.compress(payload, compresslevel=6)
+    path.write_bytes(payload)
+
+
+def read_json(path: str | Path) -> Any:
+    """Read a JSON file written by write_json().
+
+    Gzip-compressed files are detected by their magic bytes, regardless
+    of the file suffix.
+
+    Args:
+        path: Source file path.
+
+    Returns:
+        Decoded JSON data.
+    """
+    raw = Path(path).read_bytes()
+    if raw[:2] == GZIP_MAGIC:
+        raw = gzip.decompress(raw)
+    return loads(raw)
+
+
+def write_ndjson(path: str | Path, records: Iterable[Any]) -> int:
+    """Stream records to a newline-delimited JSON file.
+
+    Each record is encoded and written as it is produced, so the full
+    document never has to be held in memory.
+
+    Args:
+        path: Destination file path.
+        records: JSON-compatible records to write, one per line.
+
+    Returns:
+        Number of records written.
+    """
+    count = 0
+    with open(path, "wb") as f:
+        for record in records:
+            f.write(dumps(record))
+            f.write(b"\n")
+            count += 1
+    return count
+
+
+def iter_ndjson(path: str | Path) -> Iterator[Any]:
+    """Yield records from a file written by write_ndjson().
+
+    Args:
+        path: Source file path.
+
+    Yields:
+        Decoded records, skipping blank lines.
+    """
+    with open(path, "rb") as f:
+        for line in f:
+            if line.strip():
+                yield loads(line)
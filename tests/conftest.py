@@ -0,0 +1,12 @@
+"""Shared pytest fixtures."""
+
+import pytest
+
+from knowcode.llm import cache, rate_limiter
+
+
+@pytest.fixture(autouse=True)
+def isolated_rate_state(tmp_path, monkeypatch):
+    """Keep rate limit, circuit breaker and LLM cache state out of ~/.knowcode."""
+    monkeypatch.setattr(rate_limiter, "DEFAULT_STATE_PATH", tmp_path / "rate_state.mmap")
+    monkeypatch.setattr(cache, "DEFAULT_CACHE_PATH", tmp_path / "llm_cache.sqlite")
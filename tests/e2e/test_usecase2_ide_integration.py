@@ -10,7 +10,7 @@ Simulates the full workflow:
 from __future__ import annotations
 
 from pathlib import Path
-from unittest.mock import MagicMock
+from unittest.mock import AsyncMock, MagicMock
 
 from knowcode.config import AppConfig, ModelConfig
 from knowcode.data_models import TaskType
@@ -98,7 +98,7 @@ def test_usecase2_low_sufficiency_triggers_llm(tmp_path: Path) -> None:
     agent.rate_limiter.check_availability.return_value = True
     
     # Mock the answer method to track calls
-    agent.answer = MagicMock(return_value="LLM generated answer")  # type: ignore[method-assign]
+    agent.answer_async = AsyncMock(return_value="LLM generated answer")  # type: ignore[method-assign]
     
     # Execute
     result = agent.smart_answer("Explain complex architecture")
@@ -106,7 +106,7 @@ def test_usecase2_low_sufficiency_triggers_llm(tmp_path: Path) -> None:
     # Verify: Should use LLM
     assert result["source"] == "llm"
     assert result["answer"] == "LLM generated answer"
-    assert agent.answer.called, "LLM should be called for low sufficiency"
+    assert agent.answer_async.called, "LLM should be called for low sufficiency"
 
 
 def test_usecase2_mcp_tool_returns_sufficiency_score(tmp_path: Path) -> None:
@@ -171,7 +171,7 @@ def test_usecase2_graceful_degradation_on_empty_context(tmp_path: Path) -> None:
     agent = Agent(mock_service, config)  # type: ignore[arg-type]
     agent.rate_limiter = MagicMock()
     agent.rate_limiter.check_availability.return_value = True
-    agent.answer = MagicMock(return_value="General guidance")  # type: ignore[method-assign]
+    agent.answer_async = AsyncMock(return_value="General guidance")  # type: ignore[method-assign]
     
     # Execute
     result = agent.smart_answer("What is foo?")
@@ -4,6 +4,7 @@ from pathlib import Path
 
 from knowcode.config import AppConfig, ModelConfig
 from knowcode.llm.agent import Agent
+from knowcode.llm.cache import LLMCache, SQLiteBackend
 
 def test_agent_failover_logic():
     # Setup mock service and config
@@ -29,7 +30,7 @@ def test_agent_failover_logic():
         ModelConfig(name="backup-model", api_key_env="TEST_KEY")
     ])
     
-    agent = Agent(mock_service, config)
+    agent = Agent(mock_service, config, cache=LLMCache(SQLiteBackend(":memory:")))
     
     # Mock genai.Client
     with patch.object(agent, "_get_client") as mock_get_client:
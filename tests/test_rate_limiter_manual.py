@@ -2,6 +2,7 @@ from unittest.mock import MagicMock, patch
 
 from knowcode.config import AppConfig, ModelConfig
 from knowcode.llm.agent import Agent
+from knowcode.llm.cache import LLMCache, SQLiteBackend
 from knowcode.llm.rate_limiter import RateLimiter
 
 def test_rate_limiter_integration(tmp_path):
@@ -23,7 +24,7 @@ def test_rate_limiter_integration(tmp_path):
     }
 
     # Setup RateLimiter with temp file
-    stats_file = tmp_path / "usage_stats.json"
+    stats_file = tmp_path / "rate_state.mmap"
     rate_limiter = RateLimiter(persistence_path=stats_file)
     
     # Config: Model A has RPM=1, Model B has RPM=10
@@ -32,7 +33,7 @@ def test_rate_limiter_integration(tmp_path):
         ModelConfig(name="high-limit-model", api_key_env="TEST_KEY", rpm_free_tier_limit=10)
     ])
     
-    agent = Agent(mock_service, config)
+    agent = Agent(mock_service, config, cache=LLMCache(SQLiteBackend(":memory:")))
     agent.rate_limiter = rate_limiter # Inject test limiter
     
     # Mock clients
@@ -52,5 +53,6 @@ def test_rate_limiter_integration(tmp_path):
             
     # Verify persistence
     assert stats_file.exists()
-    with open(stats_file) as f:
-        print("\nStats File Content:", f.read())
+    reloaded = RateLimiter(persistence_path=stats_file)
+    assert not reloaded.check_availability(config.models[0])
+    assert reloaded.check_availability(config.models[1])
@@ -29,3 +29,36 @@ def test_cli_analyze_query_stats_context(tmp_path):
 
     context = runner.invoke(cli, ["context", entity_id, "--store", str(tmp_path), "--max-tokens", "200"])
     assert context.exit_code == 0
+
+
+def test_cli_ask_many_answers_each_question(tmp_path, monkeypatch):
+    """ask-many should answer every non-blank line through BatchProcessor."""
+    from knowcode.llm import agent as agent_module
+    from knowcode.llm import batch as batch_module
+
+    class StubAgent:
+        def __init__(self, service, config):  # noqa: ANN001
+            self.closed = False
+
+        async def aclose(self) -> None:
+            self.closed = True
+
+    seen: dict = {}
+
+    async def answer_many(self, queries):  # noqa: ANN001
+        seen["use_batch_api"] = self.use_batch_api
+        seen["batch_timeout"] = self.batch_timeout
+        return [q.upper() for q in queries]
+
+    monkeypatch.setattr(agent_module, "Agent", StubAgent)
+    monkeypatch.setattr(batch_module.BatchProcessor, "answer_many", answer_many)
+    questions = tmp_path / "questions.txt"
+    questions.write_text("what is foo\n\nwhere is bar\n", encoding="utf-8")
+
+    result = CliRunner().invoke(
+        cli, ["ask-many", str(questions), "--store", str(tmp_path), "--batch-api", "--batch-timeout", "60"]
+    )
+
+    assert result.exit_code == 0, result.output
+    assert "WHAT IS FOO" in result.output and "WHERE IS BAR" in result.output
+    assert seen == {"use_batch_api": True, "batch_timeout": 60.0}
@@ -0,0 +1,46 @@
+"""Unit tests for graph building."""
+
+from __future__ import annotations
+
+from pathlib import Path
+
+from knowcode.indexing import graph_builder
+from knowcode.indexing.graph_builder import GraphBuilder
+from knowcode.indexing.parse_cache import ParseCache
+from knowcode.indexing.scanner import Scanner
+
+
+def test_parallel_parse_matches_serial(tmp_path: Path, monkeypatch) -> None:
+    """Parsing in worker processes should produce the same graph, in order."""
+    src = tmp_path / "src"
+    src.mkdir()
+    for i in range(6):
+        (src / f"m{i}.py").write_text(
+            f"def f{i}():\n    return f{(i + 1) % 6}()\n", encoding="utf-8"
+        )
+    serial = GraphBuilder().build_from_directory(src)
+
+    pools: list[int] = []
+    pool_cls = graph_builder.ProcessPoolExecutor
+
+    def recording_pool(max_workers):
+        pools.append(max_workers)
+        return pool_cls(max_workers=max_workers)
+
+    monkeypatch.setattr(graph_builder, "ProcessPoolExecutor", recording_pool)
+    monkeypatch.setattr(graph_builder, "PARALLEL_PARSE_MIN_FILES", 2)
+    cache = ParseCache(tmp_path / "parse_cache.sqlite")
+    # One cached file, five to parse in the pool
+    first = [f for f in Scanner(src).scan_all() if f.path.name == "m3.py"]
+    GraphBuilder(parse_cache=cache).build_from_files(first)
+    parallel = GraphBuilder(parse_cache=cache, parse_workers=2).build_from_directory(src)
+
+    assert pools == [2]
+    assert list(parallel.parse_results) == list(serial.parse_results)
+    assert parallel.entities.keys() == serial.entities.keys()
+    assert [(r.source_id, r.target_id) for r in parallel.relationships] == [
+        (r.source_id, r.target_id) for r in serial.relationships
+    ]
+    rows = cache._conn.execute("SELECT COUNT(*) FROM parse_results").fetchone()[0]
+    assert rows == 6
+    cache.close()
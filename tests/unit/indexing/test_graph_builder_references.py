@@ -26,3 +26,34 @@ def test_reference_resolution() -> None:
     builder._resolve_references()
 
     assert builder.relationships[0].target_id == entity.id
+
+
+def test_reference_resolution_by_qualified_suffix() -> None:
+    """ref:: targets should resolve against the tail of qualified names."""
+    builder = GraphBuilder()
+    method = Entity(
+        id="file.py::Foo.bar",
+        kind=EntityKind.METHOD,
+        name="bar",
+        qualified_name="pkg.Foo.bar",
+        location=Location("file.py", 2, 3),
+    )
+    builder.entities = {method.id: method}
+    builder.relationships = [
+        Relationship(
+            source_id="file.py::Caller",
+            target_id="ref::Foo.bar",
+            kind=RelationshipKind.CALLS,
+        ),
+        Relationship(
+            source_id="file.py::Caller",
+            target_id="ref::missing",
+            kind=RelationshipKind.CALLS,
+        ),
+    ]
+
+    builder._resolve_references()
+
+    assert builder.relationships[0].target_id == method.id
+    assert builder.relationships[1].target_id == "ref::missing"
+    assert builder.search_entities("FOO") == [method]
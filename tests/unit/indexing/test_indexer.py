@@ -0,0 +1,145 @@
+"""Unit tests for the indexing pipeline."""
+
+from __future__ import annotations
+
+from pathlib import Path
+
+from knowcode.data_models import EmbeddingConfig
+from knowcode.indexing.graph_builder import GraphBuilder
+from knowcode.indexing.indexer import Indexer, _content_key
+from knowcode.llm.embedding import EmbeddingProvider
+
+
+class RecordingEmbeddingProvider(EmbeddingProvider):
+    def __init__(self, config: EmbeddingConfig) -> None:
+        super().__init__(config)
+        self.batches: list[list[str]] = []
+
+    def embed(self, texts: list[str]) -> list[list[float]]:
+        self.batches.append(list(texts))
+        return [[float(len(t)), 1.0] for t in texts]
+
+    def embed_single(self, text: str) -> list[float]:
+        return [float(len(text)), 1.0]
+
+
+def _write_sources(root: Path) -> None:
+    for name in ("a", "b", "c"):
+        (root / f"{name}.py").write_text(
+            f"def {name}_one():\n    return 1\n\n\ndef {name}_two():\n    return 2\n",
+            encoding="utf-8",
+        )
+
+
+def test_index_directory_batches_across_files(tmp_path: Path) -> None:
+    """Chunks from different files should share embedding batches."""
+    _write_sources(tmp_path)
+    provider = RecordingEmbeddingProvider(
+        EmbeddingConfig(provider="openai", model_name="x", dimension=2, batch_size=4)
+    )
+    indexer = Indexer(provider)
+
+    count = indexer.index_directory(tmp_path)
+
+    assert count == sum(len(b) for b in provider.batches)
+    assert len(indexer.chunk_repo._chunks) == count
+    assert all(len(b) <= 4 for b in provider.batches)
+    assert len(provider.batches) == -(-count // 4)
+
+
+def test_embed_and_store_sorts_batches_by_length(tmp_path: Path) -> None:
+    """Batches should hold similar-length texts and map back to their chunks."""
+    _write_sources(tmp_path)
+    provider = RecordingEmbeddingProvider(
+        EmbeddingConfig(provider="openai", model_name="x", dimension=2, batch_size=2)
+    )
+    indexer = Indexer(provider)
+
+    indexer.index_directory(tmp_path)
+
+    # Batches run concurrently, so check them in length order rather than call order
+    batches = sorted(provider.batches, key=lambda b: len(b[0]))
+    lengths = [len(t) for batch in batches for t in batch]
+    assert lengths == sorted(lengths)
+    for chunk in indexer.chunk_repo._chunks.values():
+        vector = indexer._embed_cache[_content_key(chunk.content)]
+        assert vector.tolist() == [float(len(chunk.content)), 1.0]
+
+
+def test_embedding_cache_skips_known_content(tmp_path: Path) -> None:
+    """Re-indexing with a saved cache should not call the provider again."""
+    src = tmp_path / "src"
+    src.mkdir()
+    _write_sources(src)
+    (src / "dup.py").write_text((src / "a.py").read_text(encoding="utf-8"), encoding="utf-8")
+    config = EmbeddingConfig(provider="openai", model_name="x", dimension=2)
+
+    first = RecordingEmbeddingProvider(config)
+    indexer = Indexer(first)
+    count = indexer.index_directory(src)
+    indexer.save(tmp_path / "idx")
+
+    embedded = [t for batch in first.batches for t in batch]
+    assert len(embedded) == len(set(embedded))
+    assert len(embedded) < count
+
+    second = RecordingEmbeddingProvider(config)
+    reindexer = Indexer(second)
+    reindexer.load_embedding_cache(tmp_path / "idx")
+    assert reindexer.index_directory(src) == count
+    assert second.batches == []
+
+
+def test_index_directory_parses_each_file_once(tmp_path: Path, monkeypatch) -> None:
+    """Chunking should reuse the graph builder's parse results."""
+    _write_sources(tmp_path)
+    parsed: list[Path] = []
+    original = GraphBuilder._parse_file
+
+    def counting_parse(self, file_info):
+        parsed.append(file_info.path)
+        return original(self, file_info)
+
+    monkeypatch.setattr(GraphBuilder, "_parse_file", counting_parse)
+    provider = RecordingEmbeddingProvider(
+        EmbeddingConfig(provider="openai", model_name="x", dimension=2)
+    )
+
+    count = Indexer(provider).index_directory(tmp_path)
+
+    assert count > 0
+    assert len(parsed) == len(set(parsed)) == 3
+
+
+def test_index_file_reuses_parsers(tmp_path: Path) -> None:
+    """Incremental indexing should not rebuild the parser set per file."""
+    _write_sources(tmp_path)
+    provider = RecordingEmbeddingProvider(
+        EmbeddingConfig(provider="openai", model_name="x", dimension=2)
+    )
+    indexer = Indexer(provider)
+
+    assert indexer.index_file(tmp_path / "a.py") > 0
+    builder = indexer._graph_builder
+    assert indexer.index_file(tmp_path / "b.py") > 0
+    assert indexer._graph_builder is builder
+
+
+def test_save_and_load_round_trip_chunks(tmp_path: Path) -> None:
+    """Chunks should be streamed to NDJSON and restored on load."""
+    src = tmp_path / "src"
+    src.mkdir()
+    _write_sources(src)
+    provider = RecordingEmbeddingProvider(
+        EmbeddingConfig(provider="openai", model_name="x", dimension=2)
+    )
+    indexer = Indexer(provider)
+    count = indexer.index_directory(src)
+    indexer.save(tmp_path / "idx")
+
+    lines = (tmp_path / "idx" / "chunks.ndjson").read_bytes().splitlines()
+    assert len(lines) == count
+
+    reloaded = Indexer(provider)
+    reloaded.load(tmp_path / "idx")
+    assert reloaded.chunk_repo._chunks.keys() == indexer.chunk_repo._chunks.keys()
@@ -0,0 +1,74 @@
+"""Unit tests for the file system event handler."""
+
+import time
+from pathlib import Path
+from types import SimpleNamespace
+
+from knowcode.indexing.monitor import IndexingHandler
+
+
+class RecordingBackgroundIndexer:
+    def __init__(self) -> None:
+        self.queued: list[Path] = []
+
+    def queue_file(self, path: Path) -> None:
+        self.queued.append(path)
+
+
+def _event(path: Path) -> SimpleNamespace:
+    return SimpleNamespace(src_path=str(path), is_directory=False)
+
+
+def test_events_for_one_save_are_coalesced(tmp_path: Path) -> None:
+    """Repeated events within the quiet period should queue each file once."""
+    bg = RecordingBackgroundIndexer()
+    handler = IndexingHandler(bg, debounce_seconds=0.05, root_dir=tmp_path)
+    a, b = tmp_path / "a.py", tmp_path / "b.md"
+
+    handler.on_created(_event(a))
+    handler.on_modified(_event(a))
+    handler.on_modified(_event(b))
+    handler.on_modified(_event(tmp_path / "c.txt"))
+    handler.on_modified(_event(tmp_path / "node_modules" / "dep.js"))
+    handler.on_modified(_event(a))
+
+    for _ in range(40):
+        if bg.queued:
+            break
+        time.sleep(0.05)
+
+    assert bg.queued == [a, b]
+
+    handler.on_modified(_event(b))
+    handler.flush()
+    assert bg.queued == [a, b, b]
+
+
+def test_ignored_dirs_only_match_below_the_root(tmp_path: Path) -> None:
+    """A project that itself lives under e.g. venv/ should still be watched."""
+    root = tmp_path / "venv" / "project"
+    bg = RecordingBackgroundIndexer()
+    handler = IndexingHandler(bg, root_dir=root)
+
+    handler.on_modified(_event(root / "src" / "app.py"))
+    handler.on_modified(_event(root / "venv" / "lib" / "dep.py"))
+    handler.on_modified(_event(root / ".git" / "hooks" / "x.py"))
+    handler.flush()
+
+    assert bg.queued == [root / "src" / "app.py"]
+
+
+def test_each_event_restarts_the_quiet_period(tmp_path: Path) -> None:
+    """A new event should cancel the pending timer and start a fresh one."""
+    bg = RecordingBackgroundIndexer()
+    handler = IndexingHandler(bg, debounce_seconds=60, root_dir=tmp_path)
+
+    handler.on_modified(_event(tmp_path / "a.py"))
+    first = handler._timer
+    handler.on_modified(_event(tmp_path / "b.py"))
+
+    assert first is not None and first.finished.is_set()
+    assert handler._timer is not first
+    assert bg.queued == []
+    handler.flush()
+    assert bg.queued == [tmp_path / "a.py", tmp_path / "b.py"]
@@ -0,0 +1,62 @@
+"""Unit tests for the persistent parse cache."""
+
+from __future__ import annotations
+
+from pathlib import Path
+
+from knowcode.indexing.graph_builder import GraphBuilder
+from knowcode.indexing.parse_cache import ParseCache
+from knowcode.indexing.scanner import FileInfo
+from knowcode.utils.serialization import loads
+
+
+def test_unchanged_files_are_not_parsed_again(tmp_path: Path, monkeypatch) -> None:
+    """A second build should reuse cached results until the file changes."""
+    source = tmp_path / "mod.py"
+    source.write_text("def a():\n    return 1\n", encoding="utf-8")
+    cache = ParseCache(tmp_path / "cache" / "parse_cache.sqlite")
+    first = GraphBuilder(parse_cache=cache).build_from_directory(tmp_path)
+
+    builder = GraphBuilder(parse_cache=cache)
+    parsed: list[FileInfo] = []
+    original = builder._parse_source
+    monkeypatch.setattr(
+        builder, "_parse_source", lambda info: parsed.append(info) or original(info)
+    )
+    builder.build_from_directory(tmp_path)
+
+    assert parsed == []
+    assert builder.entities.keys() == first.entities.keys()
+
+    source.write_text("def a():\n    return 1\n\n\ndef b():\n    return 2\n", encoding="utf-8")
+    builder.build_from_directory(tmp_path)
+
+    assert [p.path.name for p in parsed] == ["mod.py"]
+    assert any(e.name == "b" for e in builder.entities.values())
+    rows = cache._conn.execute("SELECT COUNT(*) FROM parse_results").fetchone()[0]
+    assert rows == 1
+    cache.close()
+
+
+def test_results_are_stored_as_json(tmp_path: Path) -> None:
+    """Cache rows should be plain JSON that round-trips to equal results."""
+    source = tmp_path / "mod.py"
+    source.write_text('def a():\n    """Doc."""\n    return b()\n', encoding="utf-8")
+    cache = ParseCache(tmp_path / "parse_cache.sqlite")
+    builder = GraphBuilder(parse_cache=cache)
+    info = FileInfo(source, "mod.py", ".py", 0)
+    parsed = builder._parse_file(info)
+    cache.commit()
+
+    (blob,) = cache._conn.execute("SELECT result FROM parse_results").fetchone()
+    assert loads(blob)["file_path"] == str(source)
+
+    cached = builder._parse_file(info)
+    assert cached is not parsed
+    assert [(e.id, e.kind, e.location, e.docstring, e.source_code) for e in cached.entities] == [
+        (e.id, e.kind, e.location, e.docstring, e.source_code) for e in parsed.entities
+    ]
+    assert [(r.source_id, r.target_id, r.kind) for r in cached.relationships] == [
+        (r.source_id, r.target_id, r.kind) for r in parsed.relationships
+    ]
+    cache.close()
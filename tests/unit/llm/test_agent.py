@@ -2,12 +2,16 @@
 
 from __future__ import annotations
 
+import asyncio
 from pathlib import Path
-from unittest.mock import MagicMock
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
 
 from knowcode.config import AppConfig, ModelConfig
 from knowcode.data_models import TaskType
-from knowcode.llm.agent import Agent
+from knowcode.llm.agent import HEDGE_FIRST_CHUNK_FALLBACK_SECONDS, Agent, _build_client
+from knowcode.llm.cache import LLMCache, SQLiteBackend
 
 
 class DummyService:
@@ -36,11 +40,21 @@ class DummyService:
         }
 
 
+@pytest.fixture
+def fresh_clients(monkeypatch):
+    """Start from empty process-wide client caches."""
+    monkeypatch.setattr(Agent, "_shared_openai_clients", {})
+    monkeypatch.setattr(Agent, "_shared_http_client", None)
+    _build_client.cache_clear()
+    yield
+    _build_client.cache_clear()
+
+
 def _make_agent(service: DummyService) -> Agent:
     cfg = AppConfig(
         models=[ModelConfig(name="test-model", provider="google", api_key_env="TEST_KEY")]
     )
-    agent = Agent(service, cfg)
+    agent = Agent(service, cfg, cache=LLMCache(SQLiteBackend(":memory:")))
     agent.rate_limiter = MagicMock()
     agent.rate_limiter.check_availability.return_value = True
 
@@ -73,6 +87,20 @@ def test_agent_answer_uses_unified_retrieval_kernel(tmp_path: Path) -> None:
     assert service.retrieve_calls == ["Explain e1"]
 
 
+def test_agent_answer_async_uses_async_client(tmp_path: Path) -> None:
+    service = DummyService(store_path=tmp_path)
+    agent = _make_agent(service)
+    async_client = MagicMock()
+    async_client.models.generate_content = AsyncMock(return_value=MagicMock(text="ASYNC"))
+    agent._get_async_client = MagicMock(return_value=async_client)
+
+    answer = asyncio.run(agent.answer_async("What is e1?"))
+
+    assert answer == "ASYNC"
+    assert service.retrieve_calls == ["What is e1?"]
+    agent.rate_limiter.record_usage.assert_called_once_with("test-model")
+
+
 def test_smart_answer_uses_local_when_sufficient(tmp_path: Path) -> None:
     service = DummyService(store_path=tmp_path)
     service.retrieval_result = {
@@ -113,8 +141,289 @@ def test_smart_answer_calls_llm_when_insufficient(tmp_path: Path) -> None:
         "errors": [],
     }
     agent = _make_agent(service)
-    agent.answer = MagicMock(return_value="LLM")  # type: ignore[method-assign]
+    agent.answer_async = AsyncMock(return_value="LLM")  # type: ignore[method-assign]
 
     result = agent.smart_answer("Explain Foo")
     assert result["source"] == "llm"
     assert result["answer"] == "LLM"
+
+
+def test_smart_answer_cache_respects_force_llm_and_store_changes(tmp_path: Path) -> None:
+    service = DummyService(store_path=tmp_path)
+    store_file = tmp_path / "knowcode_knowledge.json"
+    store_file.write_text("{}")
+    agent = _make_agent(service)
+    agent.answer_async = AsyncMock(return_value="LLM")  # type: ignore[method-assign]
+    agent.cache.set(agent._query_cache_key("Explain Foo"), "CACHED", agent._cache_namespace())
+
+    assert agent.smart_answer("Explain Foo")["source"] == "cache"
+    assert agent.smart_answer("Explain Foo", force_llm=True)["source"] == "llm"
+
+    store_file.write_text('{"entities": {}}')
+    assert agent.smart_answer("Explain Foo")["source"] == "llm"
+
+
+def test_openai_clients_are_shared_across_agents(tmp_path: Path, monkeypatch, fresh_clients) -> None:
+    monkeypatch.setenv("TEST_OPENAI_KEY", "sk-test")
+    cfg = AppConfig(
+        models=[ModelConfig(name="gpt", provider="openai", api_key_env="TEST_OPENAI_KEY")]
+    )
+
+    cache = LLMCache(SQLiteBackend(":memory:"))
+    first = Agent(DummyService(store_path=tmp_path), cfg, cache=cache)._get_client(cfg.models[0])
+    second = Agent(DummyService(store_path=tmp_path), cfg, cache=cache)._get_client(cfg.models[0])
+
+    assert first is second
+
+
+def test_models_sharing_a_key_share_client_and_meta(tmp_path: Path, monkeypatch, fresh_clients) -> None:
+    monkeypatch.setenv("TEST_OR_KEY", "sk-test")
+    cfg = AppConfig(
+        models=[
+            ModelConfig(name="a", provider="openrouter", api_key_env="TEST_OR_KEY"),
+            ModelConfig(name="b", provider="openrouter", api_key_env="TEST_OR_KEY"),
+        ]
+    )
+    agent = Agent(DummyService(store_path=tmp_path), cfg, cache=LLMCache(SQLiteBackend(":memory:")))
+
+    assert agent._get_client(cfg.models[0]) is agent._get_client(cfg.models[1])
+    meta = agent._provider_meta(cfg.models[0])
+    assert meta.base_url == "https://openrouter.ai/api/v1"
+    assert meta.extra_headers["X-Title"] == "KnowCode"
+    assert agent._provider_meta(cfg.models[1]).extra_headers is meta.extra_headers
+    assert agent._provider_meta(cfg.models[0]) is meta
+
+
+def test_agent_answer_served_from_cache_on_repeat(tmp_path: Path) -> None:
+    service = DummyService(store_path=tmp_path)
+    agent = _make_agent(service)
+    client = agent._get_client.return_value
+
+    assert agent.answer("Explain e1") == "ANSWER"
+    assert agent.answer("Explain e1") == "ANSWER"
+
+    assert client.models.generate_content.call_count == 1
+    assert agent.cache.stats()["hits"] == 1
+
+
+def test_answer_async_hedges_slow_model(tmp_path: Path) -> None:
+    service = DummyService(store_path=tmp_path)
+    cfg = AppConfig(
+        models=[
+            ModelConfig(name="slow", provider="google", api_key_env="TEST_KEY"),
+            ModelConfig(name="fast", provider="google", api_key_env="TEST_KEY"),
+        ],
+        hedge_delay=0.01,
+    )
+    agent = Agent(service, cfg, cache=LLMCache(SQLiteBackend(":memory:")))
+    agent.rate_limiter = MagicMock()
+    agent.rate_limiter.check_availability.return_value = True
+    slow_cancelled = False
+
+    async def slow_generate(**_kwargs):
+        nonlocal slow_cancelled
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            slow_cancelled = True
+            raise
+
+    clients = {
+        "slow": MagicMock(),
+        "fast": MagicMock(),
+    }
+    clients["slow"].models.generate_content = slow_generate
+    clients["fast"].models.generate_content = AsyncMock(return_value=MagicMock(text="FAST"))
+    agent._get_async_client = lambda model: clients[model.name]
+
+    answer = asyncio.run(agent.answer_async("Explain e1"))
+
+    assert answer == "FAST"
+    assert slow_cancelled
+    # Both requests were sent, so both count against the models' limits
+    assert [c.args[0] for c in agent.rate_limiter.record_usage.call_args_list] == ["slow", "fast"]
+
+
+def test_agent_skips_model_with_open_circuit(tmp_path: Path) -> None:
+    service = DummyService(store_path=tmp_path)
+    agent = _make_agent(service)
+    client = agent._get_client.return_value
+    client.models.generate_content.side_effect = RuntimeError("down")
+
+    for i in range(5):
+        with pytest.raises(RuntimeError):
+            agent.answer(f"q{i}")
+
+    with pytest.raises(ValueError):
+        agent.answer("one more")
+    assert client.models.generate_content.call_count == 5
+
+
+def test_answer_stream_fails_over_before_first_chunk(tmp_path: Path) -> None:
+    service = DummyService(store_path=tmp_path)
+    cfg = AppConfig(
+        models=[
+            ModelConfig(name="broken", provider="google", api_key_env="TEST_KEY"),
+            ModelConfig(name="ok", provider="google", api_key_env="TEST_KEY"),
+        ]
+    )
+    agent = Agent(service, cfg, cache=LLMCache(SQLiteBackend(":memory:")))
+    agent.rate_limiter = MagicMock()
+    agent.rate_limiter.check_availability.return_value = True
+
+    async def chunks():
+        for text in ("Hel", "lo"):
+            yield MagicMock(text=text)
+
+    clients = {"broken": MagicMock(), "ok": MagicMock()}
+    clients["broken"].models.generate_content_stream = AsyncMock(side_effect=RuntimeError("down"))
+    clients["ok"].models.generate_content_stream = AsyncMock(return_value=chunks())
+    agent._get_async_client = lambda model: clients[model.name]
+
+    async def collect() -> list[str]:
+        return [piece async for piece in agent.answer_stream("Explain e1")]
+
+    assert asyncio.run(collect()) == ["Hel", "lo"]
+    assert [c.args[0] for c in agent.rate_limiter.record_usage.call_args_list] == ["broken", "ok"]
+    # The completed stream is cached as one answer
+    assert asyncio.run(collect()) == ["Hello"]
+
+
+def test_answer_stream_hedges_model_without_first_chunk(tmp_path: Path) -> None:
+    service = DummyService(store_path=tmp_path)
+    cfg = AppConfig(
+        models=[
+            ModelConfig(name="slow", provider="google", api_key_env="TEST_KEY"),
+            ModelConfig(name="fast", provider="google", api_key_env="TEST_KEY"),
+        ],
+        hedge_delay=0.01,
+    )
+    agent = Agent(service, cfg, cache=LLMCache(SQLiteBackend(":memory:")))
+    agent.rate_limiter = MagicMock()
+    agent.rate_limiter.check_availability.return_value = True
+    slow_closed = False
+
+    async def slow_chunks():
+        nonlocal slow_closed
+        try:
+            await asyncio.sleep(10)
+            yield MagicMock(text="late")
+        finally:
+            slow_closed = True
+
+    async def fast_chunks():
+        for text in ("Hel", "lo"):
+            yield MagicMock(text=text)
+
+    clients = {"slow": MagicMock(), "fast": MagicMock()}
+    clients["slow"].models.generate_content_stream = AsyncMock(return_value=slow_chunks())
+    clients["fast"].models.generate_content_stream = AsyncMock(return_value=fast_chunks())
+    agent._get_async_client = lambda model: clients[model.name]
+
+    async def collect() -> list[str]:
+        return [piece async for piece in agent.answer_stream("Explain e1")]
+
+    assert asyncio.run(collect()) == ["Hel", "lo"]
+    assert slow_closed
+    assert [c.args[0] for c in agent.rate_limiter.record_usage.call_args_list] == ["slow", "fast"]
+
+
+def test_hedge_delay_follows_observed_latency(tmp_path: Path) -> None:
+    agent = _make_agent(DummyService(store_path=tmp_path))
+    model = agent.config.models[0]
+
+    assert agent._hedge_delay(model, first_chunk=True) == HEDGE_FIRST_CHUNK_FALLBACK_SECONDS
+    for _ in range(20):
+        agent.latency.observe(model.name, 3.0, first_chunk=True)
+    assert agent._hedge_delay(model, first_chunk=True) == pytest.approx(3.0, abs=0.5)
+
+    agent.config.hedge_delay = 0
+    assert agent._hedge_delay(model, first_chunk=True) is None
+
+
+def test_openai_compatible_clients_share_one_connection_pool(tmp_path: Path, monkeypatch, fresh_clients) -> None:
+    monkeypatch.setenv("TEST_OPENAI_KEY", "sk-test")
+    monkeypatch.setenv("TEST_OR_KEY", "sk-other")
+    cfg = AppConfig(
+        models=[
+            ModelConfig(name="gpt", provider="openai", api_key_env="TEST_OPENAI_KEY"),
+            ModelConfig(name="or", provider="openrouter", api_key_env="TEST_OR_KEY"),
+        ]
+    )
+    agent = Agent(DummyService(store_path=tmp_path), cfg, cache=LLMCache(SQLiteBackend(":memory:")))
+
+    first, second = (agent._get_client(m) for m in cfg.models)
+    assert first is not second
+    assert first._client is second._client is Agent._shared_http_client
+
+    async_first, async_second = (agent._get_async_client(m) for m in cfg.models)
+    assert async_first._client is async_second._client
+    asyncio.run(agent.aclose())
+    assert agent.async_clients == {}
+
+
+def test_answer_async_similar_hit_cancels_speculative_llm_call(tmp_path: Path) -> None:
+    service = DummyService(store_path=tmp_path)
+    agent = _make_agent(service)
+    llm_cancelled = False
+
+    async def slow_generate(_prompt: str) -> str:
+        nonlocal llm_cancelled
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            llm_cancelled = True
+            raise
+        return "LLM"
+
+    agent._hedged_generate = slow_generate  # type: ignore[method-assign]
+    agent._semantic_lookup = MagicMock(return_value=("CACHED", [1.0, 0.0]))  # type: ignore[method-assign]
+
+    assert asyncio.run(agent.answer_async("Explain e1")) == "CACHED"
+    assert llm_cancelled
+
+
+def test_answer_async_stores_embedding_from_parallel_lookup(tmp_path: Path) -> None:
+    service = DummyService(store_path=tmp_path)
+    agent = _make_agent(service)
+    agent._hedged_generate = AsyncMock(return_value="LLM")  # type: ignore[method-assign]
+    agent._semantic_lookup = MagicMock(return_value=(None, [1.0, 0.0]))  # type: ignore[method-assign]
+
+    assert asyncio.run(agent.answer_async("Explain e1")) == "LLM"
+    assert agent.cache.get_similar(agent._cache_namespace(), [1.0, 0.0]) == "LLM"
+
+
+def test_smart_answer_serves_cached_answer_without_retrieval(tmp_path: Path) -> None:
+    service = DummyService(store_path=tmp_path)
+    agent = _make_agent(service)
+
+    assert agent.answer("Explain e1") == "ANSWER"
+    service.retrieve_calls.clear()
+
+    result = agent.smart_answer("Explain e1")
+
+    assert result["source"] == "cache"
+    assert result["answer"] == "ANSWER"
+    assert service.retrieve_calls == []
+
+
+def test_concurrent_identical_prompts_share_one_llm_call(tmp_path: Path) -> None:
+    service = DummyService(store_path=tmp_path)
+    agent = _make_agent(service)
+    calls = 0
+
+    async def slow_generate(_prompt: str) -> str:
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.01)
+        return "LLM"
+
+    agent._hedged_generate = slow_generate  # type: ignore[method-assign]
+    agent._semantic_lookup = MagicMock(return_value=(None, None))  # type: ignore[method-assign]
+
+    async def burst() -> list[str]:
+        return await asyncio.gather(agent.answer_async("Explain e1"), agent.answer_async("Explain e1"))
+
+    assert asyncio.run(burst()) == ["LLM", "LLM"]
+    assert calls == 1
+    assert agent._inflight == {}
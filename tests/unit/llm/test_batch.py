@@ -0,0 +1,116 @@
+"""Tests for bulk question answering."""
+
+from __future__ import annotations
+
+import asyncio
+import json
+from pathlib import Path
+from unittest.mock import AsyncMock, MagicMock
+
+from knowcode.config import AppConfig, ModelConfig
+from knowcode.data_models import TaskType
+from knowcode.llm.agent import Agent
+from knowcode.llm.batch import BatchProcessor
+from knowcode.llm.cache import LLMCache, SQLiteBackend
+
+
+class DummyService:
+    def __init__(self, store_path: Path) -> None:
+        self.store_path = store_path
+
+    def retrieve_context_for_query(self, query: str, **_kwargs):
+        return {
+            "query": query,
+            "task_type": TaskType.GENERAL.value,
+            "task_confidence": 1.0,
+            "context_text": f"context for {query}",
+            "retrieval_mode": "lexical",
+        }
+
+
+def _make_agent(tmp_path: Path, provider: str) -> Agent:
+    cfg = AppConfig(models=[ModelConfig(name="m", provider=provider, api_key_env="TEST_KEY")])
+    agent = Agent(DummyService(tmp_path), cfg, cache=LLMCache(SQLiteBackend(":memory:")))
+    agent.rate_limiter = MagicMock()
+    agent.rate_limiter.check_availability.return_value = True
+    return agent
+
+
+def test_answer_many_uses_batch_api_for_openai(tmp_path: Path) -> None:
+    agent = _make_agent(tmp_path, "openai")
+    client = MagicMock()
+    client.files.create = AsyncMock(return_value=MagicMock(id="file-in"))
+    client.batches.create = AsyncMock(return_value=MagicMock(id="b1", status="in_progress"))
+    client.batches.retrieve = AsyncMock(
+        return_value=MagicMock(id="b1", status="completed", output_file_id="file-out")
+    )
+    rows = [
+        {
+            "custom_id": f"q{i}",
+            "response": {
+                "status_code": 200,
+                "body": {"choices": [{"message": {"content": f"A{i}"}}]},
+            },
+        }
+        for i in (1, 0)
+    ]
+    client.files.content = AsyncMock(
+        return_value=MagicMock(text="\n".join(json.dumps(r) for r in rows))
+    )
+    agent._get_async_client = lambda _model: client
+    processor = BatchProcessor(agent, use_batch_api=True, poll_interval=0)
+
+    answers = asyncio.run(processor.answer_many(["first", "second"]))
+
+    assert answers == ["A0", "A1"]
+    client.batches.create.assert_awaited_once()
+    agent.rate_limiter.record_usage.assert_called_once_with("m")
+    # Answers are cached, so a repeat makes no provider call
+    assert asyncio.run(processor.answer_many(["first", "second"])) == ["A0", "A1"]
+    client.files.create.assert_awaited_once()
+
+
+def test_answer_many_falls_back_to_bounded_concurrency(tmp_path: Path) -> None:
+    agent = _make_agent(tmp_path, "google")
+    in_flight = 0
+    peak = 0
+
+    async def generate(model: str, contents: str):
+        nonlocal in_flight, peak
+        in_flight += 1
+        peak = max(peak, in_flight)
+        await asyncio.sleep(0.01)
+        in_flight -= 1
+        return MagicMock(text=contents.rsplit("Question: ", 1)[1].upper())
+
+    client = MagicMock()
+    client.models.generate_content = generate
+    agent._get_async_client = lambda _model: client
+    processor = BatchProcessor(agent, max_concurrency=2, rate_limit_rpm=0)
+
+    answers = asyncio.run(processor.answer_many(["a", "b", "c", "d", "e"]))
+
+    assert answers == ["A", "B", "C", "D", "E"]
+    assert peak == 2
+
+
+def test_answer_many_answers_directly_when_batch_times_out(tmp_path: Path) -> None:
+    agent = _make_agent(tmp_path, "openai")
+    client = MagicMock()
+    client.files.create = AsyncMock(return_value=MagicMock(id="file-in"))
+    client.batches.create = AsyncMock(return_value=MagicMock(id="b1", status="in_progress"))
+    client.batches.retrieve = AsyncMock(return_value=MagicMock(id="b1", status="in_progress"))
+    client.batches.cancel = AsyncMock()
+
+    async def create(model, messages, extra_headers):
+        content = messages[0]["content"].rsplit("Question: ", 1)[1].upper()
+        return MagicMock(choices=[MagicMock(message=MagicMock(content=content))])
+
+    client.chat.completions.create = create
+    agent._get_async_client = lambda _model: client
+    processor = BatchProcessor(agent, use_batch_api=True, poll_interval=0, batch_timeout=0.05)
+
+    answers = asyncio.run(processor.answer_many(["a", "b"]))
+
+    assert answers == ["A", "B"]
+    client.batches.cancel.assert_awaited_once_with("b1")
@@ -0,0 +1,52 @@
+"""Tests for the LLM response cache."""
+
+from __future__ import annotations
+
+import time
+
+from knowcode.llm import cache as cache_module
+from knowcode.llm.cache import LLMCache, SQLiteBackend
+
+
+def test_exact_hit_and_ttl_expiry() -> None:
+    cache = LLMCache(SQLiteBackend(":memory:"), ttl=60)
+    key = LLMCache.make_key(["m"], "general", "prompt")
+
+    assert cache.get(key) is None
+    cache.set(key, "answer")
+    assert cache.get(key) == "answer"
+
+    cache.ttl = 0.01
+    time.sleep(0.02)
+    assert cache.get(key) is None
+
+
+def test_semantic_hit_within_namespace() -> None:
+    cache = LLMCache(SQLiteBackend(":memory:"), similarity_threshold=0.9)
+    cache.set("k1", "about parsing", namespace="repo", embedding=[1.0, 0.0, 0.0])
+
+    assert cache.get_similar("repo", [0.99, 0.05, 0.0]) == "about parsing"
+    assert cache.get_similar("repo", [0.0, 1.0, 0.0]) is None
+    assert cache.get_similar("other", [1.0, 0.0, 0.0]) is None
+    assert cache.stats() == {"hits": 0, "semantic_hits": 1, "misses": 2}
+
+
+def test_sqlite_backend_evicts_least_recently_used(tmp_path) -> None:
+    cache = LLMCache(SQLiteBackend(tmp_path / "cache.sqlite", max_entries=2))
+    cache.set("a", "A")
+    cache.set("b", "B")
+    assert cache.get("a") == "A"  # refresh "a"
+    cache.set("c", "C")
+
+    assert cache.get("b") is None
+    assert cache.get("a") == "A"
+    assert cache.get("c") == "C"
+
+
+def test_sqlite_backend_resolves_default_path_at_call_time(tmp_path, monkeypatch) -> None:
+    path = tmp_path / "redirected.sqlite"
+    monkeypatch.setattr(cache_module, "DEFAULT_CACHE_PATH", path)
+
+    LLMCache(SQLiteBackend()).set("a", "A")
+
+    assert path.exists()
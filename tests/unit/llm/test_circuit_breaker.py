@@ -0,0 +1,52 @@
+"""Tests for the provider circuit breaker."""
+
+from __future__ import annotations
+
+from knowcode.llm.circuit_breaker import BreakerState, CircuitBreaker
+from knowcode.llm.state_file import SharedStateFile
+
+
+def test_opens_after_threshold_and_probes_once() -> None:
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=0.0)
+    assert breaker.allow_request()
+    breaker.record_failure()
+    assert breaker.state == BreakerState.CLOSED
+    breaker.record_failure()
+    assert breaker.state == BreakerState.OPEN
+
+    # Timeout elapsed: exactly one probe is allowed through
+    assert breaker.allow_request()
+    assert breaker.state == BreakerState.HALF_OPEN
+    assert not breaker.allow_request()
+
+    breaker.record_success()
+    assert breaker.state == BreakerState.CLOSED
+    assert breaker.failure_count == 0
+
+
+def test_open_breaker_skips_until_timeout() -> None:
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=60.0)
+    breaker.record_failure()
+    assert not breaker.allow_request()
+
+
+def test_failed_probe_reopens_and_release_frees_slot() -> None:
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0.0)
+    breaker.record_failure()
+
+    assert breaker.allow_request()
+    breaker.release()
+    assert breaker.allow_request()
+    breaker.record_failure()
+    assert breaker.state == BreakerState.OPEN
+
+
+def test_breaker_state_is_shared_through_state_file(tmp_path) -> None:
+    path = tmp_path / "rate_state.mmap"
+    first = CircuitBreaker(failure_threshold=1, state_file=SharedStateFile(path), key="m")
+    first.record_failure()
+
+    # A breaker in another process maps the same file
+    second = CircuitBreaker(failure_threshold=1, state_file=SharedStateFile(path), key="m")
+    assert not second.allow_request()
+    assert second.state == BreakerState.OPEN
@@ -1,16 +1,221 @@
 """Unit tests for embedding providers."""
 
-from knowcode.llm.embedding import OpenAIEmbeddingProvider
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pytest
+
+from knowcode.llm import embedding as embedding_module
+from knowcode.llm.embedding import (
+    BatchingEmbedder,
+    OpenAIEmbeddingProvider,
+    _to_matrix,
+    top_k_cosine,
+)
 from knowcode.data_models import EmbeddingConfig
 
 
 def test_embedding_provider_empty_batch() -> None:
-    """Embedding provider should return empty list for empty input."""
+    """Embedding provider should return an empty matrix for empty input."""
     provider = OpenAIEmbeddingProvider(EmbeddingConfig())
-    assert provider.embed([]) == []
+    assert provider.embed([]).shape == (0, provider.config.dimension)
 
 
 def test_embedding_provider_normalize_zero_vector() -> None:
     """Normalization should handle zero vectors safely."""
-    provider = OpenAIEmbeddingProvider(EmbeddingConfig())
-    assert provider._normalize([0.0, 0.0]) == [0.0, 0.0]
+    assert _to_matrix([[0.0, 0.0]], normalize=True).tolist() == [[0.0, 0.0]]
+
+
+def test_embedding_provider_normalizes_whole_batch() -> None:
+    """Every vector in a batch should come back with unit length."""
+    provider = OpenAIEmbeddingProvider(EmbeddingConfig(normalize=True))
+
+    class StubEmbeddings:
+        def create(self, model, input):
+            data = [[3.0, 4.0], [0.0, 0.0]][: len(input)]
+            return type("Response", (), {"data": [type("Item", (), {"embedding": e}) for e in data]})
+
+    provider.client = type("Client", (), {"embeddings": StubEmbeddings()})()
+
+    matrix = provider.embed(["a", "b"])
+    assert matrix.dtype == np.float32
+    assert provider.embed_as_list(["a", "b"]) == [
+        pytest.approx([0.6, 0.8]),
+        [0.0, 0.0],
+    ]
+
+
+def test_embed_many_keeps_input_order_across_batches() -> None:
+    """Batches sent concurrently should be reassembled in input order."""
+
+    class LengthProvider(OpenAIEmbeddingProvider):
+        def embed(self, texts):
+            return np.asarray([[float(len(t)), 1.0] for t in texts], dtype=np.float32)
+
+    provider = LengthProvider(EmbeddingConfig(dimension=2))
+    texts = ["a" * n for n in range(1, 8)]
+
+    matrix = provider.embed_many(texts, batch_size=2, concurrency=3)
+
+    assert matrix[:, 0].tolist() == [float(n) for n in range(1, 8)]
+    assert provider.embed_many([]).shape == (0, 2)
+
+
+def test_embed_many_fills_preallocated_memmap(tmp_path) -> None:
+    """Batches should be written straight into a caller-supplied memmap."""
+
+    class LengthProvider(OpenAIEmbeddingProvider):
+        def embed(self, texts):
+            return np.asarray([[float(len(t)), 1.0] for t in texts], dtype=np.float32)
+
+    provider = LengthProvider(EmbeddingConfig(dimension=2))
+    texts = ["a" * n for n in range(1, 6)]
+    out = np.memmap(tmp_path / "embeddings.bin", dtype="float32", mode="w+", shape=(5, 2))
+
+    assert provider.embed_many(texts, batch_size=2, out=out) is out
+    assert out[:, 0].tolist() == [1.0, 2.0, 3.0, 4.0, 5.0]
+    with pytest.raises(ValueError):
+        provider.embed_many(texts, out=out[:3])
+
+
+def test_embed_many_rejects_short_provider_results() -> None:
+    """A provider returning fewer rows than texts should fail with a clear error."""
+
+    class ShortProvider(OpenAIEmbeddingProvider):
+        def embed(self, texts):
+            return np.zeros((len(texts) - 1, 2), dtype=np.float32)
+
+    provider = ShortProvider(EmbeddingConfig(dimension=2))
+
+    with pytest.raises(ValueError, match=r"ShortProvider returned embeddings of shape \(1, 2\)"):
+        provider.embed_many(["a", "b"], batch_size=2)
+
+
+def test_batching_embedder_coalesces_concurrent_queries() -> None:
+    """Concurrent single-query embeds should share one provider call."""
+    class RecordingProvider(OpenAIEmbeddingProvider):
+        def __init__(self) -> None:
+            super().__init__(EmbeddingConfig(dimension=2))
+            self.calls: list[list[str]] = []
+
+        def embed(self, texts):
+            self.calls.append(list(texts))
+            return np.asarray([[float(len(t)), 1.0] for t in texts], dtype=np.float32)
+
+    provider = RecordingProvider()
+    embedder = BatchingEmbedder(provider, max_batch=4, max_wait_ms=5000)
+    texts = ["a", "bb", "ccc", "dddd"]
+
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        vectors = list(pool.map(embedder.embed_single, texts))
+
+    assert len(provider.calls) == 1
+    assert sorted(provider.calls[0]) == texts
+    assert [v[0] for v in vectors] == [1.0, 2.0, 3.0, 4.0]
+
+
+def test_batching_embedder_caches_repeated_queries() -> None:
+    """A repeated query should be served without another provider call."""
+    calls: list[list[str]] = []
+
+    class CountingProvider(OpenAIEmbeddingProvider):
+        def embed(self, texts):
+            calls.append(list(texts))
+            return np.asarray([[1.0, 0.0] for _ in texts], dtype=np.float32)
+
+    config = EmbeddingConfig(model_name="cache-test-model", dimension=2)
+    first = BatchingEmbedder(CountingProvider(config), max_wait_ms=0)
+    second = BatchingEmbedder(CountingProvider(config), max_wait_ms=0)
+
+    assert first.embed_single("where is parse").tolist() == [1.0, 0.0]
+    assert second.embed_single("where is parse").tolist() == [1.0, 0.0]
+    assert calls == [["where is parse"]]
+
+
+def test_batching_embedder_caches_query_batches() -> None:
+    """Batched queries should use the query path and the shared cache."""
+    calls: list[list[str]] = []
+
+    class QueryProvider(OpenAIEmbeddingProvider):
+        def embed(self, texts):
+            raise AssertionError("queries must not use the document embedding path")
+
+        def embed_queries(self, texts):
+            calls.append(list(texts))
+            return np.asarray([[float(len(t)), 1.0] for t in texts], dtype=np.float32)
+
+    config = EmbeddingConfig(model_name="query-batch-test-model", dimension=2)
+    embedder = BatchingEmbedder(QueryProvider(config), max_wait_ms=0)
+
+    assert embedder.embed_single("parse").tolist() == [5.0, 1.0]
+    matrix = embedder.embed_queries(["parse", "where is parse", "parse"])
+
+    assert matrix[:, 0].tolist() == [5.0, 14.0, 5.0]
+    assert calls == [["parse"], ["where is parse"]]
+
+
+def test_providers_with_same_key_share_client(monkeypatch) -> None:
+    """Providers for one key and endpoint should reuse a single client."""
+    monkeypatch.setenv("EMBED_SHARE_TEST_KEY", "sk-test")
+    first = OpenAIEmbeddingProvider(EmbeddingConfig(), api_key_env="EMBED_SHARE_TEST_KEY")
+    second = OpenAIEmbeddingProvider(EmbeddingConfig(), api_key_env="EMBED_SHARE_TEST_KEY")
+    other = OpenAIEmbeddingProvider(
+        EmbeddingConfig(), api_key_env="EMBED_SHARE_TEST_KEY", base_url="https://example.invalid/v1"
+    )
+
+    assert first.client is second.client
+    assert other.client is not first.client
+
+
+def test_embed_many_respects_request_token_limits() -> None:
+    """Batches should be cut by token budget and oversized inputs truncated."""
+    calls: list[list[str]] = []
+
+    class LimitedProvider(OpenAIEmbeddingProvider):
+        max_request_tokens = 10
+        max_input_tokens = 5
+
+        def embed(self, texts):
+            calls.append(list(texts))
+            return np.asarray([[float(len(t)), 1.0] for t in texts], dtype=np.float32)
+
+    provider = LimitedProvider(EmbeddingConfig(dimension=2))
+    texts = ["x" * 12, "y" * 12, "z" * 100]
+
+    matrix = provider.embed_many(texts, batch_size=10, concurrency=1)
+
+    # ~5 estimated tokens each: two inputs fit per request; "z" is cut to 15 chars
+    assert calls == [["x" * 12, "y" * 12], ["z" * 15]]
+    assert matrix[:, 0].tolist() == [12.0, 12.0, 15.0]
+
+
+def test_batching_embedder_demotes_older_queries_to_int8(monkeypatch) -> None:
+    """Older cached queries should be kept quantized and still served."""
+    monkeypatch.setattr(embedding_module, "QUERY_EMBEDDING_FULL_PRECISION_ENTRIES", 1)
+    monkeypatch.setattr(BatchingEmbedder, "_shared_cache", OrderedDict())
+    monkeypatch.setattr(BatchingEmbedder, "_shared_quantized", OrderedDict())
+    calls: list[list[str]] = []
+
+    class CountingProvider(OpenAIEmbeddingProvider):
+        def embed(self, texts):
+            calls.append(list(texts))
+            return np.asarray([[0.6, 0.8]] * len(texts), dtype=np.float32)
+
+    embedder = BatchingEmbedder(CountingProvider(EmbeddingConfig(dimension=2)), max_wait_ms=0)
+    embedder.embed_single("first")
+    embedder.embed_single("second")
+
+    assert list(BatchingEmbedder._shared_quantized) == [embedder._cache_key("first")]
+    assert embedder.embed_single("first").tolist() == pytest.approx([0.6, 0.8], abs=0.01)
+    assert calls == [["first"], ["second"]]
+
+
+def test_top_k_cosine_orders_best_rows_first() -> None:
+    """Only the k most similar rows above the threshold should be returned."""
+    matrix = _to_matrix([[1.0, 0.0], [0.6, 0.8], [0.0, 1.0], [0.8, 0.6]], normalize=True)
+    query = np.asarray([1.0, 0.0], dtype=np.float32)
+
+    assert top_k_cosine(matrix, query, 2).tolist() == [0, 3]
+    assert top_k_cosine(matrix, query, 10, min_score=0.5).tolist() == [0, 3, 1]
+    assert top_k_cosine(matrix, query, 0).tolist() == []
@@ -0,0 +1,29 @@
+"""Tests for the per-model latency estimator."""
+
+from __future__ import annotations
+
+import pytest
+
+from knowcode.llm.latency import LatencyEstimator
+from knowcode.llm.state_file import SharedStateFile
+
+
+def test_hedge_delay_tracks_mean_and_spread(tmp_path) -> None:
+    estimator = LatencyEstimator(SharedStateFile(tmp_path / "state.mmap"))
+    assert estimator.hedge_delay("m", first_chunk=True) is None
+
+    estimator.observe("m", 2.0, first_chunk=True)
+    # First sample: mean 2s, deviation 1s
+    assert estimator.hedge_delay("m", first_chunk=True) == pytest.approx(6.0)
+    assert estimator.hedge_delay("m", first_chunk=False) is None
+
+    for _ in range(50):
+        estimator.observe("m", 2.0, first_chunk=True)
+    assert estimator.hedge_delay("m", first_chunk=True) == pytest.approx(2.0, abs=0.01)
+
+
+def test_estimates_are_shared_through_the_state_file(tmp_path) -> None:
+    path = tmp_path / "state.mmap"
+    LatencyEstimator(SharedStateFile(path)).observe("m", 8.0, first_chunk=False)
+
+    assert LatencyEstimator(SharedStateFile(path)).hedge_delay("m", first_chunk=False) == pytest.approx(24.0)
@@ -0,0 +1,40 @@
+"""Tests for query task-type classification."""
+
+from __future__ import annotations
+
+import pytest
+
+from knowcode.data_models import TaskType
+from knowcode.llm import query_classifier
+from knowcode.llm.query_classifier import classify_query
+
+
+@pytest.mark.parametrize(
+    ("query", "expected"),
+    [
+        ("Explain how does the parser work", TaskType.EXPLAIN),
+        ("why is this broken? fix the error", TaskType.DEBUG),
+        ("where is Foo defined", TaskType.LOCATE),
+        ("add a new feature endpoint", TaskType.EXTEND),
+        ("review the diff since last commit", TaskType.REVIEW),
+        ("hello there", TaskType.GENERAL),
+    ],
+)
+def test_classify_query_picks_task_type(query: str, expected: TaskType) -> None:
+    assert classify_query(query)[0] == expected
+
+
+def test_single_scan_matches_each_pattern_search() -> None:
+    """The combined scan should find exactly the patterns re.search finds."""
+    query = "What's wrong with the flow? Show me the file path and how to add a class"
+    expected = [
+        i for i, (pattern, _, _) in enumerate(query_classifier._PATTERN_TABLE) if pattern.search(query)
+    ]
+    assert sorted(query_classifier._matched_patterns(query)) == expected
+
+
+def test_classify_query_memoizes_repeated_queries() -> None:
+    classify_query.cache_clear()
+    first = classify_query("where is Foo defined")
+    assert classify_query("where is Foo defined") == first
+    assert classify_query.cache_info().hits == 1
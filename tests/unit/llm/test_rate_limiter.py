@@ -0,0 +1,49 @@
+"""Tests for the shared LLM rate limiter."""
+
+from __future__ import annotations
+
+from pathlib import Path
+
+from knowcode.config import ModelConfig
+from knowcode.llm import rate_limiter as rate_limiter_module
+from knowcode.llm.rate_limiter import RateLimiter, get_rate_limiter
+
+
+def test_usage_is_shared_between_limiters(tmp_path: Path) -> None:
+    path = tmp_path / "rate_state.mmap"
+    model = ModelConfig(name="m", api_key_env="KEY", rpm_free_tier_limit=2)
+
+    first = RateLimiter(persistence_path=path)
+    first.record_usage("m")
+    assert first.check_availability(model)
+
+    # A new process (e.g. the next CLI call) sees the same counters
+    second = RateLimiter(persistence_path=path)
+    second.record_usage("m")
+    assert not first.check_availability(model)
+    assert not second.check_availability(model)
+    assert second.check_availability(ModelConfig(name="other", api_key_env="KEY"))
+
+
+def test_minute_window_expires(tmp_path: Path, monkeypatch) -> None:
+    limiter = RateLimiter(persistence_path=tmp_path / "rate_state.mmap")
+    model = ModelConfig(name="m", api_key_env="KEY", rpm_free_tier_limit=1, rpd_free_tier_limit=2)
+    now = [10**18]
+    monkeypatch.setattr(rate_limiter_module.time, "time_ns", lambda: now[0])
+
+    limiter.record_usage("m")
+    assert not limiter.check_availability(model)
+
+    now[0] += rate_limiter_module.MINUTE_NS
+    assert limiter.check_availability(model)
+    limiter.record_usage("m")
+    # The day window still holds both requests
+    now[0] += rate_limiter_module.MINUTE_NS
+    assert not limiter.check_availability(model)
+
+
+def test_get_rate_limiter_shares_one_instance_per_path(tmp_path: Path) -> None:
+    path = tmp_path / "rate_state.mmap"
+
+    assert get_rate_limiter(path) is get_rate_limiter(path)
+    assert get_rate_limiter(tmp_path / "other.mmap") is not get_rate_limiter(path)
@@ -54,8 +54,8 @@ class MockStore:
             ),
         }
 
-    def search(self, query: str) -> list[Entity]:
-        return [e for e in self._entities.values() if query.lower() in e.name.lower()]
+    def search(self, query: str, limit: int | None = None) -> list[Entity]:
+        return [e for e in self._entities.values() if query.lower() in e.name.lower()][:limit]
 
     def get_entity(self, entity_id: str) -> Entity | None:
         return self._entities.get(entity_id)
@@ -185,6 +185,21 @@ def test_handle_tool_call_trace_calls(tmp_path: Path) -> None:
     assert result[0]["call_depth"] == 1
 
 
+def test_handle_tool_call_trace_calls_bad_depth_returns_error(tmp_path: Path) -> None:
+    """A non-integer depth should produce an error reply, not raise."""
+    (tmp_path / "knowcode_knowledge.json").write_text("{}")
+
+    server = KnowCodeMCPServer(store_path=tmp_path)
+    mock_service = MockServiceWithStore(tmp_path)
+    server._ensure_service = lambda allow_missing_store=False: mock_service  # type: ignore[method-assign]
+
+    result = json.loads(
+        server.handle_tool_call("trace_calls", {"entity_id": "e1", "depth": "deep"})
+    )
+
+    assert "error" in result
+
+
 def test_handle_tool_call_unknown_tool_returns_error(tmp_path: Path) -> None:
     """Test unknown tool returns error (UC2-004)."""
     server = KnowCodeMCPServer(store_path=tmp_path)
@@ -195,3 +210,54 @@ def test_handle_tool_call_unknown_tool_returns_error(tmp_path: Path) -> None:
 
     assert "error" in result
     assert "Unknown tool" in result["error"]
+
+
+def test_handle_tool_call_memoizes_until_store_changes(tmp_path: Path) -> None:
+    """Repeated calls should be served from cache until the store is replaced."""
+    (tmp_path / "knowcode_knowledge.json").write_text("{}")
+
+    server = KnowCodeMCPServer(store_path=tmp_path)
+    mock_service = MockServiceWithStore(tmp_path)
+    mock_service._store = object()
+    server._service = mock_service  # type: ignore[assignment]
+    server._ensure_service = lambda allow_missing_store=False: mock_service  # type: ignore[method-assign]
+    args = {"entity_id": "e1", "task_type": "explain", "max_tokens": 1000}
+
+    first = server.handle_tool_call("get_entity_context", args)
+    assert server.handle_tool_call("get_entity_context", dict(reversed(args.items()))) == first
+    assert len(mock_service.context_calls) == 1
+
+    mock_service._store = object()
+    server.handle_tool_call("get_entity_context", args)
+    assert len(mock_service.context_calls) == 2
+
+
+def test_handle_tool_call_does_not_replay_failed_retrieval(tmp_path: Path) -> None:
+    """Retrievals reporting errors should run again on the next call."""
+    server = KnowCodeMCPServer(store_path=tmp_path)
+    dummy = DummyService()
+    original = dummy.retrieve_context_for_query
+
+    def failing_retrieval(query: str, **kwargs):  # noqa: ANN001
+        result = original(query, **kwargs)
+        result["retrieval_mode"] = "lexical"
+        result["errors"] = ["Semantic retrieval failed; falling back to lexical: boom"]
+        return result
+
+    dummy.retrieve_context_for_query = failing_retrieval  # type: ignore[method-assign]
+    server._ensure_service = lambda allow_missing_store=False: dummy  # type: ignore[method-assign]
+    args = {"query": "Explain Foo"}
+
+    server.handle_tool_call("retrieve_context_for_query", args)
+    server.handle_tool_call("retrieve_context_for_query", args)
+
+    assert len(dummy.calls) == 2
+
+
+def test_prewarm_skips_missing_store(tmp_path: Path) -> None:
+    """Prewarming without a built store should not create a service."""
+    server = KnowCodeMCPServer(store_path=tmp_path)
+
+    server.prewarm()
+
+    assert server._service is None
@@ -56,3 +56,21 @@ def test_parse_simple_java(tmp_path: Path) -> None:
     calls = [r for r in rels if r.kind == RelationshipKind.CALLS]
     targets = {r.target_id for r in calls}
     assert "ref::helper" in targets
+
+
+def test_nested_calls_recorded_once_in_source_order(tmp_path: Path) -> None:
+    """Each call site should yield one CALLS relationship, outermost first."""
+    source = """
+    public class A {
+        void run() {
+            a.b().c(new Foo(bar()));
+        }
+    }
+    """
+    file_path = tmp_path / "A.java"
+    file_path.write_text(source, encoding="utf-8")
+
+    result = JavaParser().parse_file(file_path)
+
+    calls = [r.target_id for r in result.relationships if r.kind == RelationshipKind.CALLS]
+    assert calls == ["ref::a.b().c", "ref::a.b", "ref::Foo", "ref::bar"]
@@ -1,5 +1,6 @@
 """Tests for JavaScript parser."""
 
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from knowcode.data_models import EntityKind, RelationshipKind
 from knowcode.parsers.javascript_parser import JavaScriptParser
@@ -60,3 +61,58 @@ def test_parse_simple_js(tmp_path: Path) -> None:
     targets = {r.target_id for r in calls}
     assert "ref::something" in targets
     # assert "ref::MyClass" in targets # Constructor call logic might need verifying
+
+
+def test_reparse_after_edit_matches_fresh_parse(tmp_path: Path) -> None:
+    """An incremental reparse should see the edited file like a fresh parse."""
+    file_path = tmp_path / "edit.js"
+    file_path.write_text("function a() {}\n\nfunction b() {\n  a();\n}\n", encoding="utf-8")
+    parser = JavaScriptParser()
+    parser.parse_file(file_path)
+
+    file_path.write_text(
+        "function a() {}\n\nfunction renamed() {\n  a();\n}\n\nfunction c() {}\n",
+        encoding="utf-8",
+    )
+    incremental = parser.parse_file(file_path)
+    fresh = JavaScriptParser().parse_file(file_path)
+
+    def summary(result):
+        return [(e.qualified_name, e.location.line_start, e.location.line_end) for e in result.entities]
+
+    assert summary(incremental) == summary(fresh)
+    assert "renamed" in {e.name for e in incremental.entities}
+    assert "b" not in {e.name for e in incremental.entities}
+
+
+def test_entity_source_spans_its_lines(tmp_path: Path) -> None:
+    """Entity source should follow tree-sitter's rows, not str.splitlines()."""
+    source = 'const s = "a b\x0cc";\nfunction f() {\n  return "é";\n}\n'
+    file_path = tmp_path / "test.js"
+    file_path.write_text(source, encoding="utf-8")
+
+    result = JavaScriptParser().parse_file(file_path)
+
+    func = next(e for e in result.entities if e.name == "f")
+    assert func.source_code == 'function f() {\n  return "é";\n}'
+    assert result.entities[0].location.line_end == 4
+
+
+def test_concurrent_parses_share_one_instance(tmp_path: Path) -> None:
+    """Threads parsing through one parser instance should not interfere."""
+    paths = []
+    for i in range(16):
+        path = tmp_path / f"m{i}.js"
+        body = "\n".join(f"function f{i}_{j}() {{ g{j}(); }}" for j in range(50))
+        path.write_text(body, encoding="utf-8")
+        paths.append(path)
+
+    def summary(result):
+        return [e.id for e in result.entities], [r.target_id for r in result.relationships]
+
+    expected = [summary(JavaScriptParser().parse_file(p)) for p in paths]
+    parser = JavaScriptParser()
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        results = list(pool.map(parser.parse_file, paths * 3))
+
+    assert [summary(r) for r in results] == expected * 3
@@ -48,3 +48,20 @@ def test_hybrid_index_alpha_one_prefers_dense() -> None:
     results = index.search("a", [0.0], limit=2)
 
     assert results[0][0].id == "c2"
+
+
+def test_hybrid_index_fuses_variant_embeddings() -> None:
+    """Dense hits for query variants should add to the fused score."""
+    c1 = CodeChunk(id="c1", entity_id="e1", content="a", tokens=["a"])
+    c2 = CodeChunk(id="c2", entity_id="e2", content="b", tokens=["b"])
+
+    class PerEmbeddingVectorStore:
+        def search(self, embedding, limit=10):
+            # The query ranks c1 first; the variant only finds c2
+            return [("c1", 0.9), ("c2", 0.8)] if embedding == [0.0] else [("c2", 0.9)]
+
+    index = HybridIndex(StubRepo([c1, c2]), PerEmbeddingVectorStore(), alpha=1.0)
+
+    assert index.search("a", [0.0], limit=2)[0][0].id == "c1"
+    fused = index.search("a", [0.0], limit=2, variant_embeddings=[[1.0]])
+    assert fused[0][0].id == "c2"
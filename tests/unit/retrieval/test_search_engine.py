@@ -58,3 +58,40 @@ def test_search_engine_expands_dependencies() -> None:
     ids = {c.id for c in results}
 
     assert {"c1", "c2"} <= ids
+
+
+def test_search_engine_batches_query_variants_and_caches_embeddings() -> None:
+    """Variants should be embedded as queries in one call and reused afterwards."""
+
+    class RecordingProvider:
+        def __init__(self) -> None:
+            self.calls: list[list[str]] = []
+
+        def embed(self, texts):
+            raise AssertionError("queries must not use the document embedding path")
+
+        def embed_queries(self, texts):
+            self.calls.append(list(texts))
+            return [[float(len(t))] for t in texts]
+
+        def embed_single(self, text):
+            return self.embed_queries([text])[0]
+
+    class VariantHybridIndex:
+        def __init__(self) -> None:
+            self.variant_embeddings = None
+
+        def search(self, _query, _embedding, limit=10, variant_embeddings=None):
+            self.variant_embeddings = variant_embeddings
+            return []
+
+    provider = RecordingProvider()
+    hybrid = VariantHybridIndex()
+    engine = SearchEngine(InMemoryChunkRepository(), provider, hybrid, KnowledgeStore())
+
+    engine.search_scored("how does parse work", query_variants=["parse", "parse"], expand_deps=False)
+
+    assert provider.calls == [["how does parse work", "parse"]]
+    assert hybrid.variant_embeddings == [[5.0]]
+    assert engine.embed_queries(["how does parse work"]) == [[19.0]]
+    assert len(provider.calls) == 1
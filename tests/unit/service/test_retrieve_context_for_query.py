@@ -6,8 +6,10 @@ from pathlib import Path
 
 from knowcode.config import AppConfig
 from knowcode.data_models import CodeChunk, TaskType
+from knowcode.indexing.graph_builder import GraphBuilder
 from knowcode.retrieval.search_engine import ScoredChunk
 from knowcode.service import KnowCodeService
+from knowcode.storage.knowledge_store import KnowledgeStore
 
 
 class DummySearchEngine:
@@ -43,6 +45,9 @@ class DummyService(KnowCodeService):
             "sufficiency_score": 1.0,
         }
 
+    def get_context_batch(self, targets, max_tokens: int = 2000, task_type: TaskType | None = None):  # type: ignore[override]
+        return [self.get_context(t, max_tokens=max_tokens, task_type=task_type) for t in targets]
+
     def search(self, pattern: str):  # type: ignore[override]
         self.search_calls.append(pattern)
         return [{"id": "e1"}, {"id": "e2"}]
@@ -68,7 +73,7 @@ def test_retrieve_context_uses_semantic_when_index_exists(tmp_path: Path) -> Non
 
     assert result["retrieval_mode"] == "semantic"
     assert [e["entity_id"] for e in result["selected_entities"]] == ["e1", "e2"]
-    assert [c[0] for c in service.context_calls] == ["e1", "e2"]
+    assert sorted(c[0] for c in service.context_calls) == ["e1", "e2"]
     assert result["context_text"].count("CTX:") == 2
 
 
@@ -84,3 +89,59 @@ def test_retrieve_context_falls_back_to_lexical_on_semantic_error(tmp_path: Path
     assert result["retrieval_mode"] == "lexical"
     assert service.search_calls
     assert result["selected_entities"][0]["entity_id"] == "e1"
+
+
+def test_retrieve_context_drops_duplicate_context_texts(tmp_path: Path) -> None:
+    class SameContextService(DummyService):
+        def get_context(self, target: str, max_tokens: int = 2000, task_type: TaskType | None = None):  # type: ignore[override]
+            bundle = super().get_context(target, max_tokens=max_tokens, task_type=task_type)
+            bundle["context_text"] = "CTX:shared"
+            return bundle
+
+    (tmp_path / "knowcode_index").mkdir()
+    scored = [
+        ScoredChunk(chunk=CodeChunk(id="c1", entity_id="e1", content="one"), score=0.9, source="retrieved"),
+        ScoredChunk(chunk=CodeChunk(id="c2", entity_id="e2", content="two"), score=0.8, source="retrieved"),
+    ]
+    service = SameContextService(tmp_path, engine=DummySearchEngine(scored))
+    result = service.retrieve_context_for_query("Explain e1", limit_entities=2)
+
+    assert len(result["selected_entities"]) == 2
+    assert result["context_text"] == "CTX:shared"
+    assert result["total_tokens"] == 10
+
+
+def test_retrieve_context_fills_open_slots_with_lexical_hits(tmp_path: Path) -> None:
+    (tmp_path / "knowcode_index").mkdir()
+    chunk = CodeChunk(id="c1", entity_id="e1", content="one", tokens=["one"])
+
+    service = DummyService(
+        tmp_path,
+        engine=DummySearchEngine([ScoredChunk(chunk=chunk, score=0.9, source="retrieved")]),
+    )
+    result = service.retrieve_context_for_query("Explain e1", limit_entities=2)
+
+    assert result["retrieval_mode"] == "semantic"
+    assert service.search_calls
+    assert [e["entity_id"] for e in result["selected_entities"]] == ["e1", "e2"]
+    assert result["evidence"][-1] == {"rank": 2, "entity_id": "e2", "source": "lexical"}
+
+
+def test_get_context_batch_returns_bundles_in_order(tmp_path: Path) -> None:
+    src = tmp_path / "src"
+    src.mkdir()
+    (src / "mod.py").write_text(
+        "def helper():\n    return 1\n\n\ndef caller():\n    return helper()\n",
+        encoding="utf-8",
+    )
+    builder = GraphBuilder()
+    builder.build_from_directory(src)
+    service = KnowCodeService(store_path=tmp_path, app_config=AppConfig.default())
+    service._store = KnowledgeStore.from_graph_builder(builder)
+
+    bundles = service.get_context_batch(["caller", "missing", "helper"], max_tokens=500)
+
+    assert bundles[0]["entity_id"].endswith("caller")
+    assert isinstance(bundles[1], ValueError)
+    assert bundles[2]["entity_id"].endswith("helper")
+    assert bundles[0] == service.get_context("caller", max_tokens=500)
@@ -0,0 +1,30 @@
+"""Unit tests for KnowCodeService's lazily created members."""
+
+from __future__ import annotations
+
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from knowcode.config import AppConfig
+from knowcode.service import KnowCodeService
+from knowcode.storage.knowledge_store import KnowledgeStore
+
+
+def test_concurrent_store_access_loads_once(tmp_path: Path, monkeypatch) -> None:
+    """Threads asking for the store together should share a single load."""
+    loads: list[Path] = []
+
+    def slow_load(path):  # noqa: ANN001
+        loads.append(path)
+        time.sleep(0.05)
+        return KnowledgeStore()
+
+    monkeypatch.setattr(KnowledgeStore, "load", staticmethod(slow_load))
+    service = KnowCodeService(store_path=tmp_path, app_config=AppConfig.default())
+
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        stores = list(pool.map(lambda _: service.store, range(4)))
+
+    assert len(loads) == 1
+    assert all(store is stores[0] for store in stores)
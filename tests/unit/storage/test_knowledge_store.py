@@ -1,7 +1,7 @@
 """Unit tests for knowledge store helpers and persistence."""
 
 from knowcode.data_models import Entity, EntityKind, Location, Relationship, RelationshipKind
-from knowcode.storage.knowledge_store import KnowledgeStore
+from knowcode.storage.knowledge_store import KnowledgeStore, _snapshot_path
 
 
 def _make_entity(entity_id: str, kind: EntityKind, name: str) -> Entity:
@@ -29,6 +29,21 @@ def test_kind_filters_and_relationship_helpers() -> None:
     assert store.get_incoming_relationships(bar.id) == [rel]
 
 
+def test_kind_index_tracks_entity_changes() -> None:
+    """Kind lookups and counts should reflect entities added after first use."""
+    store = KnowledgeStore()
+    foo = _make_entity("file.py::foo", EntityKind.FUNCTION, "foo")
+    store.entities = {foo.id: foo}
+    assert store.count_by_kind() == {"function": 1}
+
+    cls = _make_entity("file.py::Cls", EntityKind.CLASS, "Cls")
+    store.entities[cls.id] = cls
+
+    assert store.get_entities_by_kind(EntityKind.CLASS) == [cls]
+    assert store.count_by_kind() == {"function": 1, "class": 1}
+    assert store.get_entities_by_kind("not-a-kind") == []
+
+
 def test_persistence_round_trip(tmp_path) -> None:
     """Save/load should preserve entities, relationships, and metadata."""
     store = KnowledgeStore()
@@ -51,3 +66,131 @@ def test_persistence_round_trip(tmp_path) -> None:
     assert loaded.metadata["stats"]["total"] == 1
     assert foo.id in loaded.entities
     assert loaded.relationships[0].metadata["kind"] == "test"
+
+
+def test_load_interns_shared_ids(tmp_path) -> None:
+    """Loaded relationships should share id strings with their entities."""
+    store = KnowledgeStore()
+    foo = _make_entity("file.py::foo", EntityKind.FUNCTION, "foo")
+    store.entities = {foo.id: foo}
+    store.relationships = [
+        Relationship(source_id=foo.id, target_id=foo.id, kind=RelationshipKind.CALLS)
+    ]
+    store.save(tmp_path / "knowledge.json")
+
+    loaded = KnowledgeStore.load(tmp_path / "knowledge.json")
+    entity = loaded.entities[foo.id]
+    assert loaded.relationships[0].source_id is entity.id
+    assert loaded.relationships[0].target_id is entity.id
+
+
+def test_lazy_source_round_trip(tmp_path) -> None:
+    """Lazily saved source should be omitted on disk and restored on access."""
+    source_file = tmp_path / "mod.py"
+    source_file.write_text("x = 1\n\ndef foo():\n    return x\n", encoding="utf-8")
+    foo = Entity(
+        id=f"{source_file}::foo",
+        kind=EntityKind.FUNCTION,
+        name="foo",
+        qualified_name="foo",
+        location=Location(str(source_file), 3, 4),
+        source_code="def foo():\n    return x",
+    )
+    store = KnowledgeStore()
+    store.entities = {foo.id: foo}
+    store.save(tmp_path / "knowledge.json", lazy_source=True)
+
+    assert b"return x" not in (tmp_path / "knowledge.json").read_bytes()
+    loaded = KnowledgeStore.load(tmp_path / "knowledge.json")
+    assert loaded.get_entity(foo.id).source_code == foo.source_code
+
+
+def test_load_prefers_matching_snapshot(tmp_path) -> None:
+    """Load should read the snapshot and ignore it once the JSON changes."""
+    foo = _make_entity("file.py::foo", EntityKind.FUNCTION, "foo")
+    store = KnowledgeStore()
+    store.entities = {foo.id: foo}
+    store.relationships = [Relationship(foo.id, foo.id, RelationshipKind.CALLS)]
+    store.metadata = {"stats": {"total": 1}}
+    save_path = tmp_path / "knowledge.json"
+    store.save(save_path)
+
+    assert _snapshot_path(save_path).exists()
+    loaded = KnowledgeStore.load(save_path)
+    assert loaded.entities == store.entities
+    assert loaded.entities[foo.id].location == foo.location
+    assert loaded.relationships == store.relationships
+    assert loaded.metadata == store.metadata
+
+    # An edited JSON file no longer matches the snapshot and wins
+    bar = _make_entity("file.py::bar_baz", EntityKind.FUNCTION, "bar_baz")
+    store.entities = {bar.id: bar}
+    snapshot = _snapshot_path(save_path).read_bytes()
+    store.save(save_path)
+    _snapshot_path(save_path).write_bytes(snapshot)
+    assert list(KnowledgeStore.load(save_path).entities) == [bar.id]
+
+
+def test_search_matches_names_case_insensitively() -> None:
+    """Search should match names and qualified names and see new entities."""
+    store = KnowledgeStore()
+    foo = _make_entity("file.py::FooBar", EntityKind.CLASS, "FooBar")
+    bar = _make_entity("file.py::bar", EntityKind.FUNCTION, "bar")
+    store.entities = {foo.id: foo, bar.id: bar}
+
+    assert store.search("bar") == [foo, bar]
+    assert store.search("FOO") == [foo]
+
+    baz = _make_entity("file.py::baz", EntityKind.FUNCTION, "baz")
+    store.entities[baz.id] = baz
+    assert store.search("ba") == [foo, bar, baz]
+    assert store.search("missing") == []
+    assert store.search("ba", limit=2) == [foo, bar]
+    assert store.search("ba", limit=0) == []
+    assert store.search("ba", limit=-1) == []
+    assert store.resolve(bar.id) is bar
+    assert store.resolve("BA") is foo
+    assert store.resolve("missing") is None
+
+
+def test_search_on_empty_store_returns_nothing() -> None:
+    """An empty store should match nothing, even for an empty pattern."""
+    store = KnowledgeStore()
+
+    assert store.search("") == []
+    assert store.resolve("") is None
+
+
+def test_trace_calls_follows_call_edges_and_sees_new_ones() -> None:
+    """Call traces should walk CALLS edges by depth and pick up added edges."""
+    a, b, c = (_make_entity(f"file.py::{n}", EntityKind.FUNCTION, n) for n in "abc")
+    store = KnowledgeStore()
+    store.entities = {e.id: e for e in (a, b, c)}
+    store.relationships = [
+        Relationship(a.id, b.id, RelationshipKind.CALLS),
+        Relationship(a.id, c.id, RelationshipKind.CONTAINS),
+    ]
+
+    assert [r["entity_id"] for r in store.trace_calls(a.id, depth=3)] == [b.id]
+
+    store.relationships.append(Relationship(b.id, c.id, RelationshipKind.CALLS))
+    callees = store.trace_calls(a.id, depth=3)
+    assert [(r["entity_id"], r["call_depth"]) for r in callees] == [(b.id, 1), (c.id, 2)]
+    callers = store.trace_calls(c.id, direction="callers", depth=1)
+    assert [r["entity_id"] for r in callers] == [b.id]
+    assert store.get_callers(b.id) == [a] and store.get_callees(b.id) == [c]
+
+
+def test_load_interns_short_metadata_values(tmp_path) -> None:
+    """Repeated short metadata strings should share one object after load."""
+    foo = _make_entity("file.py::foo", EntityKind.FUNCTION, "foo")
+    bar = _make_entity("file.py::bar", EntityKind.FUNCTION, "bar")
+    foo.metadata = {"value_type": "".join(["s", "tr"])}
+    bar.metadata = {"value_type": "".join(["st", "r"])}
+    store = KnowledgeStore()
+    store.entities = {foo.id: foo, bar.id: bar}
+    store.save(tmp_path / "knowledge.json")
+    _snapshot_path(tmp_path / "knowledge.json").unlink()
+
+    entities = KnowledgeStore.load(tmp_path / "knowledge.json").entities
+    assert entities[foo.id].metadata["value_type"] is entities[bar.id].metadata["value_type"]
@@ -23,3 +23,17 @@ def test_vector_store_save_load(tmp_path) -> None:
     assert loaded.id_map
     results = loaded.search([1.0, 0.0], limit=1)
     assert results[0][0] == "c1"
+
+
+def test_vector_store_add_many() -> None:
+    """Bulk insertion should map consecutive rows to chunk IDs."""
+    if vector_store.faiss is None:
+        pytest.skip("faiss not installed")
+
+    store = VectorStore(dimension=2)
+    store.add("c0", [-1.0, 0.0])
+    store.add_many(["c1", "c2"], [[1.0, 0.0], [0.0, 1.0]])
+
+    assert store.index.ntotal == 3
+    assert store.id_map == {0: "c0", 1: "c1", 2: "c2"}
+    assert store.search([0.0, 1.0], limit=1)[0][0] == "c2"
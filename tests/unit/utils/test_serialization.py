@@ -0,0 +1,33 @@
+"""Unit tests for JSON persistence helpers."""
+
+import gzip
+
+from knowcode.utils.serialization import iter_ndjson, read_json, write_json, write_ndjson
+
+
+def test_write_json_round_trip_is_compact(tmp_path) -> None:
+    """Plain files should be compact JSON that round-trips."""
+    path = tmp_path / "data.json"
+    write_json(path, {"a": [1, 2], "b": "x"})
+
+    assert b"\n" not in path.read_bytes()
+    assert read_json(path) == {"a": [1, 2], "b": "x"}
+
+
+def test_write_json_gzip_suffix(tmp_path) -> None:
+    """Files ending in .gz should be gzip-compressed and readable."""
+    path = tmp_path / "data.json.gz"
+    write_json(path, {"k": "v"})
+
+    assert gzip.decompress(path.read_bytes()).startswith(b"{")
+    assert read_json(path) == {"k": "v"}
+
+
+def test_ndjson_round_trip(tmp_path) -> None:
+    """NDJSON helpers should write one record per line and read them back."""
+    path = tmp_path / "records.ndjson"
+    records = [{"id": 1}, {"id": 2, "text": "a\nb"}]
+
+    assert write_ndjson(path, iter(records)) == 2
+    assert len(path.read_bytes().splitlines()) == 2
+    assert list(iter_ndjson(path)) == records